@@ -0,0 +1,199 @@
+import argparse
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from config import setting
+from costing import MARGIN_BANDS, cost_menu
+from menu_model import MENU_FILE_PATH, write_atomic
+from menu_store import open_store
+from units import cost_to_base
+
+ANALYTICS_VERSION = 1
+
+FORMATS = ('json', 'ndjson')
+
+# Fields of each row of a menu's `items`, in order
+ITEM_COLUMNS = ('name', 'category', 'hasRecipe', 'sellingPrice', 'cost', 'profitMargin', 'band', 'description')
+
+# Columns of a menu's ingredient breakdowns, as in the Analysis page's ingredients modal
+INGREDIENT_COLUMNS = ('name', 'quantity', 'unit', 'totalCost')
+
+# Display order of categories on the Analysis page (CATEGORY_ORDER in client/src/pages/Analysis.tsx);
+# categories not listed follow in order of first appearance
+CATEGORY_ORDER = [
+    'Starters', 'Mains', 'Mains Grill', 'Mains Oven', 'Steaks', 'Pizzas', 'Pastas', 'Risottos', 'Orzotto',
+    'Side Dishes', 'Desserts', 'Drinks', 'Soft Drinks', 'Beers & Ciders', 'White Wines', 'Red Wines',
+    'Rose Wines', 'Sparkling Wines', 'Cocktails', 'Hot Drinks', 'Liqueur Coffees', 'Baking Supplies',
+    'Beverages', 'Canned Goods', 'Condiments', 'Dairy', 'Fruits', 'Grains', 'Herbs and Spices',
+    'Miscellaneous', 'Nuts and Seeds', 'Oils and Vinegars', 'Proteins', 'Sauces', 'Sweeteners',
+    'Vegetables', 'Uncategorized'
+]
+_CATEGORY_POSITIONS = {category: position for position, category in enumerate(CATEGORY_ORDER)}
+
+# Items listed as top and bottom performers in each summary
+SUMMARY_SIZE = 3
+
+# Decimal places kept for costs; margins are already rounded to 2 by costing
+COST_DECIMALS = 4
+
+
+def analytics_path_for(menu_file_path, output_format='json'):
+    """Default sidecar analytics artifact location for a menu document."""
+    return f'{menu_file_path}.analytics.{output_format}'
+
+
+def ingredient_breakdowns(items, ingredients):
+    """
+    The ingredients modal's rows of every recipe item, as flat columns: item i's rows are
+    offsets[i]:offsets[i + 1] (empty for resale items). Costs are per base unit (g/ml) without
+    costMultiplier; unknown ingredients cost 0 in 'g/ml'. Line costs are one vectorized product.
+    """
+    base_costs = {name: cost_to_base(ingredient.cost or 0, ingredient.unit) for name, ingredient in ingredients.items()}
+    unknown = (0, None)
+    names = []
+    quantities = []
+    offsets = [0]
+    for item in items:
+        if item.has_recipe and item.ingredients:
+            names.extend(item.ingredients)
+            quantities.extend(item.ingredients.values())
+        offsets.append(len(names))
+    costs, units = zip(*[base_costs.get(name, unknown) for name in names]) if names else ((), ())
+    totals = np.round(np.array(quantities, dtype=float) * np.array(costs, dtype=float), COST_DECIMALS)
+    return {
+        'offsets': offsets,
+        'name': names,
+        'quantity': quantities,
+        'unit': [unit or 'g/ml' for unit in units],
+        'totalCost': totals.tolist(),
+    }
+
+
+def _summary(rows, margins):
+    """totalItems, avgProfitMargin and the top/bottom performers (item rows) among `rows`."""
+    if not len(rows):
+        return {'totalItems': 0, 'avgProfitMargin': 0.0, 'top': [], 'bottom': []}
+    selected = margins[rows]
+    # Stable sorts, so ties keep menu order as the page's Array.prototype.sort does
+    return {
+        'totalItems': int(len(rows)),
+        'avgProfitMargin': round(float(selected.mean()), 2),
+        'top': rows[np.argsort(-selected, kind='stable')[:SUMMARY_SIZE]].tolist(),
+        'bottom': rows[np.argsort(selected, kind='stable')[:SUMMARY_SIZE]].tolist(),
+    }
+
+
+def _categories(items, margins, band_indices):
+    """Category rollups in display order: item rows, average margin and item count per margin band."""
+    lookup = {}
+    codes = np.fromiter((lookup.setdefault(item.category or 'Uncategorized', len(lookup)) for item in items),
+                        dtype=np.intp, count=len(items))
+    counts = np.bincount(codes, minlength=len(lookup))
+    margin_sums = np.bincount(codes, weights=margins, minlength=len(lookup))
+    band_counts = np.bincount(codes * len(MARGIN_BANDS) + band_indices,
+                              minlength=len(lookup) * len(MARGIN_BANDS)).reshape(len(lookup), len(MARGIN_BANDS))
+    members = np.argsort(codes, kind='stable')
+    bounds = np.concatenate([[0], np.cumsum(counts)])
+    ordered = sorted(lookup, key=lambda category: _CATEGORY_POSITIONS.get(category, len(CATEGORY_ORDER)))
+    return [{
+        'category': category,
+        'items': members[bounds[code]:bounds[code + 1]].tolist(),
+        'avgProfitMargin': round(float(margin_sums[code] / counts[code]), 2),
+        'bands': band_counts[code].tolist(),
+    } for category, code in ((category, lookup[category]) for category in ordered)]
+
+
+def menu_analytics(menu):
+    """Everything the Analysis page computes for one menu, costed in one vectorized pass."""
+    costing = cost_menu(menu)
+    items = menu.items
+    costs = np.round(costing.costs, COST_DECIMALS).tolist()
+    margins = costing.margins.tolist()
+    bands = costing.band_indices.tolist()
+    rows = [[item.name, item.category, bool(item.has_recipe), item.selling_price or 0, costs[row], margins[row],
+             bands[row], item.description]
+            for row, item in enumerate(items)]
+    recipe_rows = np.flatnonzero(costing.has_recipe)
+    resale_rows = np.flatnonzero(~costing.has_recipe)
+    return {
+        'costMultiplier': menu.cost_multiplier if menu.cost_multiplier is not None else 1,
+        'items': rows,
+        'ingredients': ingredient_breakdowns(items, menu.ingredients),
+        'categories': _categories(items, costing.margins, costing.band_indices.astype(np.intp)),
+        'summary': {
+            'recipe': _summary(recipe_rows, costing.margins),
+            'resale': _summary(resale_rows, costing.margins),
+        },
+    }
+
+
+def build_analytics(menus):
+    """The versioned analytics document of every menu (without its hash)."""
+    return {
+        'version': ANALYTICS_VERSION,
+        'bands': list(MARGIN_BANDS),
+        'columns': {'items': list(ITEM_COLUMNS), 'ingredients': list(INGREDIENT_COLUMNS)},
+        'menus': {name: menu_analytics(menu) for name, menu in menus.items()},
+    }
+
+
+def _dumps(data):
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+
+
+def serialize_analytics(document, output_format='json'):
+    """
+    Serialize an analytics document with its content hash. Returns (text, hash). 'json' is one
+    object with a 'hash' key; 'ndjson' is a header line (version, hash, columns, menu names) then
+    one line per menu. Each menu is serialized once and the SHA-256 is taken over those pieces,
+    so both formats of the same document carry the same hash, usable as an HTTP ETag.
+    """
+    meta_text = _dumps({key: value for key, value in document.items() if key not in ('version', 'menus')})
+    menu_texts = [(_dumps(name), _dumps(analytics)) for name, analytics in document['menus'].items()]
+    digest = hashlib.sha256(f"{document['version']}\n{meta_text}".encode('utf-8'))
+    for name_text, menu_text in menu_texts:
+        digest.update(f'\n{name_text}:{menu_text}'.encode('utf-8'))
+    digest = digest.hexdigest()
+
+    header = f'{{"version":{document["version"]},"hash":"{digest}",{meta_text[1:-1]}'
+    if output_format == 'json':
+        menus = ','.join(f'{name_text}:{menu_text}' for name_text, menu_text in menu_texts)
+        return f'{header},"menus":{{{menus}}}}}\n', digest
+    names = ','.join(name_text for name_text, _ in menu_texts)
+    lines = [f'{header},"menus":[{names}]}}']
+    lines += [f'{{"menu":{name_text},{menu_text[1:]}' for name_text, menu_text in menu_texts]
+    return '\n'.join(lines) + '\n', digest
+
+
+def export_analytics(menus, file_path, output_format='json'):
+    """
+    Write the analytics artifact of the menus atomically. An unchanged artifact is not rewritten,
+    so its modification time keeps matching the hash. Returns (hash, whether it was written).
+    """
+    text, digest = serialize_analytics(build_analytics(menus), output_format)
+    if os.path.exists(file_path):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            if f.read() == text:
+                return digest, False
+    write_atomic(file_path, text)
+    return digest, True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export precomputed costs, margins and rollups for the Analysis page.")
+    parser.add_argument('--menu-file', default=setting('menu_file', MENU_FILE_PATH),
+                        help="menu document (.json) or SQLite store (.db)")
+    parser.add_argument('--output', help="artifact to write (default: <menu-file>.analytics.<format>)")
+    parser.add_argument('--format', choices=FORMATS, default='json',
+                        help="one JSON document, or NDJSON with one line per menu (default: json)")
+    args = parser.parse_args(argv)
+
+    output = args.output or analytics_path_for(args.menu_file, args.format)
+    digest, written = export_analytics(open_store(args.menu_file).load(), output, args.format)
+    print(f"{'Wrote' if written else 'Unchanged'} {output} (sha256 {digest})")
+
+if __name__ == "__main__":
+    main()
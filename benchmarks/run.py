@@ -0,0 +1,173 @@
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import sys
+import time
+
+from benchmarks.synthetic_menus import generate_dish_descriptions, generate_menus, generate_price_csv
+
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+
+# Resale names matched per match_ingredient_to_resale_item run; the size scales the ingredients
+MATCH_QUERIES = 100
+
+
+def _quiet(function):
+    """Run function with the scripts' print output discarded, so only the work is timed."""
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return function()
+    return run
+
+
+def setup_correct_ingredients(size, options):
+    from correct_resale_prices import correct_ingredients, new_error_report
+    from instrumentation import Metrics
+    menus = generate_menus(items=0, ingredients=size, menus=options.menus, seed=options.seed)
+    return lambda: correct_ingredients(menus, new_error_report(), Metrics('benchmark'))
+
+
+def setup_validate_ingredients(size, options):
+    from validation import CORRECT_RESALE_PRICES_RULES, validate_menus
+    menus = generate_menus(items=0, ingredients=size, menus=options.menus, seed=options.seed)
+    return lambda: validate_menus(menus, CORRECT_RESALE_PRICES_RULES)
+
+
+def setup_match_ingredient_to_resale_item(size, options):
+    from correct_resale_prices import match_ingredient_to_resale_item
+    from resale_matcher import ResaleMatcher
+    menus = generate_menus(items=MATCH_QUERIES, ingredients=size, menus=1, resale_share=1.0,
+                           name_noise=options.name_noise, seed=options.seed)
+    menu = next(iter(menus.values()))
+
+    def run():
+        matcher = ResaleMatcher(menu.ingredients)
+        for item in menu.items:
+            match_ingredient_to_resale_item(item.name, matcher, item.category)
+    return run
+
+
+def setup_update_resale_item_prices(size, options):
+    from correct_resale_prices import update_resale_item_prices
+    menus = generate_menus(items=size, ingredients=size, menus=options.menus, resale_share=options.resale_share,
+                           name_noise=options.name_noise, seed=options.seed)
+    return lambda: update_resale_item_prices(menus, match_workers=options.match_workers)
+
+
+def setup_fix_menus(size, options):
+    from fix_menus import fix_menus
+    menus = generate_menus(items=size, ingredients=min(size, 1000), menus=options.menus,
+                           resale_share=options.resale_share, seed=options.seed)
+    return lambda: fix_menus(menus)
+
+
+def setup_update_menu_costs(size, options):
+    from update_ingredients import update_ingredient_costs
+    from price_feed import PriceIndex, iter_price_offers
+    menus = generate_menus(items=0, ingredients=size, menus=options.menus, seed=options.seed)
+    price_lines = list(generate_price_csv(menus, seed=options.seed))
+
+    def run():
+        update_ingredient_costs(menus, price_index=PriceIndex().add_all(iter_price_offers(price_lines)))
+    return run
+
+
+def setup_match_dish_descriptions(size, options):
+    from update_dish_descriptions import apply_dish_descriptions
+    menus = generate_menus(items=size, ingredients=min(size, 1000), menus=options.menus,
+                           resale_share=options.resale_share, seed=options.seed)
+    descriptions = generate_dish_descriptions(menus, seed=options.seed)
+    return lambda: apply_dish_descriptions(menus, descriptions)
+
+
+def setup_export_analytics(size, options):
+    from analytics import build_analytics, serialize_analytics
+    menus = generate_menus(items=size, ingredients=min(size, 1000), menus=options.menus,
+                           resale_share=options.resale_share, seed=options.seed)
+    return lambda: serialize_analytics(build_analytics(menus))
+
+
+# Benchmark cases: name -> setup(size, options) returning the callable to time
+CASES = {
+    'correct_ingredients': setup_correct_ingredients,
+    'validate_ingredients': setup_validate_ingredients,
+    'match_ingredient_to_resale_item': setup_match_ingredient_to_resale_item,
+    'update_resale_item_prices': setup_update_resale_item_prices,
+    'fix_menus': setup_fix_menus,
+    'update_menu_costs': setup_update_menu_costs,
+    'match_dish_descriptions': setup_match_dish_descriptions,
+    'export_analytics': setup_export_analytics,
+}
+
+
+def time_case(name, size, options):
+    """Best wall-clock time of `options.repeat` runs of a case, each on freshly generated data."""
+    best = None
+    for _ in range(options.repeat):
+        run = _quiet(CASES[name](size, options))
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run_benchmarks(options):
+    """Time every selected case at every size. Returns a machine-readable result document."""
+    results = []
+    for name in options.cases:
+        over_budget = False
+        for size in sorted(options.sizes):
+            if over_budget:
+                results.append({'case': name, 'size': size, 'status': 'skipped',
+                                'reason': f'previous size exceeded the {options.budget}s budget'})
+                continue
+            seconds = time_case(name, size, options)
+            results.append({'case': name, 'size': size, 'status': 'ok', 'seconds': seconds,
+                            'microseconds_per_entry': seconds / size * 1e6})
+            print(f"{name:35} {size:>9} {seconds:10.4f}s", file=sys.stderr)
+            over_budget = seconds > options.budget
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'parameters': {'menus': options.menus, 'resale_share': options.resale_share,
+                       'name_noise': options.name_noise, 'seed': options.seed, 'repeat': options.repeat,
+                       'match_workers': options.match_workers,
+                       'match_queries': MATCH_QUERIES},
+        'results': results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the costing and matching hot paths on synthetic menus.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="entry counts to run")
+    parser.add_argument('--cases', nargs='+', choices=sorted(CASES), default=list(CASES), help="cases to run")
+    parser.add_argument('--menus', type=int, default=2, help="menus to spread entries over")
+    parser.add_argument('--resale-share', type=float, default=0.3, help="fraction of items that are resale items")
+    parser.add_argument('--name-noise', type=float, default=0.05, help="typo rate per character in resale names")
+    parser.add_argument('--match-workers', type=int, default=1,
+                        help="processes update_resale_item_prices spreads fuzzy matching over")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=1, help="runs per case and size; the best is reported")
+    parser.add_argument('--budget', type=float, default=60.0,
+                        help="skip larger sizes of a case once one run takes longer than this many seconds")
+    parser.add_argument('--output', help="write results as JSON to this file (default: stdout)")
+    options = parser.parse_args(argv)
+
+    logging.disable(logging.CRITICAL)
+    report = run_benchmarks(options)
+    text = json.dumps(report, indent=2)
+    if options.output:
+        with open(options.output, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
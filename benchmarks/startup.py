@@ -0,0 +1,85 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+from menu_tools import COMMANDS
+
+ENTRY_POINT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'menu_tools.py')
+
+# Wall-clock budget of `menu_tools.py --help`, interpreter start-up included
+DEFAULT_BUDGET_MS = 100.0
+
+# Modules `menu_tools.py --help` must not import
+HEAVY_MODULES = ('numpy', 'fuzzywuzzy')
+
+
+def time_command(args, repeat):
+    """Median wall-clock milliseconds of running the entry point with `args` in a fresh interpreter."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, ENTRY_POINT, *args], check=True, stdout=subprocess.DEVNULL)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def imported_modules(args):
+    """Top-level packages the entry point imports when run with `args`, from -X importtime."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', ENTRY_POINT, *args], check=True,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    modules = set()
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            modules.add(line.rsplit('|', 1)[1].strip().split('.')[0])
+    return modules
+
+
+def measure_startup(options):
+    """Time --help of the entry point and of each command. Returns a machine-readable result document."""
+    results = []
+    help_ms = time_command(['--help'], options.repeat)
+    heavy = sorted(set(HEAVY_MODULES) & imported_modules(['--help']))
+    results.append({'command': '--help', 'milliseconds': help_ms, 'heavy_imports': heavy})
+    print(f"{'--help':35} {help_ms:8.1f}ms", file=sys.stderr)
+    for name in options.commands:
+        milliseconds = time_command([name, '--help'], options.repeat)
+        results.append({'command': f'{name} --help', 'milliseconds': milliseconds})
+        print(f"{name + ' --help':35} {milliseconds:8.1f}ms", file=sys.stderr)
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'parameters': {'repeat': options.repeat, 'budget_ms': options.budget_ms},
+        'within_budget': help_ms <= options.budget_ms and not heavy,
+        'results': results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure start-up time of the menu_tools.py entry point.")
+    parser.add_argument('--commands', nargs='*', choices=sorted(COMMANDS), default=list(COMMANDS),
+                        help="commands whose --help to time as well (default: all)")
+    parser.add_argument('--repeat', type=int, default=5, help="runs per command; the median is reported")
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS,
+                        help="fail if menu_tools.py --help takes longer than this, or imports NumPy or fuzzywuzzy")
+    parser.add_argument('--output', help="write results as JSON to this file (default: stdout)")
+    options = parser.parse_args(argv)
+
+    report = measure_startup(options)
+    text = json.dumps(report, indent=2)
+    if options.output:
+        with open(options.output, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
+    if not report['within_budget']:
+        sys.exit(f"menu_tools.py --help is over its start-up budget of {options.budget_ms}ms "
+                 "or imports a heavy dependency")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import random
+import uuid
+
+from menu_model import Ingredient, Menu, MenuItem
+
+# Ingredient categories as written by update_ingredients.py, with their purchase unit
+INGREDIENT_CATEGORIES = [
+    ('Proteins', 'kg'), ('Vegetables', 'kg'), ('Dairy', 'kg'), ('Fruits', 'kg'), ('Grains', 'kg'),
+    ('Herbs and Spices', 'kg'), ('Sauces', 'L'), ('Oils and Vinegars', 'L'), ('Condiments', 'L'),
+    ('Beverages', 'L'), ('Miscellaneous', 'unit'),
+]
+
+# Item categories as found in server/menus_bak.json
+RECIPE_CATEGORIES = ['Starters', 'Mains', 'Mains Grill', 'Pizzas', 'Pastas', 'Side Dishes', 'Desserts', 'Cocktails']
+RESALE_CATEGORIES = ['Soft Drinks', 'Beers & Ciders', 'White Wines', 'Red Wines', 'Drinks']
+
+WORDS = [
+    'lamb', 'beef', 'chicken', 'prawn', 'salmon', 'cod', 'halloumi', 'feta', 'tomato', 'onion', 'pepper', 'garlic',
+    'lemon', 'lime', 'orange', 'apple', 'mint', 'basil', 'chilli', 'olive', 'rice', 'bulgur', 'pasta', 'flour',
+    'butter', 'cream', 'yoghurt', 'honey', 'sugar', 'wine', 'cider', 'lager', 'tonic', 'cola', 'juice', 'water',
+    'smoked', 'fresh', 'dried', 'roasted', 'pickled', 'spicy', 'sweet', 'red', 'green', 'white', 'wild', 'king',
+]
+SIZES = ['', ' 275ml', ' 330ml', ' (Glass)', ' (Bottle)', ' 200ml', ' 4x330ml']
+DIETARY_SUFFIXES = ['', '', '', ' (V)', ' (VG)', ' (N)']
+
+
+def _display_name(words):
+    return ' '.join(word.capitalize() for word in words)
+
+
+def _camel_case(words):
+    return words[0] + ''.join(word.capitalize() for word in words[1:])
+
+
+def _noisy(name, noise, rng):
+    """Apply character-level typos to name at roughly `noise` edits per character."""
+    if noise <= 0:
+        return name
+    chars = list(name)
+    for _ in range(sum(rng.random() < noise for _ in chars)):
+        position = rng.randrange(len(chars) or 1)
+        edit = rng.random()
+        if edit < 0.4 and chars:
+            chars.pop(position)
+        elif edit < 0.7:
+            chars.insert(position, rng.choice('abcdefghilmnoprstu'))
+        elif chars:
+            chars[position] = rng.choice('abcdefghilmnoprstu')
+    return ''.join(chars) or name
+
+
+def _ingredient_words(index, rng):
+    words = [rng.choice(WORDS), rng.choice(WORDS)]
+    # Past the vocabulary, keep names unique with a numeric suffix, as large catalogs do
+    if index >= len(WORDS) ** 2 // 4:
+        words.append(str(index))
+    return words
+
+
+def generate_menus(items=1000, ingredients=1000, menus=2, resale_share=0.3, name_noise=0.05, seed=0):
+    """
+    Generate a dict of Menu objects shaped like server/menus_bak.json.
+
+    `items` and `ingredients` are totals spread over `menus`. A `resale_share` fraction of items
+    are resale items named after one of their menu's ingredients, with `name_noise` typos per
+    character so fuzzy matching has real work to do; the rest are recipes of 2-8 ingredients.
+    """
+    rng = random.Random(seed)
+    generated = {}
+    for menu_index in range(menus):
+        menu_name = f'site{menu_index}Menu'
+        ingredient_count = max(1, ingredients // menus + (menu_index < ingredients % menus))
+        item_count = items // menus + (menu_index < items % menus)
+
+        menu_ingredients = {}
+        display_names = []
+        for index in range(ingredient_count):
+            words = _ingredient_words(index, rng)
+            name = _camel_case(words)
+            if name in menu_ingredients:
+                words.append(str(index))
+                name = _camel_case(words)
+            category, unit = rng.choice(INGREDIENT_CATEGORIES)
+            cost = round(rng.uniform(0.3, 1.5) if unit == 'unit' else rng.uniform(1, 30), 2)
+            menu_ingredients[name] = Ingredient(name, cost, unit, category)
+            display_names.append((name, _display_name(words)))
+
+        menu_items = []
+        for _ in range(item_count):
+            if rng.random() < resale_share:
+                _, display = rng.choice(display_names)
+                name = _noisy(display, name_noise, rng) + rng.choice(SIZES)
+                selling_price = round(rng.uniform(2, 30), 2)
+                menu_items.append(MenuItem(name, rng.choice(RESALE_CATEGORIES), selling_price, None, False,
+                                           str(uuid.UUID(int=rng.getrandbits(128))),
+                                           round(selling_price * 0.7, 2), None))
+            else:
+                recipe = {name: rng.choice([1, 5, 10, 20, 50, 100, 150, 200])
+                          for name, _ in rng.sample(display_names, min(len(display_names), rng.randint(2, 8)))}
+                name = _display_name(rng.sample(WORDS, 3)) + rng.choice(DIETARY_SUFFIXES)
+                menu_items.append(MenuItem(name, rng.choice(RECIPE_CATEGORIES), round(rng.uniform(4, 35), 2),
+                                           recipe, True, str(uuid.UUID(int=rng.getrandbits(128))), None, None))
+
+        generated[menu_name] = Menu(menu_name, menu_ingredients, menu_items, 1.1,
+                                    sorted({item.category for item in menu_items}))
+    return generated
+
+
+def generate_price_csv(menus, suppliers_per_ingredient=2, seed=0):
+    """Lines of a supplier price list covering every ingredient of menus, in the csv_data format."""
+    rng = random.Random(seed)
+    yield 'Ingredient,Category,Unit,Wholesale Price (excl. VAT),VAT (20%),Final Price (incl. VAT),Source\n'
+    for menu in menus.values():
+        for ingredient in menu.ingredients.values():
+            for supplier in range(suppliers_per_ingredient):
+                price = round(ingredient.cost * rng.uniform(0.8, 1.2), 2)
+                yield (f'{ingredient.name},{ingredient.category},{ingredient.unit},{price:.2f},'
+                       f'{price * 0.2:.2f},{price * 1.2:.2f},"Supplier {supplier}"\n')
+
+
+def generate_dish_descriptions(menus, share=0.8, name_noise=0.0, seed=0):
+    """A dishDescriptions-style list with an entry for roughly `share` of the menu items."""
+    rng = random.Random(seed)
+    descriptions = []
+    for menu in menus.values():
+        for item in menu.items:
+            if rng.random() < share:
+                descriptions.append({'name': _noisy(item.name, name_noise, rng),
+                                     'description': f'Synthetic description of {item.name}.'})
+    return descriptions
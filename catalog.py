@@ -0,0 +1,330 @@
+import argparse
+import json
+import os
+from collections import Counter
+
+from manifest import content_hash
+from menu_model import Ingredient, menus_to_dict, write_atomic
+from menu_store import open_store
+
+CATALOG_VERSION = 2
+
+# Ingredient attributes a menu can override; `extra` holds any other JSON keys
+OVERRIDE_FIELDS = ('cost', 'unit', 'category', 'extra')
+
+# Separates the menu file from the menu name in the menu keys of a group catalog
+MENU_KEY_SEPARATOR = '#'
+
+
+def catalog_path_for(menu_file_path):
+    """Default sidecar catalog location for a menu document."""
+    return menu_file_path + '.catalog.json'
+
+
+def menu_key(file_path, menu_name):
+    """Key of one menu of one site in a group catalog."""
+    return f'{file_path}{MENU_KEY_SEPARATOR}{menu_name}'
+
+
+def split_menu_key(key):
+    """(menu file, menu name) of a group catalog menu key."""
+    file_path, _, menu_name = key.rpartition(MENU_KEY_SEPARATOR)
+    return file_path, menu_name
+
+
+def _fields(ingredient):
+    return {field: getattr(ingredient, field) for field in OVERRIDE_FIELDS}
+
+
+def _value_key(ingredient):
+    """Hashable form of an ingredient's values, equal for ingredients that serialize identically."""
+    extra = json.dumps(ingredient.extra, sort_keys=True) if ingredient.extra else None
+    # 1 and 1.0 compare equal but serialize differently
+    return type(ingredient.cost), ingredient.cost, ingredient.unit, ingredient.category, extra
+
+
+def _copy_values(source, ingredient):
+    ingredient.cost = source.cost
+    ingredient.unit = source.unit
+    ingredient.category = source.category
+    ingredient.extra = dict(source.extra) if source.extra else None
+
+
+class IngredientCatalog:
+    """
+    Canonical ingredients shared by many menus, with sparse per-menu overrides.
+
+    Each ingredient name (the ID menus key initialIngredients by) has one canonical Ingredient,
+    the values most menus listing it agree on. A menu that differs keeps only the differing
+    fields as an override. Menus keep their own ordered list of names, so a menu's
+    initialIngredients can be rebuilt exactly. Updating a canonical entry updates every menu
+    that does not override the updated fields.
+
+    The menus keep their own full copies of the ingredients, so a group catalog also records
+    the content hash of each menu file it was built from (`sources`). apply_group_catalog
+    refuses to write into a file that changed since, which would revert its edits.
+    """
+    __slots__ = ('entries', 'menus', 'overrides', 'sources')
+
+    def __init__(self):
+        self.entries = {}
+        self.menus = {}
+        self.overrides = {}
+        self.sources = {}
+
+    @classmethod
+    def from_menus(cls, menus):
+        """Build a catalog from a mapping of menu key -> Menu (menu names, or menu_key()s for a group)."""
+        catalog = cls()
+        variants = {}
+        for key, menu in menus.items():
+            catalog.menus[key] = list(menu.ingredients)
+            for name, ingredient in menu.ingredients.items():
+                variants.setdefault(name, []).append((key, ingredient, _value_key(ingredient)))
+        for name, listed in variants.items():
+            counts = {}
+            for _, _, value in listed:
+                counts[value] = counts.get(value, 0) + 1
+            # Most common values win; ties go to the first menu listing them
+            canonical_key = max(counts, key=counts.__getitem__)
+            canonical = next(ingredient for _, ingredient, value in listed if value == canonical_key)
+            catalog.entries[name] = canonical.copy()
+            if len(counts) > 1:
+                for key, ingredient, value in listed:
+                    if value != canonical_key:
+                        catalog.set(key, name, ingredient)
+        return catalog
+
+    def __len__(self):
+        return len(self.entries)
+
+    def copies(self):
+        """Number of menu ingredient entries the catalog stands for."""
+        return sum(len(names) for names in self.menus.values())
+
+    def override_count(self):
+        return sum(len(overrides) for overrides in self.overrides.values())
+
+    def override(self, key, name):
+        """The fields menu `key` overrides for ingredient `name`, or None."""
+        menu_overrides = self.overrides.get(key)
+        return menu_overrides.get(name) if menu_overrides else None
+
+    def resolve(self, key, name):
+        """A new Ingredient with the values menu `key` has for `name`."""
+        ingredient = self.entries[name].copy()
+        override = self.override(key, name)
+        if override:
+            for field, value in override.items():
+                setattr(ingredient, field, dict(value) if field == 'extra' and value else value)
+        return ingredient
+
+    def set(self, key, name, ingredient):
+        """Record the values menu `key` has for `name`, keeping only the fields that differ from the canonical entry."""
+        canonical = _fields(self.entries[name])
+        override = {field: value for field, value in _fields(ingredient).items()
+                    if canonical[field] != value or type(canonical[field]) is not type(value)}
+        menu_overrides = self.overrides.setdefault(key, {})
+        if override:
+            menu_overrides[name] = override
+        else:
+            menu_overrides.pop(name, None)
+            if not menu_overrides:
+                del self.overrides[key]
+
+    def apply_to(self, key, menu):
+        """
+        Write the catalog's values onto the ingredients menu `key` still lists, in place.
+        Ingredients the menu no longer has are not re-added. Returns the number changed.
+        """
+        changed = 0
+        for name in self.menus.get(key, ()):
+            ingredient = menu.ingredients.get(name)
+            if ingredient is None:
+                continue
+            # Only overridden ingredients need a resolved copy
+            resolved = self.resolve(key, name) if self.override(key, name) else self.entries[name]
+            if _value_key(resolved) != _value_key(ingredient):
+                _copy_values(resolved, ingredient)
+                changed += 1
+        return changed
+
+    def update(self, function):
+        """
+        Run function(name, ingredient) once per canonical entry and once per distinct overridden
+        variant, in place, instead of once per menu copy. Overrides are recomputed against the
+        updated entries, so a variant the update makes canonical stops being an override.
+        Returns the number of function calls.
+        """
+        calls = 0
+        overridden = {}
+        for key, menu_overrides in self.overrides.items():
+            for name in menu_overrides:
+                overridden.setdefault(name, []).append(key)
+        for name, canonical in self.entries.items():
+            # Resolve variants against the entry as it was before the update
+            variants = {}
+            for key in overridden.get(name, ()):
+                ingredient = self.resolve(key, name)
+                variants.setdefault(_value_key(ingredient), (ingredient, []))[1].append(key)
+            function(name, canonical)
+            calls += 1
+            for ingredient, keys in variants.values():
+                function(name, ingredient)
+                calls += 1
+                for key in keys:
+                    self.set(key, name, ingredient)
+        return calls
+
+    def to_dict(self):
+        return {
+            'version': CATALOG_VERSION,
+            'ingredients': {name: ingredient.to_dict() for name, ingredient in self.entries.items()},
+            'menus': self.menus,
+            'overrides': self.overrides,
+            'sources': self.sources,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        catalog = cls()
+        if data.get('version') != CATALOG_VERSION:
+            raise ValueError(f"Unsupported catalog version {data.get('version')!r}")
+        catalog.entries = {name: Ingredient.from_dict(name, ingredient)
+                           for name, ingredient in data.get('ingredients', {}).items()}
+        catalog.menus = {key: list(names) for key, names in data.get('menus', {}).items()}
+        catalog.overrides = {key: dict(menu_overrides) for key, menu_overrides in data.get('overrides', {}).items()}
+        catalog.sources = dict(data.get('sources', {}))
+        return catalog
+
+
+def update_distinct(menus, function):
+    """
+    Run function(name, ingredient) over the initialIngredients of every menu in place, once per
+    distinct name and values instead of once per copy: later identical copies get the values the
+    first one was updated to. The in-memory counterpart of IngredientCatalog.update, without the
+    cost of building a catalog for names only one menu lists. Returns the number of function calls.
+    """
+    listed = Counter(name for menu in menus.values() for name in menu.ingredients)
+    updated = {}
+    calls = 0
+    for menu in menus.values():
+        for name, ingredient in menu.ingredients.items():
+            if listed[name] > 1:
+                value = (name, _value_key(ingredient))
+                first = updated.get(value)
+                if first is not None:
+                    _copy_values(first, ingredient)
+                    continue
+                updated[value] = ingredient
+            function(name, ingredient)
+            calls += 1
+    return calls
+
+
+def load_catalog(file_path):
+    with open(file_path, 'r') as f:
+        return IngredientCatalog.from_dict(json.load(f))
+
+
+def save_catalog(file_path, catalog):
+    write_atomic(file_path, json.dumps(catalog.to_dict(), separators=(',', ':')))
+
+
+def document_hash(menus):
+    """Content hash of a loaded menu document, to tell whether it changed since a catalog was built."""
+    return content_hash(menus_to_dict(menus))
+
+
+def build_group_catalog(file_paths):
+    """Catalog of every menu of every menu file, keyed by menu_key(file, menu)."""
+    menus = {}
+    sources = {}
+    for file_path in file_paths:
+        document = open_store(file_path).load()
+        sources[file_path] = document_hash(document)
+        for menu_name, menu in document.items():
+            menus[menu_key(file_path, menu_name)] = menu
+    catalog = IngredientCatalog.from_menus(menus)
+    catalog.sources = sources
+    return catalog
+
+
+def apply_group_catalog(catalog, file_paths=None, compact=False):
+    """
+    Write the catalog's values into the menu files it covers (or just `file_paths`), each under
+    its lock. A file whose content changed since the catalog was built is left alone: writing
+    the catalog over it would revert its edits and skip the ingredients it gained. Files with
+    nothing to change are not rewritten; written files get their new hash recorded, so the
+    catalog can be updated and applied again. Returns (file -> ingredients changed, changed files).
+    """
+    by_file = {}
+    for key in catalog.menus:
+        file_path, menu_name = split_menu_key(key)
+        by_file.setdefault(file_path, []).append((key, menu_name))
+    changed = {}
+    stale = []
+    for file_path in (file_paths if file_paths is not None else by_file):
+        store = open_store(file_path, compact)
+        with store.locked():
+            menus = store.load()
+            if document_hash(menus) != catalog.sources.get(file_path):
+                stale.append(file_path)
+                continue
+            changed[file_path] = sum(catalog.apply_to(key, menus[menu_name])
+                                     for key, menu_name in by_file.get(file_path, ()) if menu_name in menus)
+            if changed[file_path]:
+                store.save(menus)
+                catalog.sources[file_path] = document_hash(menus)
+    return changed, stale
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Share one canonical ingredient catalog between many menus and sites.")
+    parser.add_argument('--catalog-file', required=True, help="group ingredient catalog (.json)")
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    build = subcommands.add_parser('build', help="build the catalog from menu files")
+    build.add_argument('paths', nargs='+', help="menu files or directories to search for menu files")
+    update = subcommands.add_parser('update-costs', help="apply a supplier price list to the catalog once")
+    update.add_argument('--price-file', help="CSV price list to import (default: the embedded csv_data)")
+    update.add_argument('--prefer', action='append', metavar='SUPPLIER',
+                        help="preferred supplier, in order of preference (repeatable); default is cheapest")
+    apply = subcommands.add_parser('apply', help="write the catalog's ingredient values into the menu files")
+    apply.add_argument('paths', nargs='*',
+                       help="only these menu files or directories (default: every file in the catalog)")
+    apply.add_argument('--compact', action='store_true', help="save JSON documents without indentation")
+    subcommands.add_parser('show', help="print the size of the catalog")
+    args = parser.parse_args(argv)
+
+    # Imported here: multisite imports the pipeline, whose update_ingredients stage uses this module
+    from multisite import discover_menu_files
+    file_paths = [path for root in getattr(args, 'paths', None) or () for path in discover_menu_files(root)]
+    if args.command == 'build':
+        catalog = build_group_catalog(file_paths)
+        save_catalog(args.catalog_file, catalog)
+    else:
+        if not os.path.exists(args.catalog_file):
+            parser.exit(1, f"No catalog at {args.catalog_file}; run build first\n")
+        catalog = load_catalog(args.catalog_file)
+
+    if args.command == 'update-costs':
+        # Imported here: the embedded price list is only needed to update costs
+        from update_ingredients import apply_price, build_price_index
+        price_index = build_price_index(args.price_file, args.prefer)
+        calls = catalog.update(lambda name, ingredient: apply_price(name, ingredient, price_index))
+        save_catalog(args.catalog_file, catalog)
+        print(f"Priced {calls} distinct ingredient(s) for {catalog.copies()} menu entries")
+    elif args.command == 'apply':
+        changed, stale = apply_group_catalog(catalog, file_paths or None, args.compact)
+        save_catalog(args.catalog_file, catalog)
+        print(f"Updated {sum(changed.values())} ingredient(s) in {sum(1 for count in changed.values() if count)} "
+              f"of {len(changed)} menu file(s)")
+        if stale:
+            parser.exit(1, f"Not applied to {len(stale)} menu file(s) changed since the catalog was built "
+                        f"(rebuild it and update costs again): {', '.join(stale)}\n")
+    else:
+        print(f"{len(catalog)} canonical ingredient(s) for {catalog.copies()} menu entries in "
+              f"{len(catalog.menus)} menu(s), {catalog.override_count()} override(s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import json
+import os
+
+# JSON config file read when MENU_TOOLS_CONFIG does not name one, relative to the working directory
+DEFAULT_CONFIG_FILE = 'menu_tools.json'
+
+CONFIG_ENV = 'MENU_TOOLS_CONFIG'
+
+# Prefix of environment variables overriding single settings, e.g. MENU_TOOLS_MENU_FILE
+SETTING_ENV_PREFIX = 'MENU_TOOLS_'
+
+_config = None
+
+
+def config_path():
+    """The config file in effect: $MENU_TOOLS_CONFIG, else menu_tools.json if it exists, else None."""
+    path = os.environ.get(CONFIG_ENV)
+    if path:
+        return path
+    return DEFAULT_CONFIG_FILE if os.path.exists(DEFAULT_CONFIG_FILE) else None
+
+
+def load_config():
+    """The settings of the config file in effect, read once per process. {} if there is none."""
+    global _config
+    if _config is None:
+        path = config_path()
+        if path is None:
+            _config = {}
+        else:
+            with open(path, 'r') as f:
+                _config = json.load(f)
+            if not isinstance(_config, dict):
+                raise ValueError(f"{path}: expected a JSON object of settings")
+    return _config
+
+
+def setting(name, default=None):
+    """
+    Value of a setting such as 'menu_file', used as the default of the matching command-line
+    option: $MENU_TOOLS_<NAME> if set, else the config file's value, else `default`.
+    """
+    value = os.environ.get(SETTING_ENV_PREFIX + name.upper())
+    if value is not None:
+        return value
+    return load_config().get(name, default)
@@ -1,247 +1,345 @@
+import argparse
 import json
 import logging
+import os
 import re
-from fuzzywuzzy import fuzz
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+from config import setting
+from instrumentation import Metrics
+from match_cache import load_match_cache, match_cache_path_for, prune_for_menus, save_match_cache
+from menu_model import atomic_writer
+from menu_store import open_store
+from parallel_matching import best_matches
+from resale_matcher import ResaleMatcher
+from units import DEFAULT_DRINK_VOLUME_ML, cost_per_bulk, parse_pack_size
+from validation import CORRECT_RESALE_PRICES_RULES, EXPECTED_COST_RANGES, MAX_RESALE_PRICES, PER_UNIT_CATEGORIES, validate_menus
 
-# Categories for unit and cost handling
-SOLID_CATEGORIES = ['Proteins', 'Vegetables', 'Fruits', 'Grains', 'Nuts and Seeds', 'Baking Supplies', 'Sweeteners']
-LIQUID_CATEGORIES = ['Beverages', 'Soft Drinks', 'Beers & Ciders', 'White Wines', 'Red Wines', 'Rose Wines', 'Sparkling Wines', 'Cocktails', 'Hot Drinks', 'Liqueur Coffees', 'Oils and Vinegars']
-PER_UNIT_CATEGORIES = ['Beverages', 'Soft Drinks', 'Beers & Ciders', 'White Wines', 'Red Wines', 'Rose Wines', 'Sparkling Wines', 'Cocktails', 'Hot Drinks', 'Liqueur Coffees']
+MENU_FILE_PATH = 'server/menus.json'
+REPORT_FILE_PATH = 'server/price_correction_report.json'
 
-# Reasonable cost ranges per unit based on category
-COST_RANGES = {
-    'g': (0.001, 0.01),    # e.g., £1–£10 per kg for solids
-    'ml': (0.001, 0.005),   # e.g., £1–£5 per L for liquids
-    'unit': (0.50, 5.00)    # e.g., £0.50–£5 per item (e.g., bottle, egg)
-}
+# Per-item messages are logged at DEBUG with lazy %-formatting; enable them with --verbose
+logger = logging.getLogger(__name__)
+
+# Categories, expected cost ranges and price limits are declared once in validation
+COST_RANGES = EXPECTED_COST_RANGES
 
 # Maximum reasonable prices for resale items
-MAX_PRICE_PER_ITEM = 10  # For beverages (per bottle)
-MAX_PRICE_PER_KG_L = 50  # For bulk items (per kg/L)
+MAX_PRICE_PER_ITEM, MAX_PRICE_PER_KG_L = MAX_RESALE_PRICES['fuzzy']  # Per bottle, per kg/L
 
 def load_menu_data(file_path):
     """Load menu data from JSON file."""
     try:
-        with open(file_path, 'r') as f:
-            return json.load(f)
+        return open_store(file_path).load()
     except Exception as e:
-        logging.error(f"Error loading menu data: {e}")
+        logger.error("Error loading menu data: %s", e)
         return None
 
 def save_menu_data(file_path, data):
     """Save menu data to JSON file."""
     try:
-        with open(file_path, 'w') as f:
-            json.dump(data, f, indent=2)
-        logging.info("Menu data saved successfully.")
+        open_store(file_path).save(data)
+        logger.info("Menu data saved successfully.")
     except Exception as e:
-        logging.error(f"Error saving menu data: {e}")
+        logger.error("Error saving menu data: %s", e)
 
 def save_report(file_path, report):
     """Save error report to JSON file."""
     try:
-        with open(file_path, 'w') as f:
+        with atomic_writer(file_path) as f:
             json.dump(report, f, indent=2)
-        logging.info("Error report saved successfully.")
+        logger.info("Error report saved successfully.")
     except Exception as e:
-        logging.error(f"Error saving report: {e}")
-
-def determine_unit_and_cost_range(category):
-    """Determine the expected unit and cost range based on category."""
-    if category in SOLID_CATEGORIES:
-        return 'g', COST_RANGES['g']
-    elif category in LIQUID_CATEGORIES:
-        return 'ml', COST_RANGES['ml']
-    else:
-        return 'unit', COST_RANGES['unit']
-
-def correct_ingredient_data(ingredient_name, ingredient_data):
-    """Validate and correct the ingredient data (cost, unit, category)."""
-    # Ensure all required fields exist
-    if 'cost' not in ingredient_data or 'unit' not in ingredient_data:
-        logging.warning(f"Ingredient '{ingredient_name}' missing cost or unit. Skipping.")
-        return None
-    if 'category' not in ingredient_data:
-        ingredient_data['category'] = 'Uncategorized'
-        logging.info(f"Set category for '{ingredient_name}' to 'Uncategorized'")
-
-    cost = ingredient_data['cost']
-    unit = ingredient_data['unit']
-    category = ingredient_data['category']
-
-    # Determine expected unit and cost range based on category
-    expected_unit, (min_cost, max_cost) = determine_unit_and_cost_range(category)
-
-    # Correct unit if mismatched
-    if unit not in ['g', 'ml', 'unit']:
-        logging.info(f"Corrected unit for '{ingredient_name}' from '{unit}' to '{expected_unit}' based on category '{category}'")
-        ingredient_data['unit'] = expected_unit
-        unit = expected_unit
-
-    # Correct cost if out of range
-    if cost < min_cost or cost > max_cost:
-        # Try dividing by 1000, 100, etc., to correct decimal place errors
-        corrected_cost = cost
-        divisors = [1000, 100, 10]
-        for divisor in divisors:
-            corrected_cost = cost / divisor
-            if min_cost <= corrected_cost <= max_cost:
-                logging.info(f"Corrected cost for '{ingredient_name}' from {cost} to {corrected_cost} per {unit}")
-                ingredient_data['cost'] = corrected_cost
-                break
-        else:
-            logging.warning(f"Cost for '{ingredient_name}' ({cost} per {unit}) out of range [{min_cost}, {max_cost}] even after correction. Skipping.")
-            return None
+        logger.error("Error saving report: %s", e)
 
-    return ingredient_data
+def match_parameters(category):
+    """(threshold, partial) of fuzzy matching for a resale item category."""
+    # Exact or near-exact match for beverages
+    if category in PER_UNIT_CATEGORIES:
+        return 95, False
+    return 85, True
 
-def match_ingredient_to_resale_item(resale_item_name, ingredients, category):
+def fuzzy_queries(menu_name, items, matcher, changes=None, match_cache=None):
+    """
+    The distinct best_match arguments (query, threshold, partial, exclude) that
+    match_ingredient_to_resale_item will score for the resale items of one menu: items settled
+    by an accepted override, by name resolution or by a cached decision need none.
+    """
+    queries = {}
+    for item in items:
+        if item.has_recipe or (changes is not None and not changes.item_dirty(menu_name, item)):
+            continue
+        name = item.name or ''
+        category = item.category or ''
+        exclude = ()
+        if match_cache is not None:
+            override = match_cache.override(name, category)
+            if override is not None:
+                if override['accepted'] is not None and override['accepted'] in matcher.names:
+                    continue
+                exclude = tuple(override['rejected'])
+        if matcher.resolve(name, exclude) is not None:
+            continue
+        if match_cache is not None and match_cache.contains(name, category, matcher.fingerprint):
+            continue
+        threshold, partial = match_parameters(category)
+        queries.setdefault((name, threshold, partial, exclude), None)
+    return list(queries)
+
+def match_ingredient_to_resale_item(resale_item_name, ingredients, category, match_cache=None):
     """
     Match a resale item name to an ingredient name with strict matching for beverages.
+    `ingredients` is a ResaleMatcher built once per menu, or an iterable of ingredient names.
+    Names that resolve to an ingredient up to case, camelCase, punctuation, plurals and
+    dietary suffixes are matched in O(1) without fuzzy scoring.
+    With a match_cache.MatchCache, earlier decisions against the same ingredient names are
+    reused and manual overrides are applied.
     Returns the matched ingredient name or None if no match is found.
     """
-    threshold = 95 if category in PER_UNIT_CATEGORIES else 85
-    best_match = None
-    best_score = 0
-
-    for ingredient_name in ingredients:
-        # Exact or near-exact match for beverages
-        if category in PER_UNIT_CATEGORIES:
-            score = fuzz.ratio(resale_item_name.lower(), ingredient_name.lower())
-        else:
-            score = fuzz.partial_ratio(resale_item_name.lower(), ingredient_name.lower())
-
-        if score > best_score and score >= threshold:
-            best_score = score
-            best_match = ingredient_name
+    if not isinstance(ingredients, ResaleMatcher):
+        ingredients = ResaleMatcher(ingredients)
+    override = match_cache.override(resale_item_name, category) if match_cache is not None else None
+    if override is not None and override['accepted'] is not None and override['accepted'] in ingredients.names:
+        logger.debug("Matched resale item '%s' to ingredient '%s' by accepted override",
+                     resale_item_name, override['accepted'])
+        return override['accepted']
+    resolved = ingredients.resolve(resale_item_name, override['rejected'] if override is not None else ())
+    if resolved is not None:
+        logger.debug("Matched resale item '%s' to ingredient '%s' by name", resale_item_name, resolved)
+        return resolved
+    cached = match_cache.get(resale_item_name, category, ingredients.fingerprint) if match_cache is not None else None
+    if cached is not None:
+        best_match, best_score = cached
+    else:
+        threshold, partial = match_parameters(category)
+        best_match, best_score = ingredients.best_match(
+            resale_item_name, threshold, partial=partial,
+            exclude=override['rejected'] if override is not None else ())
+        if match_cache is not None:
+            match_cache.put(resale_item_name, category, ingredients.fingerprint, best_match, best_score)
 
     if best_match:
-        logging.info(f"Matched resale item '{resale_item_name}' to ingredient '{best_match}' with score {best_score}")
+        logger.debug("Matched resale item '%s' to ingredient '%s' with score %s", resale_item_name, best_match, best_score)
     else:
-        logging.warning(f"No match found for resale item '{resale_item_name}' (category: {category})")
+        logger.debug("No match found for resale item '%s' (category: %s)", resale_item_name, category)
     return best_match
 
-def update_resale_item_prices(menu_data):
+def resale_buying_price(resale_item_name, category, cost, unit):
     """
-    Update buyingPrice of resale items (hasRecipe: false) based on ingredient prices.
-    Corrects errors in ingredient data and generates an error report.
-    Returns the updated menu data and error report.
+    Buying price of a resale item from the cost of its matched ingredient (per g, ml or unit).
+    Returns (price, max_price): per bottle for PER_UNIT_CATEGORIES, per kg/L otherwise, and the
+    largest price considered reasonable for the category.
+    """
+    adjusted_price = cost
+    if category in PER_UNIT_CATEGORIES:
+        # For beverages, assume cost is per ml and calculate per bottle
+        if unit == 'ml':
+            pack = parse_pack_size(resale_item_name)
+            if pack is None:
+                volume_ml = DEFAULT_DRINK_VOLUME_ML
+                logger.debug("No pack size in '%s', using default %sml", resale_item_name, volume_ml)
+            else:
+                volume_ml = pack.total_ml
+            adjusted_price = cost * volume_ml  # Cost per ml * total ml
+            logger.debug("Calculated cost for '%s' as %s * %sml = %s", resale_item_name, cost, volume_ml, adjusted_price)
+        else:
+            # If unit is not ml, assume cost is per bottle (unit)
+            adjusted_price = cost
+            logger.debug("Assumed cost for '%s' as %s per bottle (unit)", resale_item_name, cost)
+    elif unit in ['g', 'ml']:
+        adjusted_price, bulk_unit = cost_per_bulk(cost, unit)  # Convert cost per g/ml to cost per kg/L
+        logger.debug("Converted cost from %s per %s to %s per %s", cost, unit, adjusted_price, bulk_unit)
+
+    max_price = MAX_PRICE_PER_ITEM if category in PER_UNIT_CATEGORIES else MAX_PRICE_PER_KG_L
+    return adjusted_price, max_price
+
+def reprice_resale_item(menu_name, item, matcher, ingredients, error_report, metrics, match_cache=None):
+    """
+    Match one resale item to an ingredient and update its buyingPrice, recording the outcome
+    on the error report and metrics. Returns the matched ingredient name or None.
     """
-    error_report = {
+    resale_item_name = item.name or ''
+    category = item.category or ''
+    matched_ingredient = match_ingredient_to_resale_item(resale_item_name, matcher, category, match_cache)
+    if metrics.tracing():
+        metrics.add_trace(menu=menu_name, item=resale_item_name, category=category,
+                          matched=matched_ingredient, old_buying_price=item.buying_price)
+
+    if not matched_ingredient:
+        metrics.count('unmatched')
+        error_report['mismatched_items'].append(resale_item_name)
+        logger.debug("Could not update price for '%s': No matching ingredient found.", resale_item_name)
+        return None
+
+    ingredient_data = ingredients[matched_ingredient]
+    cost = ingredient_data.cost  # Cost per base unit (g, ml, unit)
+    unit = ingredient_data.unit
+    logger.debug("Ingredient '%s' for '%s' (category: %s): cost=%s per %s",
+                 matched_ingredient, resale_item_name, category, cost, unit)
+
+    # Adjust price based on unit and category
+    adjusted_price, max_price = resale_buying_price(resale_item_name, category, cost, unit)
+
+    # Check for anomalies: cap the price at a reasonable maximum
+    if adjusted_price > max_price:
+        metrics.count('anomalous')
+        logger.debug("Skipping update for '%s': Adjusted price £%.5f exceeds maximum reasonable price £%s.",
+                     resale_item_name, adjusted_price, max_price)
+        error_report['uncorrectable_items'].append({
+            "item": resale_item_name,
+            "adjusted_price": adjusted_price,
+            "max_allowed": max_price
+        })
+        return matched_ingredient
+
+    # Update buyingPrice
+    metrics.count('matched')
+    item.buying_price = adjusted_price
+    logger.debug("Updated '%s' buyingPrice to £%.5f", resale_item_name, adjusted_price)
+    return matched_ingredient
+
+def correct_ingredients(menu_data, error_report, metrics, include=None):
+    """
+    Validate and correct the cost, unit and category of every ingredient (or those
+    include(menu, name) accepts) against CORRECT_RESALE_PRICES_RULES, in place. Uncorrectable
+    ingredients are deleted; skips and corrected costs are recorded on the error report.
+    Returns the names of the menus that lost ingredients.
+    """
+    result = validate_menus(menu_data, CORRECT_RESALE_PRICES_RULES, include)
+    table = result.table
+    for row in result.rows(action='drop').tolist():
+        metrics.count('skipped')
+        error_report['skipped_ingredients'].append(table.names[row])
+    for row in result.rows(rule='expected_cost', action='correct').tolist():
+        metrics.count('corrected')
+        error_report['corrected_costs'].append({
+            "ingredient": table.names[row],
+            "original_cost": table.ingredients[row].cost,
+            "corrected_cost": float(result.columns['cost'][row]),
+            "unit": result.columns['unit'][row]
+        })
+    return result.apply(menu_data)
+
+def new_error_report():
+    return {
         "mismatched_items": [],
         "skipped_ingredients": [],
         "corrected_costs": [],
         "uncorrectable_items": []
     }
 
+def update_resale_item_prices(menu_data, changes=None, metrics=None, match_cache=None, match_workers=1):
+    """
+    Update buyingPrice of resale items (hasRecipe: false) based on ingredient prices.
+    Corrects errors in ingredient data and generates an error report.
+    With a manifest.ChangeSet, only dirty ingredients are corrected and only resale items
+    that are dirty or depend on a dirty ingredient are rematched; matches are recorded on it.
+    Stage timings, counters and sampled item traces are recorded on `metrics` if given.
+    Fuzzy match decisions are reused from and recorded on `match_cache` if given.
+    With match_workers > 1 the fuzzy matching of every menu is first spread over that many
+    processes (parallel_matching); the results are the same as matching serially.
+    Ingredients and items are corrected in place. Returns the updated menu data and error report.
+    """
+    if metrics is None:
+        metrics = Metrics('correct_resale_prices')
+    error_report = new_error_report()
+
+    # Correct the ingredient data of every menu in one vectorized pass, dropping uncorrectable ingredients
+    with metrics.stage('correct_ingredients'):
+        touched = correct_ingredients(menu_data, error_report, metrics,
+                                      changes.ingredient_dirty if changes is not None else None)
+        if changes is not None:
+            for menu_name in touched:
+                changes.mark_names_changed(menu_name)
+
+    with metrics.stage('index_ingredients'):
+        matchers = {menu_name: ResaleMatcher(menu.ingredients) for menu_name, menu in menu_data.items()}
+
+    if match_workers > 1:
+        with metrics.stage('parallel_match'):
+            queries = {menu_name: fuzzy_queries(menu_name, menu.items, matchers[menu_name], changes, match_cache)
+                       for menu_name, menu in menu_data.items()}
+            metrics.count('parallel_queries', sum(len(menu_queries) for menu_queries in queries.values()))
+            for menu_name, results in best_matches(matchers, queries, match_workers).items():
+                matcher = matchers[menu_name]
+                for query, result in zip(queries[menu_name], results):
+                    matcher.prime(*query, result)
+
     for menu_name, menu in menu_data.items():
-        ingredients = menu.get('initialIngredients', {})
-        items = menu.get('items', [])
-
-        # Correct ingredient data
-        corrected_ingredients = {}
-        for ingredient_name, ingredient_data in ingredients.items():
-            corrected_data = correct_ingredient_data(ingredient_name, ingredient_data.copy())
-            if corrected_data:
-                corrected_ingredients[ingredient_name] = corrected_data
-                if corrected_data['cost'] != ingredient_data['cost']:
-                    error_report['corrected_costs'].append({
-                        "ingredient": ingredient_name,
-                        "original_cost": ingredient_data['cost'],
-                        "corrected_cost": corrected_data['cost'],
-                        "unit": corrected_data['unit']
-                    })
-            else:
-                error_report['skipped_ingredients'].append(ingredient_name)
-
-        menu_data[menu_name]['initialIngredients'] = corrected_ingredients
-        ingredients = corrected_ingredients
-
-        updated_items = []
-        for item in items:
-            if item.get('hasRecipe', False):
-                # Skip recipe items
-                updated_items.append(item)
-                continue
-
-            # This is a resale item (hasRecipe: false)
-            resale_item_name = item.get('name', '')
-            category = item.get('category', '')
-            matched_ingredient = match_ingredient_to_resale_item(resale_item_name, ingredients.keys(), category)
-
-            if matched_ingredient:
-                ingredient_data = ingredients[matched_ingredient]
-                cost = ingredient_data['cost']  # Cost per base unit (g, ml, unit)
-                unit = ingredient_data['unit']
-                logging.info(f"Ingredient '{matched_ingredient}' for '{resale_item_name}' (category: {category}): cost={cost} per {unit}")
-
-                # Adjust price based on unit and category
-                adjusted_price = cost
-                if category in PER_UNIT_CATEGORIES:
-                    # For beverages, assume cost is per ml and calculate per bottle
-                    volume_ml = 275  # Default volume for drinks
-                    if 'ml' in resale_item_name.lower():
-                        try:
-                            volume_ml = float(''.join(filter(str.isdigit, resale_item_name.split('ml')[0].split()[-1])))
-                        except (IndexError, ValueError):
-                            logging.warning(f"Could not parse volume for '{resale_item_name}', using default {volume_ml}ml")
-                    if unit == 'ml':
-                        adjusted_price = cost * volume_ml  # Cost per ml * total ml
-                        logging.info(f"Calculated cost for '{resale_item_name}' as {cost} * {volume_ml}ml = {adjusted_price}")
-                    else:
-                        # If unit is not ml, assume cost is per bottle (unit)
-                        adjusted_price = cost
-                        logging.info(f"Assumed cost for '{resale_item_name}' as {cost} per bottle (unit)")
-                elif unit in ['g', 'ml']:
-                    adjusted_price = cost * 1000  # Convert cost per g/ml to cost per kg/L
-                    logging.info(f"Converted cost from {cost} per {unit} to {adjusted_price} per {'kg' if unit == 'g' else 'L'}")
-
-                # Check for anomalies: cap the price at a reasonable maximum
-                max_price = MAX_PRICE_PER_ITEM if category in PER_UNIT_CATEGORIES else MAX_PRICE_PER_KG_L
-                if adjusted_price > max_price:
-                    logging.warning(f"Skipping update for '{resale_item_name}': Adjusted price £{adjusted_price:.5f} exceeds maximum reasonable price £{max_price}.")
-                    error_report['uncorrectable_items'].append({
-                        "item": resale_item_name,
-                        "adjusted_price": adjusted_price,
-                        "max_allowed": max_price
-                    })
-                    updated_items.append(item)
-                    continue
+        ingredients = menu.ingredients
+        matcher = matchers[menu_name]
 
-                # Update buyingPrice
-                item['buyingPrice'] = adjusted_price
-                logging.info(f"Updated '{resale_item_name}' buyingPrice to £{adjusted_price:.5f}")
-            else:
-                error_report['mismatched_items'].append(resale_item_name)
-                logging.warning(f"Could not update price for '{resale_item_name}': No matching ingredient found.")
+        with metrics.stage('update_resale_items'):
+            for item in menu.items:
+                if item.has_recipe:
+                    # Skip recipe items
+                    continue
 
-            updated_items.append(item)
+                if changes is not None and not changes.item_dirty(menu_name, item):
+                    continue
 
-        # Update the menu with the modified items
-        menu_data[menu_name]['items'] = updated_items
+                # This is a resale item (hasRecipe: false)
+                matched_ingredient = reprice_resale_item(menu_name, item, matcher, ingredients, error_report, metrics,
+                                                         match_cache)
+                if changes is not None:
+                    changes.record_match(menu_name, item, matched_ingredient)
 
     return menu_data, error_report
 
-def main():
-    file_path = '/Users/m/Programming/LOCAL/RestaurantProfitPro/server/menus.json'
-    report_path = '/Users/m/Programming/LOCAL/RestaurantProfitPro/server/price_correction_report.json'
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Correct ingredient costs and update resale item buying prices.")
+    parser.add_argument('--menu-file', default=setting('menu_file', MENU_FILE_PATH),
+                        help="menu document (.json) or SQLite store (.db) to update")
+    parser.add_argument('--report-file', default=REPORT_FILE_PATH, help="where to write the price correction report")
+    parser.add_argument('--verbose', action='store_true', help="log every ingredient and item processed")
+    parser.add_argument('--metrics-file', help="append this run's JSON metrics record to this file "
+                        "(default: print it)")
+    parser.add_argument('--trace-rate', type=float, default=0.0,
+                        help="fraction of resale items whose details are kept in the metrics record")
+    parser.add_argument('--match-cache', help="fuzzy match decision cache (default: <menu-file>.matches.json)")
+    parser.add_argument('--no-match-cache', action='store_true', help="rematch every resale item from scratch")
+    parser.add_argument('--match-workers', type=int, default=1,
+                        help="processes to spread fuzzy matching over (default: 1, match serially; 0: one per CPU)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO,
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+    metrics = Metrics('correct_resale_prices', trace_rate=args.trace_rate)
+    match_workers = args.match_workers or os.cpu_count() or 1
+
+    file_path = args.menu_file
+    report_path = args.report_file
+    cache_path = args.match_cache or match_cache_path_for(file_path)
     
-    # Load menu data
-    menu_data = load_menu_data(file_path)
-    if not menu_data:
-        return
-
-    # Update resale item prices and generate error report
-    updated_menu_data, error_report = update_resale_item_prices(menu_data)
-
-    # Save updated menu data
-    save_menu_data(file_path, updated_menu_data)
+    with open_store(file_path).locked():
+        # Load menu data
+        with metrics.stage('load'):
+            menu_data = load_menu_data(file_path)
+        if not menu_data:
+            return
+
+        match_cache = None if args.no_match_cache else load_match_cache(cache_path)
+
+        # Update resale item prices and generate error report
+        updated_menu_data, error_report = update_resale_item_prices(menu_data, metrics=metrics,
+                                                                    match_cache=match_cache,
+                                                                    match_workers=match_workers)
+
+        # Save updated menu data
+        with metrics.stage('save'):
+            save_menu_data(file_path, updated_menu_data)
+        if match_cache is not None:
+            metrics.count('match_cache_hits', match_cache.hits)
+            metrics.count('match_cache_misses', match_cache.misses)
+            prune_for_menus(match_cache, updated_menu_data)
+            save_match_cache(cache_path, match_cache)
 
     # Save error report
     save_report(report_path, error_report)
 
+    if args.metrics_file:
+        metrics.write(args.metrics_file)
+    else:
+        print(json.dumps(metrics.to_record()))
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
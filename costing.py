@@ -0,0 +1,140 @@
+import argparse
+import json
+
+import numpy as np
+
+from config import setting
+from menu_model import MENU_FILE_PATH, atomic_writer
+from menu_store import open_store
+from units import costs_to_base
+
+# Profit margin bands, mirroring getProfitMarginColor in client/src/utils/menuUtils.ts:
+# red below 60%, orange up to 70%, yellow up to 80%, green above
+MARGIN_BANDS = ('red', 'orange', 'yellow', 'green')
+MARGIN_THRESHOLDS = (60, 70, 80)
+
+
+class MenuCosting:
+    """Per-item cost, profit margin and margin band of one menu, as parallel arrays."""
+    __slots__ = ('names', 'has_recipe', 'selling_prices', 'costs', 'margins', 'band_indices')
+
+    def __init__(self, names, has_recipe, selling_prices, costs, margins, band_indices):
+        self.names = names
+        self.has_recipe = has_recipe
+        self.selling_prices = selling_prices
+        self.costs = costs
+        self.margins = margins
+        self.band_indices = band_indices
+
+    @property
+    def bands(self):
+        return [MARGIN_BANDS[i] for i in self.band_indices]
+
+    def __len__(self):
+        return len(self.names)
+
+
+def ingredient_cost_vector(ingredients):
+    """
+    Return (index, costs): ingredient name -> column, and the cost per g/ml/unit of each
+    ingredient with kg/L costs divided down to base units.
+    """
+    index = {name: column for column, name in enumerate(ingredients)}
+    costs = [ingredient.cost or 0 for ingredient in ingredients.values()]
+    return index, costs_to_base(costs, [ingredient.unit for ingredient in ingredients.values()])
+
+
+def recipe_matrix(items, index):
+    """
+    Return the sparse item x ingredient quantity matrix of the recipe items as COO arrays
+    (rows, columns, quantities). Recipe lines naming unknown ingredients are dropped,
+    as calculateRecipeCost does.
+    """
+    rows = []
+    columns = []
+    quantities = []
+    for row, item in enumerate(items):
+        if not item.has_recipe or not item.ingredients:
+            continue
+        for name, quantity in item.ingredients.items():
+            column = index.get(name)
+            if column is not None:
+                rows.append(row)
+                columns.append(column)
+                quantities.append(quantity)
+    return (np.array(rows, dtype=np.intp), np.array(columns, dtype=np.intp),
+            np.array(quantities, dtype=float))
+
+
+def profit_margins(selling_prices, costs):
+    """Profit margin in percent, rounded to 2 places like calculateProfitMargin; 0 for free items."""
+    margins = np.zeros(len(selling_prices))
+    priced = selling_prices > 0
+    margins[priced] = (selling_prices[priced] - costs[priced]) / selling_prices[priced] * 100
+    return np.round(margins, 2)
+
+
+def margin_band_indices(margins):
+    """Index into MARGIN_BANDS for each margin."""
+    low, mid, high = MARGIN_THRESHOLDS
+    return ((margins >= low).astype(np.int8) + (margins > mid) + (margins > high)).astype(np.int8)
+
+
+def cost_menu(menu):
+    """
+    Cost every item of a menu in one pass. Recipe items cost the sum of quantity x base-unit
+    cost x costMultiplier; resale items cost their buyingPrice, and score a 0% margin without one,
+    as on the Analysis page.
+    """
+    items = menu.items
+    index, cost_vector = ingredient_cost_vector(menu.ingredients)
+    rows, columns, quantities = recipe_matrix(items, index)
+    multiplier = menu.cost_multiplier if menu.cost_multiplier is not None else 1
+
+    has_recipe = np.array([bool(item.has_recipe) for item in items], dtype=bool)
+    selling_prices = np.array([item.selling_price or 0 for item in items], dtype=float)
+    buying_prices = np.array([item.buying_price or 0 for item in items], dtype=float)
+
+    recipe_costs = np.bincount(rows, weights=quantities * cost_vector[columns], minlength=len(items)) * multiplier
+    costs = np.where(has_recipe, recipe_costs, buying_prices)
+    margins = profit_margins(selling_prices, costs)
+    margins[~has_recipe & (buying_prices == 0)] = 0
+    return MenuCosting([item.name for item in items], has_recipe, selling_prices, costs, margins,
+                       margin_band_indices(margins))
+
+
+def cost_menus(menus):
+    """Cost every menu of a document. Returns menu name -> MenuCosting."""
+    return {name: cost_menu(menu) for name, menu in menus.items()}
+
+
+def margin_summary(costings):
+    """Per menu: item count, average margin and the number of items in each margin band."""
+    summary = {}
+    for name, costing in costings.items():
+        counts = np.bincount(costing.band_indices, minlength=len(MARGIN_BANDS))
+        summary[name] = {
+            'items': len(costing),
+            'average_margin': round(float(costing.margins.mean()), 2) if len(costing) else 0.0,
+            'bands': {band: int(count) for band, count in zip(MARGIN_BANDS, counts)},
+        }
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize item costs and profit margin bands of every menu.")
+    parser.add_argument('--menu-file', default=setting('menu_file', MENU_FILE_PATH),
+                        help="menu document (.json) or SQLite store (.db)")
+    parser.add_argument('--report-file', help="also write the summary to this file as JSON")
+    args = parser.parse_args(argv)
+
+    summary = margin_summary(cost_menus(open_store(args.menu_file).load()))
+    for name, entry in summary.items():
+        bands = ', '.join(f"{count} {band}" for band, count in entry['bands'].items())
+        print(f"{name}: {entry['items']} item(s), average margin {entry['average_margin']}% ({bands})")
+    if args.report_file:
+        with atomic_writer(args.report_file) as f:
+            json.dump(summary, f, indent=2)
+
+if __name__ == "__main__":
+    main()
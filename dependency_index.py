@@ -0,0 +1,258 @@
+import argparse
+import json
+import os
+from collections import Counter
+
+from config import setting
+from correct_resale_prices import match_ingredient_to_resale_item, resale_buying_price
+from costing import cost_menu
+from manifest import content_hash, item_key
+from menu_model import MENU_FILE_PATH, atomic_writer
+from menu_store import open_store
+from resale_matcher import ResaleMatcher
+from units import cost_to_base
+
+INDEX_VERSION = 3
+
+
+def index_path_for(menu_file_path):
+    """Default sidecar dependency index location for a menu document."""
+    return menu_file_path + '.deps.json'
+
+
+def item_keys(items):
+    """
+    Key of each item in the index: manifest.item_key, except that items without an id whose
+    name is missing or shared with another such item are keyed by position ("#3").
+    """
+    names = Counter(item.name for item in items if item.id is None)
+    return [item_key(item) if item.id is not None or (item.name is not None and names[item.name] == 1)
+            else f"#{position}" for position, item in enumerate(items)]
+
+
+def menu_fingerprints(menu, keys):
+    """
+    Content hashes of a menu's ingredients and items (by index key), as the manifest records
+    them, and its cost multiplier. An index is only reused for menus that still match them.
+    """
+    return {'costMultiplier': menu.cost_multiplier,
+            'ingredients': {name: content_hash(ingredient.to_dict()) for name, ingredient in menu.ingredients.items()},
+            'items': {key: content_hash(item.to_dict()) for key, item in zip(keys, menu.items)}}
+
+
+def source_stat(file_path):
+    """(mtime_ns, size) of a menu file, as recorded in an index built or last updated from it."""
+    stat = os.stat(file_path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _format_cost(cost):
+    return f"{cost:.2f}" if cost is not None else "n/a"
+
+
+def _margin(selling_price, cost):
+    """Profit margin in percent rounded to 2 places, as costing.profit_margins."""
+    if not selling_price or selling_price <= 0:
+        return 0.0
+    return round((selling_price - cost) / selling_price * 100, 2)
+
+
+class MenuDependencies:
+    """
+    Reverse index of one menu: ingredient -> recipe items using it and resale items matched to it,
+    with the menu_fingerprints of the menu it describes.
+    """
+    __slots__ = ('recipe_users', 'resale_users', 'costs', 'margins', 'fingerprints')
+
+    def __init__(self, recipe_users=None, resale_users=None, costs=None, margins=None, fingerprints=None):
+        self.recipe_users = recipe_users if recipe_users is not None else {}
+        self.resale_users = resale_users if resale_users is not None else {}
+        self.costs = costs if costs is not None else {}
+        self.margins = margins if margins is not None else {}
+        self.fingerprints = fingerprints
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['recipe_users'], data['resale_users'], data['costs'], data['margins'], data['fingerprints'])
+
+    def to_dict(self):
+        return {'recipe_users': self.recipe_users, 'resale_users': self.resale_users,
+                'costs': self.costs, 'margins': self.margins, 'fingerprints': self.fingerprints}
+
+
+class DependencyIndex:
+    """
+    Ingredient -> dependent item index over a loaded document, with each item's cached cost and margin.
+
+    Recipe items depend on the ingredients listed in their recipe, resale items on the
+    ingredient the resale matcher picked for them. update_ingredient_cost re-costs only
+    the items depending on the changed ingredient and patches their cached cost and
+    margin, so a supplier price change costs O(affected items) instead of a full pass; only
+    the changed ingredient and items are re-fingerprinted. Items are keyed by item_keys.
+    `source` is the source_stat of the menu file the index matches, if known.
+    """
+
+    def __init__(self, menus, dependencies, source=None):
+        self.menus = menus
+        self.dependencies = dependencies
+        self.source = source
+        self._items = {menu_name: dict(zip(item_keys(menu.items), menu.items)) for menu_name, menu in menus.items()}
+
+    @classmethod
+    def build(cls, menus, matches=None):
+        """
+        Index every menu. Resale items are matched with the resale matcher unless `matches`
+        (menu -> item key -> ingredient, as recorded in a manifest) already names their ingredient.
+        """
+        dependencies = {}
+        for menu_name, menu in menus.items():
+            known_matches = (matches or {}).get(menu_name, {})
+            matcher = None
+            menu_dependencies = MenuDependencies()
+            costing = cost_menu(menu)
+            keys = item_keys(menu.items)
+            menu_dependencies.fingerprints = menu_fingerprints(menu, keys)
+            for row, (key, item) in enumerate(zip(keys, menu.items)):
+                menu_dependencies.costs[key] = float(costing.costs[row])
+                menu_dependencies.margins[key] = float(costing.margins[row])
+                if item.has_recipe:
+                    for ingredient_name in item.ingredients or ():
+                        menu_dependencies.recipe_users.setdefault(ingredient_name, []).append(key)
+                    continue
+                ingredient_name = known_matches.get(key)
+                if ingredient_name is None:
+                    if matcher is None:
+                        matcher = ResaleMatcher(menu.ingredients)
+                    ingredient_name = match_ingredient_to_resale_item(item.name or '', matcher, item.category or '')
+                if ingredient_name is not None:
+                    menu_dependencies.resale_users.setdefault(ingredient_name, []).append(key)
+            dependencies[menu_name] = menu_dependencies
+        return cls(menus, dependencies)
+
+    def item(self, menu_name, key):
+        """The MenuItem of a menu with the given key, or None."""
+        return self._items[menu_name].get(key)
+
+    def affected(self, menu_name, ingredient_name):
+        """Keys of the recipe and resale items of a menu that depend on an ingredient."""
+        dependencies = self.dependencies[menu_name]
+        return (dependencies.recipe_users.get(ingredient_name, []) + dependencies.resale_users.get(ingredient_name, []))
+
+    def _recipe_cost(self, menu, item):
+        cost = 0.0
+        for ingredient_name, quantity in item.ingredients.items():
+            ingredient = menu.ingredients.get(ingredient_name)
+            if ingredient is not None:
+                cost += quantity * cost_to_base(ingredient.cost or 0, ingredient.unit)[0]
+        multiplier = menu.cost_multiplier if menu.cost_multiplier is not None else 1
+        return cost * multiplier
+
+    def update_ingredient_cost(self, menu_name, ingredient_name, cost, unit=None):
+        """
+        Set an ingredient's cost (and unit) and re-cost the items depending on it.
+        Resale items get a new buyingPrice unless it would exceed the category maximum.
+        Returns one change per affected item: (key, old cost, new cost, old margin, new margin).
+        """
+        menu = self.menus[menu_name]
+        ingredient = menu.ingredients[ingredient_name]
+        ingredient.cost = cost
+        if unit is not None:
+            ingredient.unit = unit
+        dependencies = self.dependencies[menu_name]
+        dependencies.fingerprints['ingredients'][ingredient_name] = content_hash(ingredient.to_dict())
+        items = self._items[menu_name]
+
+        changes = []
+        for key in dependencies.recipe_users.get(ingredient_name, ()):
+            item = items.get(key)
+            if item is not None:
+                changes.append(self._patch(dependencies, key, item, self._recipe_cost(menu, item)))
+        for key in dependencies.resale_users.get(ingredient_name, ()):
+            item = items.get(key)
+            if item is None:
+                continue
+            price, max_price = resale_buying_price(item.name or '', item.category or '', ingredient.cost, ingredient.unit)
+            if price <= max_price:
+                item.buying_price = price
+            changes.append(self._patch(dependencies, key, item, item.buying_price or 0))
+        return changes
+
+    def _patch(self, dependencies, key, item, cost):
+        old_cost = dependencies.costs.get(key)
+        old_margin = dependencies.margins.get(key)
+        # Resale items without a buyingPrice score 0%, as on the Analysis page
+        margin = _margin(item.selling_price, cost) if item.has_recipe or cost else 0.0
+        dependencies.costs[key] = cost
+        dependencies.margins[key] = margin
+        dependencies.fingerprints['items'][key] = content_hash(item.to_dict())
+        return key, old_cost, cost, old_margin, margin
+
+    def to_dict(self):
+        return {'version': INDEX_VERSION, 'source': self.source,
+                'menus': {name: dependencies.to_dict() for name, dependencies in self.dependencies.items()}}
+
+
+def load_dependency_index(file_path, menus, source_path=None):
+    """
+    Load the dependency index for `menus`, or return None if there is none, it is from another
+    version, or any ingredient or item changed since it was saved (its recipes, matches or cached
+    costs may be stale). While the source_stat of `source_path` (the menu file) is the one the
+    index recorded, nothing has been written to it since and the fingerprints are not compared.
+    """
+    if not os.path.exists(file_path):
+        return None
+    with open(file_path, 'r') as f:
+        data = json.load(f)
+    if data.get('version') != INDEX_VERSION or data['menus'].keys() != menus.keys():
+        return None
+    dependencies = {name: MenuDependencies.from_dict(menu_data) for name, menu_data in data['menus'].items()}
+    if source_path is None or data['source'] is None or data['source'] != source_stat(source_path):
+        for name, menu in menus.items():
+            if dependencies[name].fingerprints != menu_fingerprints(menu, item_keys(menu.items)):
+                return None
+    return DependencyIndex(menus, dependencies, data['source'])
+
+
+def save_dependency_index(file_path, index):
+    with atomic_writer(file_path) as f:
+        json.dump(index.to_dict(), f, separators=(',', ':'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the ingredient dependency index or apply a live cost update.")
+    parser.add_argument('--menu-file', default=setting('menu_file', MENU_FILE_PATH), help="menu document (.json) or SQLite store (.db)")
+    parser.add_argument('--index-file', help="dependency index (default: <menu-file>.deps.json)")
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    subcommands.add_parser('build', help="(re)build the index from the menu file")
+    update = subcommands.add_parser('update', help="set one ingredient's cost and re-cost its dependents")
+    update.add_argument('menu', help="menu key, e.g. izMenu")
+    update.add_argument('ingredient', help="ingredient name as in initialIngredients")
+    update.add_argument('cost', type=float, help="new cost per the ingredient's unit")
+    update.add_argument('--unit', help="new unit, if it changes")
+    args = parser.parse_args(argv)
+
+    index_file = args.index_file or index_path_for(args.menu_file)
+    store = open_store(args.menu_file)
+    with store.locked():
+        menus = store.load()
+        if args.command == 'update' and args.ingredient not in getattr(menus.get(args.menu), 'ingredients', {}):
+            parser.exit(1, f"No ingredient {args.ingredient!r} in menu {args.menu!r} of {args.menu_file}\n")
+        index = None if args.command == 'build' else load_dependency_index(index_file, menus, args.menu_file)
+        if index is None:
+            index = DependencyIndex.build(menus)
+            print(f"Indexed {sum(len(menu.items) for menu in menus.values())} item(s) of {len(menus)} menu(s)")
+
+        if args.command == 'update':
+            changes = index.update_ingredient_cost(args.menu, args.ingredient, args.cost, args.unit)
+            # SQLite stores write the affected rows only; JSON documents are rewritten
+            store.save(menus)
+            for key, old_cost, new_cost, old_margin, new_margin in changes:
+                print(f"- {key}: cost {_format_cost(old_cost)} -> {_format_cost(new_cost)}, "
+                      f"margin {old_margin}% -> {new_margin}%")
+            print(f"Re-costed {len(changes)} item(s) using {args.ingredient}")
+
+        index.source = source_stat(args.menu_file)
+        save_dependency_index(index_file, index)
+
+if __name__ == "__main__":
+    main()
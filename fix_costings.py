@@ -1,69 +1,87 @@
+import argparse
 import json
 
+from config import setting
+from menu_model import atomic_writer
+from menu_store import open_store
+from units import cost_to_base
+from validation import COST_LIMITS, FIX_COSTINGS_RULES, validate_menus
+
 # Define file paths
-MENU_FILE_PATH = '/Users/m/Programming/LOCAL/RestaurantProfitPro/server/menus.json'
-REPORT_FILE_PATH = '/Users/m/Programming/LOCAL/RestaurantProfitPro/server/skipped_ingredients.json'
-
-# Load the menu data
-with open(MENU_FILE_PATH, 'r') as f:
-    menus = json.load(f)
-
-# Define valid cost ranges per unit (more flexible for premium items)
-COST_RANGES = {
-    'g': (0.001, 0.05),   # Up to £50/kg for proteins like lamb
-    'ml': (0.001, 0.01),  # Up to £10/L for liquids
-    'unit': (0.50, 10.00) # Up to £10 per item
-}
-
-# Log skipped ingredients
-skipped_ingredients = []
-
-for menu_name, menu_data in menus.items():
-    ingredients = menu_data.get('initialIngredients', {})
-    # Collect ingredients to delete after iteration
-    ingredients_to_delete = []
-
-    for ing_name, ing_data in ingredients.items():
-        unit = ing_data.get('unit', 'unit')
-        cost = ing_data.get('cost', 0)
-
-        # Convert bulk units to base units
-        if unit == 'kg':
-            unit = 'g'
-            cost = cost / 1000
-            ing_data['unit'] = unit
-            ing_data['cost'] = cost
-        elif unit == 'L':
-            unit = 'ml'
-            cost = cost / 1000
-            ing_data['unit'] = unit
-            ing_data['cost'] = cost
-
-        # Validate cost after conversion
-        min_cost, max_cost = COST_RANGES.get(unit, (0, float('inf')))
-        if not (min_cost <= cost <= max_cost):
-            skipped_ingredients.append({
-                'ingredient': ing_name,
-                'menu': menu_name,
-                'reason': f'Cost {cost} out of range ({min_cost}, {max_cost}) for unit {unit}'
-            })
-            ingredients_to_delete.append(ing_name)
-            continue
-
-        # Ensure category exists
-        if 'category' not in ing_data:
-            ing_data['category'] = 'Uncategorized'
-
-    # Remove ingredients after iteration
-    for ing_name in ingredients_to_delete:
-        del ingredients[ing_name]
-
-# Save updated menus
-with open(MENU_FILE_PATH, 'w') as f:
-    json.dump(menus, f, indent=2)
-
-# Save skipped ingredients report
-with open(REPORT_FILE_PATH, 'w') as f:
-    json.dump(skipped_ingredients, f, indent=2)
-
-print("Ingredients updated. Check 'skipped_ingredients.json' in the server directory for any issues.")
\ No newline at end of file
+MENU_FILE_PATH = 'server/menus.json'
+REPORT_FILE_PATH = 'server/skipped_ingredients.json'
+
+# Valid cost ranges per unit (more flexible for premium items), declared in validation
+COST_RANGES = COST_LIMITS
+
+def fix_ingredient_costing(ingredient):
+    """Convert a kg/L cost to g/ml and default the category of one Ingredient, in place.
+    Returns why its cost is out of range, or None if it is kept."""
+    unit = ingredient.unit if ingredient.unit is not None else 'unit'
+    cost = ingredient.cost if ingredient.cost is not None else 0
+
+    # Convert bulk units to base units
+    if unit in ('kg', 'L'):
+        cost, unit = cost_to_base(cost, unit)
+        ingredient.unit = unit
+        ingredient.cost = cost
+
+    # Validate cost after conversion
+    min_cost, max_cost = COST_RANGES.get(unit, (0, float('inf')))
+    if not (min_cost <= cost <= max_cost):
+        return f'Cost {cost} out of range ({min_cost}, {max_cost}) for unit {unit}'
+
+    # Ensure category exists
+    if ingredient.category is None:
+        ingredient.category = 'Uncategorized'
+    return None
+
+def fix_costings(menus, changes=None):
+    """Convert kg/L costs to g/ml and drop ingredients whose cost is out of range.
+    With a manifest.ChangeSet, only dirty ingredients are checked.
+    All ingredients are checked in one vectorized pass of validation.FIX_COSTINGS_RULES.
+    Returns the list of skipped ingredients."""
+    include = None
+    if changes is not None:
+        include = changes.ingredient_dirty
+    result = validate_menus(menus, FIX_COSTINGS_RULES, include)
+
+    # Log skipped ingredients
+    skipped_ingredients = [{
+        'ingredient': entry['ingredient'],
+        'menu': entry['menu'],
+        'reason': entry['reason']
+    } for entry in result.entries(action='drop')]
+
+    touched = result.apply(menus)
+    if changes is not None:
+        for menu_name in touched:
+            changes.mark_names_changed(menu_name)
+
+    return skipped_ingredients
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert kg/L ingredient costs to g/ml and drop out-of-range costs.")
+    parser.add_argument('--menu-file', default=setting('menu_file', MENU_FILE_PATH),
+                        help="menu document (.json) or SQLite store (.db) to update")
+    parser.add_argument('--report-file', default=REPORT_FILE_PATH, help="where to write the skipped ingredients")
+    args = parser.parse_args(argv)
+
+    # Load the menu data
+    store = open_store(args.menu_file)
+    with store.locked():
+        menus = store.load()
+
+        skipped_ingredients = fix_costings(menus)
+
+        # Save updated menus
+        store.save(menus)
+
+    # Save skipped ingredients report
+    with atomic_writer(args.report_file) as f:
+        json.dump(skipped_ingredients, f, indent=2)
+
+    print(f"Ingredients updated. Check {args.report_file} for any issues.")
+
+if __name__ == "__main__":
+    main()
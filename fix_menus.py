@@ -1,57 +1,81 @@
-import json
+import argparse
 import uuid
 
-def fix_menus():
-    with open('server/menus.json', 'r') as f:
-        data = json.load(f)
-    
-    recipe_categories = {'Food', 'Cocktails', 'Liquor Coffees', 'Desserts'}
-    
-    for menu_key in ['izMenu', 'bellFood']:
-        if menu_key not in data:
-            data[menu_key] = {"items": [], "initialIngredients": {}, "costMultiplier": 1.1, "categories": []}
-        items = []
-        for item in data[menu_key]['items']:
-            # Normalize category name
-            category = item.get('category', '').strip().replace('&', 'and').lower()
-            is_recipe = any(cat.lower() in category for cat in recipe_categories)
-            is_resale = (
-                'wine' in category or
-                'soft drink' in category or
-                'beer' in category or
-                'cider' in category or
-                (category == 'drinks' and not any(c.lower() in category for c in ['Cocktails', 'Liquor Coffees']))
-            )
-            
-            if is_recipe:
-                item['hasRecipe'] = True
-                item['ingredients'] = item.get('ingredients', {})
-                if 'buyingPrice' in item:
-                    del item['buyingPrice']
-            elif is_resale:
-                item['hasRecipe'] = False
-                item['buyingPrice'] = item.get('buyingPrice', item['sellingPrice'] * 0.7)
-                if 'ingredients' in item:
-                    del item['ingredients']
-            else:
-                # Default to recipe for unknown categories
-                item['hasRecipe'] = True
-                item['ingredients'] = item.get('ingredients', {})
-                if 'buyingPrice' in item:
-                    del item['buyingPrice']
-            
-            # Ensure required fields
-            if item['sellingPrice'] <= 0:
-                item['sellingPrice'] = 1.0
-            if 'id' not in item:
-                item['id'] = str(uuid.uuid4())
-            
-            items.append(item)
-        
-        data[menu_key]['items'] = items
-        data[menu_key]['categories'] = list(set(item['category'] for item in items if item['category']))
-    
-    with open('server/menus.json', 'w') as f:
-        json.dump(data, f, indent=2)
-
-fix_menus()
\ No newline at end of file
+from config import setting
+from menu_model import Menu
+from menu_store import open_store
+
+MENU_FILE_PATH = 'server/menus.json'
+
+# Menus the client expects in server/menus.json; created empty if missing
+REQUIRED_MENUS = ['izMenu', 'bellFood']
+
+RECIPE_CATEGORIES = {'Food', 'Cocktails', 'Liquor Coffees', 'Desserts'}
+
+def normalize_item(item):
+    """Normalize the recipe/resale fields of one MenuItem in place and return it."""
+    # Normalize category name
+    category = (item.category or '').strip().replace('&', 'and').lower()
+    is_recipe = any(cat.lower() in category for cat in RECIPE_CATEGORIES)
+    is_resale = (
+        'wine' in category or
+        'soft drink' in category or
+        'beer' in category or
+        'cider' in category or
+        (category == 'drinks' and not any(c.lower() in category for c in ['Cocktails', 'Liquor Coffees']))
+    )
+
+    if is_recipe:
+        item.has_recipe = True
+        item.ingredients = item.ingredients if item.ingredients is not None else {}
+        item.buying_price = None
+    elif is_resale:
+        item.has_recipe = False
+        if item.buying_price is None:
+            item.buying_price = item.selling_price * 0.7
+        item.ingredients = None
+    else:
+        # Default to recipe for unknown categories
+        item.has_recipe = True
+        item.ingredients = item.ingredients if item.ingredients is not None else {}
+        item.buying_price = None
+
+    # Ensure required fields
+    if item.selling_price <= 0:
+        item.selling_price = 1.0
+    if item.id is None:
+        item.id = str(uuid.uuid4())
+    return item
+
+def fix_menus(menus, changes=None, required_menus=()):
+    """Normalize recipe/resale fields of every item of every menu, creating any missing
+    required_menus. With a manifest.ChangeSet, only dirty items are normalized."""
+    for menu_key in required_menus:
+        if menu_key not in menus:
+            menus[menu_key] = Menu(menu_key, cost_multiplier=1.1)
+
+    for menu_key, menu in menus.items():
+        for item in menu.items:
+            if changes is None or changes.item_dirty(menu_key, item):
+                normalize_item(item)
+        categories = list(dict.fromkeys(item.category for item in menu.items if item.category))
+        # A menu without a categories list only gets one once there is something to list
+        if categories or menu.categories is not None:
+            menu.categories = categories
+
+    return menus
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Normalize recipe/resale fields and categories of every menu.")
+    parser.add_argument('--menu-file', default=setting('menu_file', MENU_FILE_PATH),
+                        help="menu document (.json) or SQLite store (.db) to update")
+    args = parser.parse_args(argv)
+
+    store = open_store(args.menu_file)
+    with store.locked():
+        menus = store.load()
+        fix_menus(menus, required_menus=REQUIRED_MENUS)
+        store.save(menus)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import json
+import random
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# Counters every metrics record reports, even when they stay at zero
+STANDARD_COUNTERS = ('matched', 'unmatched', 'corrected', 'skipped', 'anomalous')
+
+
+class Metrics:
+    """
+    Stage timings, counters and an optional sampled per-item trace for one run.
+
+    Collected in memory and emitted as a single JSON record at the end of the run, so
+    instrumenting a loop costs a dict increment per event rather than a formatted log line.
+    A `trace_rate` fraction of traced items (0 by default) keep their details in the record.
+    """
+
+    def __init__(self, name, trace_rate=0.0, trace_limit=1000, seed=None):
+        self.name = name
+        self.counters = Counter({counter: 0 for counter in STANDARD_COUNTERS})
+        self.timings = {}
+        self.trace = []
+        self.trace_rate = trace_rate
+        self.trace_limit = trace_limit
+        self._random = random.Random(seed)
+        self._started = time.time()
+
+    def count(self, counter, amount=1):
+        self.counters[counter] += amount
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block, adding to any earlier time recorded for the stage."""
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+    def tracing(self):
+        """Whether the next item should be traced. Check before building the trace entry."""
+        return (self.trace_rate > 0 and len(self.trace) < self.trace_limit
+                and self._random.random() < self.trace_rate)
+
+    def add_trace(self, **entry):
+        self.trace.append(entry)
+
+    def to_record(self):
+        record = {
+            'run': self.name,
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S%z', time.localtime(self._started)),
+            'seconds': time.time() - self._started,
+            'stages': self.timings,
+            'counters': dict(self.counters),
+        }
+        if self.trace_rate > 0:
+            record['trace'] = self.trace
+        return record
+
+    def write(self, file_path):
+        """Append the metrics record to file_path as one JSON line."""
+        with open(file_path, 'a') as f:
+            f.write(json.dumps(self.to_record(), separators=(',', ':')) + '\n')
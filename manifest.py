@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+
+from menu_model import atomic_writer
+
+MANIFEST_VERSION = 1
+
+
+def manifest_path_for(menu_file_path):
+    """Default sidecar manifest location for a menu document."""
+    return menu_file_path + '.manifest.json'
+
+
+def content_hash(data):
+    """Short stable hash of a JSON-serializable value."""
+    text = json.dumps(data, sort_keys=True, separators=(',', ':'))
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def item_key(item):
+    """Identity of a menu item across runs: its id, or its name when it has none."""
+    return item.id if item.id is not None else item.name
+
+
+def load_manifest(file_path):
+    """Load a manifest, or return None if there is none or it was written by another version."""
+    if not os.path.exists(file_path):
+        return None
+    with open(file_path, 'r') as f:
+        manifest = json.load(f)
+    if manifest.get('version') != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def save_manifest(file_path, manifest):
+    with atomic_writer(file_path) as f:
+        json.dump(manifest, f, separators=(',', ':'))
+
+
+def offer_hash(price_index, ingredient_name):
+    """Hash of the price list offer an ingredient is priced from (of None when it has none)."""
+    offer = price_index.lookup(ingredient_name)
+    return content_hash(offer.to_dict() if offer is not None else None)
+
+
+def build_manifest(menus, changes=None):
+    """
+    Record the content hash of every ingredient and item, plus the resale matches and the
+    price list offers known to `changes`, so the next run can tell what changed since this one.
+    """
+    manifest = {'version': MANIFEST_VERSION, 'menus': {}}
+    for menu_name, menu in menus.items():
+        manifest['menus'][menu_name] = {
+            'ingredients': {name: content_hash(ing.to_dict()) for name, ing in menu.ingredients.items()},
+            'items': {item_key(item): content_hash(item.to_dict()) for item in menu.items},
+            'matches': changes.matches.get(menu_name, {}) if changes is not None else {},
+            'prices': changes.prices.get(menu_name, {}) if changes is not None else {},
+        }
+    return manifest
+
+
+class ChangeSet:
+    """
+    The ingredients and items that changed since the run recorded in a manifest.
+
+    An entry is dirty when it is new or its content hash differs. With a price_feed.PriceIndex,
+    an ingredient is also dirty when the offer it is priced from differs from the one recorded,
+    so a new price list is applied. Recipe items are also dirty when one of their ingredients
+    is, and resale items when the ingredient they were matched to is, or when ingredients were
+    added or removed (a new name can win the fuzzy match).
+    Entries that are not dirty are left as the previous run wrote them.
+    """
+
+    def __init__(self, menus, previous=None, price_index=None):
+        previous_menus = previous['menus'] if previous else {}
+        self.dirty_ingredients = {}
+        self.dirty_items = {}
+        self.names_changed = {}
+        self.matches = {}
+        self.prices = {}
+        for menu_name, menu in menus.items():
+            before = previous_menus.get(menu_name, {})
+            ingredient_hashes = before.get('ingredients', {})
+            item_hashes = before.get('items', {})
+            dirty = {name for name, ing in menu.ingredients.items()
+                     if ingredient_hashes.get(name) != content_hash(ing.to_dict())}
+            # Removed ingredients affect whatever used them
+            dirty.update(name for name in ingredient_hashes if name not in menu.ingredients)
+            offer_hashes = before.get('prices', {})
+            if price_index is None:
+                # Runs without the update_ingredients stage keep the offers of the last one that had it
+                self.prices[menu_name] = dict(offer_hashes)
+            else:
+                self.prices[menu_name] = {name: offer_hash(price_index, name) for name in menu.ingredients}
+                dirty.update(name for name, digest in self.prices[menu_name].items()
+                             if offer_hashes.get(name) != digest)
+            self.dirty_ingredients[menu_name] = dirty
+            self.dirty_items[menu_name] = {item_key(item) for item in menu.items
+                                           if item_hashes.get(item_key(item)) != content_hash(item.to_dict())}
+            self.names_changed[menu_name] = ingredient_hashes.keys() != menu.ingredients.keys()
+            self.matches[menu_name] = dict(before.get('matches', {}))
+
+    def ingredient_dirty(self, menu_name, ingredient_name):
+        # Menus created during the run are entirely dirty
+        if menu_name not in self.dirty_ingredients:
+            return True
+        return ingredient_name in self.dirty_ingredients[menu_name]
+
+    def item_dirty(self, menu_name, item):
+        if menu_name not in self.dirty_items:
+            return True
+        key = item_key(item)
+        if key in self.dirty_items[menu_name]:
+            return True
+        dirty_ingredients = self.dirty_ingredients[menu_name]
+        if item.has_recipe:
+            return any(name in dirty_ingredients for name in item.ingredients or ())
+        if self.names_changed[menu_name]:
+            return True
+        return self.matches[menu_name].get(key) in dirty_ingredients
+
+    def mark_names_changed(self, menu_name):
+        """Flag that a stage added or dropped ingredients, so every resale item is rematched."""
+        self.names_changed[menu_name] = True
+
+    def record_match(self, menu_name, item, ingredient_name):
+        """Remember which ingredient a resale item was matched to (None for no match)."""
+        key = item_key(item)
+        matches = self.matches.setdefault(menu_name, {})
+        if ingredient_name is None:
+            matches.pop(key, None)
+        else:
+            matches[key] = ingredient_name
+
+    def count(self):
+        """Total number of dirty ingredients and directly changed items."""
+        return (sum(len(names) for names in self.dirty_ingredients.values())
+                + sum(len(keys) for keys in self.dirty_items.values()))
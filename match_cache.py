@@ -0,0 +1,196 @@
+import argparse
+import json
+import os
+from collections import OrderedDict
+
+from config import setting
+from menu_model import MENU_FILE_PATH, write_atomic
+from resale_matcher import ingredient_fingerprint
+
+MATCH_CACHE_VERSION = 1
+
+# Decisions kept before the least recently used are evicted
+DEFAULT_CAPACITY = 50000
+
+
+def match_cache_path_for(menu_file_path):
+    """Default sidecar match cache location for a menu document."""
+    return menu_file_path + '.matches.json'
+
+
+def normalize_item_name(name):
+    """Cache key form of a resale item name. Matching is case-insensitive, nothing else is folded."""
+    return (name or '').lower()
+
+
+class MatchCache:
+    """
+    On-disk LRU of fuzzy resale match decisions, plus manual overrides.
+
+    A decision is keyed by (normalized item name, category, fingerprint of the ingredient names
+    it was matched against) and stores (matched ingredient or None, score). Any change to a
+    menu's ingredient names changes the fingerprint, so stale decisions are never reused; they
+    age out of the LRU or are dropped by prune().
+
+    Overrides are keyed by (normalized item name, category), with category None applying to
+    every category. An accepted ingredient is used whenever it is in the menu, without fuzzy
+    matching; rejected ingredients are never matched to the item.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.decisions = OrderedDict()
+        self.overrides = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name, category, fingerprint):
+        """Return the cached (ingredient, score) decision, or None on a miss."""
+        key = (normalize_item_name(name), category, fingerprint)
+        decision = self.decisions.get(key)
+        if decision is None:
+            self.misses += 1
+            return None
+        self.decisions.move_to_end(key)
+        self.hits += 1
+        return decision
+
+    def contains(self, name, category, fingerprint):
+        """Whether a decision is cached, without counting a hit or miss or refreshing its age."""
+        return (normalize_item_name(name), category, fingerprint) in self.decisions
+
+    def put(self, name, category, fingerprint, ingredient, score):
+        key = (normalize_item_name(name), category, fingerprint)
+        self.decisions[key] = (ingredient, score)
+        self.decisions.move_to_end(key)
+        while len(self.decisions) > self.capacity:
+            self.decisions.popitem(last=False)
+
+    def override(self, name, category):
+        """The override for an item as {'accepted': name or None, 'rejected': [names]}, or None."""
+        name = normalize_item_name(name)
+        return self.overrides.get((name, category)) or self.overrides.get((name, None))
+
+    def _set_override(self, name, category, accepted=None, rejected=None):
+        key = (normalize_item_name(name), category)
+        override = self.overrides.setdefault(key, {'accepted': None, 'rejected': []})
+        if accepted is not None:
+            override['accepted'] = accepted
+            if accepted in override['rejected']:
+                override['rejected'].remove(accepted)
+        if rejected is not None:
+            if override['accepted'] == rejected:
+                override['accepted'] = None
+            if rejected not in override['rejected']:
+                override['rejected'].append(rejected)
+        self._forget(key[0], category)
+
+    def accept(self, name, category, ingredient):
+        """Always match the item to `ingredient` when the menu has it."""
+        self._set_override(name, category, accepted=ingredient)
+
+    def reject(self, name, category, ingredient):
+        """Never match the item to `ingredient`."""
+        self._set_override(name, category, rejected=ingredient)
+
+    def clear_override(self, name, category):
+        """Remove an item's override. Returns whether there was one."""
+        key = (normalize_item_name(name), category)
+        removed = self.overrides.pop(key, None) is not None
+        self._forget(key[0], category)
+        return removed
+
+    def _forget(self, name, category):
+        """Drop the cached decisions an override change can affect."""
+        for key in [key for key in self.decisions
+                    if key[0] == name and (category is None or key[1] == category)]:
+            del self.decisions[key]
+
+    def prune(self, fingerprints):
+        """Drop decisions made against ingredient sets not in `fingerprints`. Returns the number dropped."""
+        stale = [key for key in self.decisions if key[2] not in fingerprints]
+        for key in stale:
+            del self.decisions[key]
+        return len(stale)
+
+    def to_dict(self):
+        return {
+            'version': MATCH_CACHE_VERSION,
+            # Least recently used first, so the order survives a reload
+            'decisions': [[name, category, fingerprint, ingredient, score]
+                          for (name, category, fingerprint), (ingredient, score) in self.decisions.items()],
+            'overrides': [[name, category, override['accepted'], override['rejected']]
+                          for (name, category), override in self.overrides.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, data, capacity=DEFAULT_CAPACITY):
+        cache = cls(capacity)
+        if data.get('version') != MATCH_CACHE_VERSION:
+            return cache
+        for name, category, fingerprint, ingredient, score in data.get('decisions', []):
+            cache.decisions[(name, category, fingerprint)] = (ingredient, score)
+        while len(cache.decisions) > capacity:
+            cache.decisions.popitem(last=False)
+        for name, category, accepted, rejected in data.get('overrides', []):
+            cache.overrides[(name, category)] = {'accepted': accepted, 'rejected': list(rejected)}
+        return cache
+
+
+def load_match_cache(file_path, capacity=DEFAULT_CAPACITY):
+    """Load a match cache, or return an empty one if there is none or it is unreadable."""
+    if not os.path.exists(file_path):
+        return MatchCache(capacity)
+    try:
+        with open(file_path, 'r') as f:
+            return MatchCache.from_dict(json.load(f), capacity)
+    except ValueError:
+        return MatchCache(capacity)
+
+
+def prune_for_menus(cache, menus):
+    """Drop decisions made against ingredient sets no menu has any more. Returns the number dropped."""
+    return cache.prune({ingredient_fingerprint(menu.ingredients) for menu in menus.values()})
+
+
+def save_match_cache(file_path, cache):
+    write_atomic(file_path, json.dumps(cache.to_dict(), separators=(',', ':')))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect the resale match cache and record manual match overrides.")
+    parser.add_argument('--cache-file', default=match_cache_path_for(setting('menu_file', MENU_FILE_PATH)),
+                        help="match cache to update (default: <menu-file>.matches.json)")
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    for command, help_text in (('accept', "always match ITEM to INGREDIENT"),
+                               ('reject', "never match ITEM to INGREDIENT")):
+        subcommand = subcommands.add_parser(command, help=help_text)
+        subcommand.add_argument('item', help="resale item name")
+        subcommand.add_argument('ingredient', help="ingredient name")
+        subcommand.add_argument('--category', help="only for items of this category (default: any)")
+    clear = subcommands.add_parser('clear', help="remove the override of ITEM")
+    clear.add_argument('item', help="resale item name")
+    clear.add_argument('--category', help="the override's category (default: the any-category override)")
+    subcommands.add_parser('show', help="print the overrides and the number of cached decisions")
+    args = parser.parse_args(argv)
+
+    cache = load_match_cache(args.cache_file)
+    if args.command == 'show':
+        print(f"{len(cache.decisions)} cached decision(s)")
+        for (name, category), override in sorted(cache.overrides.items(), key=lambda entry: (entry[0][0], entry[0][1] or '')):
+            print(f"- {name} ({category or 'any category'}): accepted={override['accepted']}, "
+                  f"rejected={', '.join(override['rejected']) or '-'}")
+        return
+
+    if args.command == 'accept':
+        cache.accept(args.item, args.category, args.ingredient)
+    elif args.command == 'reject':
+        cache.reject(args.item, args.category, args.ingredient)
+    elif not cache.clear_override(args.item, args.category):
+        print(f"No override for {args.item}")
+        return
+    save_match_cache(args.cache_file, cache)
+    print(f"Updated overrides in {args.cache_file}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+
+# Default location of the menu document, relative to the repository root
+MENU_FILE_PATH = 'server/menus.json'
+
+# JSON keys handled explicitly by each type; anything else is kept in `extra`
+INGREDIENT_FIELDS = ('cost', 'unit', 'category')
+ITEM_FIELDS = ('name', 'category', 'sellingPrice', 'ingredients', 'hasRecipe', 'id', 'buyingPrice', 'description')
+MENU_FIELDS = ('initialIngredients', 'items', 'costMultiplier', 'categories')
+
+# Process umask, so atomically written files get the permissions open(..., 'w') would give them.
+# Read on the first write rather than at import, which would have to change it briefly
+_UMASK = None
+
+
+def _process_umask():
+    global _UMASK
+    if _UMASK is None:
+        _UMASK = os.umask(0)
+        os.umask(_UMASK)
+    return _UMASK
+
+
+def _extra_fields(data, known):
+    """Return the keys of `data` not listed in `known`, or None if there are none."""
+    if len(data) <= len(known) and all(key in known for key in data):
+        return None
+    return {key: value for key, value in data.items() if key not in known}
+
+
+# Key orders seen by from_dict, per type: keys -> the same tuple if to_dict writes them in another
+# order and must restore it, else None. Entries with the same order share one tuple
+_ingredient_orders = {}
+_item_orders = {}
+_menu_orders = {}
+
+
+def _key_order(data, known, orders):
+    """The keys of `data` if to_dict, which writes `known` fields first and in that order, would reorder them."""
+    keys = tuple(data)
+    try:
+        return orders[keys]
+    except KeyError:
+        written = tuple(key for key in known if key in data) + tuple(key for key in keys if key not in known)
+        return orders.setdefault(keys, keys if keys != written else None)
+
+
+def _in_order(data, key_order):
+    """`data` with the keys of `key_order` first, in that order; keys added since follow."""
+    ordered = {key: data[key] for key in key_order if key in data}
+    if len(ordered) != len(data):
+        ordered.update(data)
+    return ordered
+
+
+class Ingredient:
+    """
+    An entry of a menu's initialIngredients. Missing fields are stored as None; `key_order`
+    is the order its keys were read in, when to_dict would otherwise write them differently.
+    """
+    __slots__ = ('name', 'cost', 'unit', 'category', 'extra', 'key_order')
+
+    def __init__(self, name, cost=None, unit=None, category=None, extra=None, key_order=None):
+        self.name = name
+        self.cost = cost
+        self.unit = unit
+        self.category = category
+        self.extra = extra
+        self.key_order = key_order
+
+    @classmethod
+    def from_dict(cls, name, data):
+        return cls(name, data.get('cost'), data.get('unit'), data.get('category'),
+                   _extra_fields(data, INGREDIENT_FIELDS), _key_order(data, INGREDIENT_FIELDS, _ingredient_orders))
+
+    def to_dict(self):
+        data = {}
+        if self.cost is not None:
+            data['cost'] = self.cost
+        if self.unit is not None:
+            data['unit'] = self.unit
+        if self.category is not None:
+            data['category'] = self.category
+        if self.extra:
+            data.update(self.extra)
+        return data if self.key_order is None else _in_order(data, self.key_order)
+
+    def copy(self):
+        return Ingredient(self.name, self.cost, self.unit, self.category,
+                          dict(self.extra) if self.extra else None, self.key_order)
+
+    def __repr__(self):
+        return f"Ingredient({self.name!r}, cost={self.cost!r}, unit={self.unit!r}, category={self.category!r})"
+
+
+class MenuItem:
+    """
+    A recipe (has_recipe) or resale item of a menu. Missing fields are stored as None;
+    `key_order` is kept as for Ingredient, so saving does not move an item's keys around.
+    """
+    __slots__ = ('name', 'category', 'selling_price', 'ingredients', 'has_recipe', 'id',
+                 'buying_price', 'description', 'extra', 'key_order')
+
+    def __init__(self, name=None, category=None, selling_price=None, ingredients=None, has_recipe=None,
+                 id=None, buying_price=None, description=None, extra=None, key_order=None):
+        self.name = name
+        self.category = category
+        self.selling_price = selling_price
+        self.ingredients = ingredients
+        self.has_recipe = has_recipe
+        self.id = id
+        self.buying_price = buying_price
+        self.description = description
+        self.extra = extra
+        self.key_order = key_order
+
+    @classmethod
+    def from_dict(cls, data):
+        get = data.get
+        return cls(get('name'), get('category'), get('sellingPrice'), get('ingredients'), get('hasRecipe'),
+                   get('id'), get('buyingPrice'), get('description'), _extra_fields(data, ITEM_FIELDS),
+                   _key_order(data, ITEM_FIELDS, _item_orders))
+
+    def to_dict(self):
+        data = {}
+        if self.name is not None:
+            data['name'] = self.name
+        if self.category is not None:
+            data['category'] = self.category
+        if self.selling_price is not None:
+            data['sellingPrice'] = self.selling_price
+        if self.ingredients is not None:
+            data['ingredients'] = self.ingredients
+        if self.has_recipe is not None:
+            data['hasRecipe'] = self.has_recipe
+        if self.id is not None:
+            data['id'] = self.id
+        if self.buying_price is not None:
+            data['buyingPrice'] = self.buying_price
+        if self.description is not None:
+            data['description'] = self.description
+        if self.extra:
+            data.update(self.extra)
+        return data if self.key_order is None else _in_order(data, self.key_order)
+
+    def __repr__(self):
+        return f"MenuItem({self.name!r}, category={self.category!r}, has_recipe={self.has_recipe!r})"
+
+
+class Menu:
+    """
+    One menu of the document (e.g. izMenu, bellFood). `categories` is None for a menu
+    without a categories list; `key_order` is kept as for Ingredient.
+    """
+    __slots__ = ('name', 'ingredients', 'items', 'cost_multiplier', 'categories', 'extra', 'key_order')
+
+    def __init__(self, name, ingredients=None, items=None, cost_multiplier=1.1, categories=None, extra=None,
+                 key_order=None):
+        self.name = name
+        self.ingredients = ingredients if ingredients is not None else {}
+        self.items = items if items is not None else []
+        self.cost_multiplier = cost_multiplier
+        self.categories = categories
+        self.extra = extra
+        self.key_order = key_order
+
+    @classmethod
+    def from_dict(cls, name, data):
+        ingredients = {ing_name: Ingredient.from_dict(ing_name, ing_data)
+                       for ing_name, ing_data in data.get('initialIngredients', {}).items()}
+        items = [MenuItem.from_dict(item) for item in data.get('items', [])]
+        return cls(name, ingredients, items, data.get('costMultiplier'), data.get('categories'),
+                   _extra_fields(data, MENU_FIELDS), _key_order(data, MENU_FIELDS, _menu_orders))
+
+    def to_dict(self):
+        data = {
+            'initialIngredients': {name: ing.to_dict() for name, ing in self.ingredients.items()},
+            'items': [item.to_dict() for item in self.items],
+        }
+        if self.cost_multiplier is not None:
+            data['costMultiplier'] = self.cost_multiplier
+        if self.categories is not None:
+            data['categories'] = self.categories
+        if self.extra:
+            data.update(self.extra)
+        return data if self.key_order is None else _in_order(data, self.key_order)
+
+    def __repr__(self):
+        return f"Menu({self.name!r}, {len(self.ingredients)} ingredients, {len(self.items)} items)"
+
+
+def menus_from_dict(data):
+    """Convert a parsed menu document into Menu objects, releasing the raw dicts as it goes."""
+    menus = {}
+    for name in list(data):
+        menus[name] = Menu.from_dict(name, data.pop(name))
+    return menus
+
+
+def menus_to_dict(menus):
+    """Convert Menu objects back into a plain menu document."""
+    return {name: menu.to_dict() for name, menu in menus.items()}
+
+
+def load_menus(file_path=MENU_FILE_PATH):
+    """Load a menu document into a dict of menu name -> Menu."""
+    with open(file_path, 'r') as f:
+        return menus_from_dict(json.load(f))
+
+
+def save_menus(file_path, menus, indent=2):
+    """
+    Save a dict of menu name -> Menu as a menu document. With indent=None the document is
+    written compactly. The text goes to a temporary file in the same directory that is then
+    renamed over file_path, so a crash mid-write leaves the previous document intact.
+    """
+    if indent is None:
+        text = json.dumps(menus_to_dict(menus), separators=(',', ':'))
+    else:
+        text = json.dumps(menus_to_dict(menus), indent=indent)
+    write_atomic(file_path, text)
+
+
+@contextmanager
+def atomic_writer(file_path):
+    """
+    Open a temporary file next to file_path for writing; when the block exits cleanly it is
+    synced and renamed over file_path, keeping its permissions. On error file_path is untouched.
+    """
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(file_path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        mode = os.stat(file_path).st_mode & 0o7777 if os.path.exists(file_path) else 0o666 & ~_process_umask()
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def write_atomic(file_path, text):
+    """Replace file_path with text via a synced temporary file and a rename, keeping its permissions."""
+    with atomic_writer(file_path) as f:
+        f.write(text)
@@ -0,0 +1,189 @@
+import argparse
+import json
+
+from config import setting
+from menu_model import MENU_FILE_PATH, atomic_writer, menus_from_dict, menus_to_dict
+from menu_store import open_store
+
+
+def snapshot(menus):
+    """Plain-document copy of menus to diff against later; recipe dicts are copied so in-place edits show up."""
+    document = menus_to_dict(menus)
+    for menu in document.values():
+        for item in menu['items']:
+            if isinstance(item.get('ingredients'), dict):
+                item['ingredients'] = dict(item['ingredients'])
+    return document
+
+
+def _escape(token):
+    return str(token).replace('~', '~0').replace('/', '~1')
+
+
+def _unescape(token):
+    return token.replace('~1', '/').replace('~0', '~')
+
+
+def _item_keys(items):
+    """Identity of each item (id, else name) as in manifest.item_key, or None if they are not unique."""
+    keys = [item.get('id') if item.get('id') is not None else item.get('name') for item in items]
+    return keys if len(set(keys)) == len(keys) else None
+
+
+def _diff_items(path, before, after):
+    before_keys = _item_keys(before)
+    after_keys = _item_keys(after)
+    if before_keys is None or after_keys is None:
+        yield {'op': 'replace', 'path': path, 'value': after}
+        return
+    before_set = set(before_keys)
+    after_set = set(after_keys)
+    # Reordered items are replaced wholesale; removals and insertions become per-item ops
+    if [key for key in before_keys if key in after_set] != [key for key in after_keys if key in before_set]:
+        yield {'op': 'replace', 'path': path, 'value': after}
+        return
+    for position in reversed(range(len(before))):
+        if before_keys[position] not in after_set:
+            yield {'op': 'remove', 'path': f'{path}/{position}'}
+    before_by_key = dict(zip(before_keys, before))
+    for position, (key, item) in enumerate(zip(after_keys, after)):
+        if key not in before_set:
+            yield {'op': 'add', 'path': f'{path}/{position}', 'value': item}
+        else:
+            yield from _diff_value(f'{path}/{position}', before_by_key[key], item)
+
+
+def _diff_value(path, before, after):
+    if before == after:
+        return
+    if isinstance(before, dict) and isinstance(after, dict):
+        for key in before:
+            if key not in after:
+                yield {'op': 'remove', 'path': f'{path}/{_escape(key)}'}
+        for key, value in after.items():
+            if key not in before:
+                yield {'op': 'add', 'path': f'{path}/{_escape(key)}', 'value': value}
+            elif key == 'items' and isinstance(value, list) and isinstance(before[key], list):
+                yield from _diff_items(f'{path}/items', before[key], value)
+            else:
+                yield from _diff_value(f'{path}/{_escape(key)}', before[key], value)
+    else:
+        yield {'op': 'replace', 'path': path, 'value': after}
+
+
+def diff_documents(before, after):
+    """RFC 6902 operations turning the menu document `before` into `after`."""
+    return list(_diff_value('', before, after))
+
+
+def change_log(ops, before):
+    """
+    Compact (menu, entity, field, old, new) entries for a list of operations on `before`.
+    `entity` is e.g. 'initialIngredients/lamb' or 'items/3'; `field` is None when a whole entity changes.
+    """
+    log = []
+    document = json.loads(json.dumps(before))
+    for op in ops:
+        tokens = [_unescape(token) for token in op['path'].split('/')[1:]]
+        old = _resolve(document, tokens) if op['op'] != 'add' else None
+        entity = '/'.join(tokens[1:3]) or None
+        field = '/'.join(tokens[3:]) or None
+        log.append([tokens[0] if tokens else None, entity, field, old, op.get('value')])
+        apply_operation(document, op)
+    return log
+
+
+def _resolve(document, tokens):
+    target = document
+    for token in tokens:
+        target = target[int(token)] if isinstance(target, list) else target[token]
+    return target
+
+
+def apply_operation(document, op):
+    """Apply one add/remove/replace operation to a plain document in place."""
+    tokens = [_unescape(token) for token in op['path'].split('/')[1:]]
+    if not tokens:
+        raise ValueError("Patching the document root is not supported")
+    parent = _resolve(document, tokens[:-1])
+    last = tokens[-1]
+    kind = op['op']
+    if isinstance(parent, list):
+        position = len(parent) if last == '-' else int(last)
+        if kind == 'add':
+            parent.insert(position, op['value'])
+        elif kind == 'remove':
+            del parent[position]
+        elif kind == 'replace':
+            parent[position] = op['value']
+        else:
+            raise ValueError(f"Unsupported patch operation '{kind}'")
+    else:
+        if kind in ('add', 'replace'):
+            if kind == 'replace' and last not in parent:
+                raise KeyError(f"Cannot replace missing path {op['path']}")
+            parent[last] = op['value']
+        elif kind == 'remove':
+            del parent[last]
+        else:
+            raise ValueError(f"Unsupported patch operation '{kind}'")
+
+
+def write_patch(file_path, ops):
+    """Write operations as JSON Lines, one operation per line."""
+    with atomic_writer(file_path) as f:
+        for op in ops:
+            f.write(json.dumps(op, separators=(',', ':')) + '\n')
+
+
+def iter_patch(file_path):
+    """Stream the operations of a JSON Lines patch file."""
+    with open(file_path, 'r') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def apply_patch_file(store, file_path):
+    """Apply a patch file to a menu store and save it, under the store's lock. Returns the number of operations applied."""
+    with store.locked():
+        document = menus_to_dict(store.load())
+        applied = 0
+        for op in iter_patch(file_path):
+            apply_operation(document, op)
+            applied += 1
+        store.save(menus_from_dict(document))
+    return applied
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Diff menu documents into patches and apply patches to a store.")
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    diff = subcommands.add_parser('diff', help="write the patch turning one menu file into another")
+    diff.add_argument('before', help="original menu file (.json or .db)")
+    diff.add_argument('after', help="updated menu file (.json or .db)")
+    diff.add_argument('--output', help="patch file to write (default: stdout)")
+    diff.add_argument('--format', choices=['rfc6902', 'log'], default='rfc6902',
+                      help="JSON Lines of RFC 6902 operations, or (menu, entity, field, old, new) entries")
+    apply = subcommands.add_parser('apply', help="apply a patch file to a menu store")
+    apply.add_argument('patch', help="JSON Lines patch file")
+    apply.add_argument('--menu-file', default=setting('menu_file', MENU_FILE_PATH), help="menu document (.json) or SQLite store (.db)")
+    args = parser.parse_args(argv)
+
+    if args.command == 'apply':
+        applied = apply_patch_file(open_store(args.menu_file), args.patch)
+        print(f"Applied {applied} operation(s) to {args.menu_file}")
+        return
+
+    before = menus_to_dict(open_store(args.before).load())
+    ops = diff_documents(before, menus_to_dict(open_store(args.after).load()))
+    entries = ops if args.format == 'rfc6902' else change_log(ops, before)
+    if args.output:
+        write_patch(args.output, entries)
+        print(f"Wrote {len(entries)} change(s) to {args.output}")
+    else:
+        for entry in entries:
+            print(json.dumps(entry, separators=(',', ':')))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+import argparse
+import json
+import os
+import sqlite3
+import time
+
+try:
+    import fcntl
+except ImportError:  # No advisory locks on this platform; MenuFileLock is then a no-op
+    fcntl = None
+
+from menu_model import Ingredient, Menu, MenuItem, load_menus, save_menus
+
+# File extensions that select the SQLite backend in open_store()
+SQLITE_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS menus (
+    name TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    cost_multiplier,
+    categories TEXT,
+    extra TEXT
+);
+CREATE TABLE IF NOT EXISTS ingredients (
+    menu TEXT NOT NULL,
+    name TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    normalized_name TEXT NOT NULL,
+    cost,
+    unit TEXT,
+    category TEXT,
+    extra TEXT,
+    PRIMARY KEY (menu, name)
+);
+CREATE INDEX IF NOT EXISTS ingredients_normalized_name ON ingredients (menu, normalized_name);
+CREATE TABLE IF NOT EXISTS items (
+    menu TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    id TEXT,
+    name TEXT,
+    category TEXT,
+    selling_price,
+    has_recipe INTEGER,
+    buying_price,
+    ingredients TEXT,
+    description TEXT,
+    extra TEXT,
+    PRIMARY KEY (menu, position)
+);
+CREATE INDEX IF NOT EXISTS items_category ON items (menu, category);
+CREATE INDEX IF NOT EXISTS items_has_recipe ON items (menu, has_recipe);
+"""
+
+
+# Seconds between attempts while waiting for a menu file lock
+LOCK_POLL_INTERVAL = 0.1
+
+
+def lock_path_for(file_path):
+    """Lock file guarding a menu file."""
+    return file_path + '.lock'
+
+
+class MenuFileLock:
+    """
+    Advisory exclusive lock on <menu file>.lock, held around a load-modify-save cycle so
+    concurrent runs on the same file serialize. With timeout=None acquiring waits as long
+    as it takes; otherwise it gives up with TimeoutError after `timeout` seconds (0 fails fast).
+    """
+
+    def __init__(self, file_path, timeout=None):
+        self.path = lock_path_for(file_path)
+        self.timeout = timeout
+        self._file = None
+
+    def acquire(self):
+        self._file = open(self.path, 'a')
+        if fcntl is None:
+            return self
+        if self.timeout is None:
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+            return self
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                fcntl.flock(self._file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return self
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    self._file.close()
+                    self._file = None
+                    raise TimeoutError(f"{self.path} is held by another run")
+                time.sleep(LOCK_POLL_INTERVAL)
+
+    def release(self):
+        if self._file is not None:
+            if fcntl is not None:
+                fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        # Already acquired explicitly (e.g. to handle TimeoutError separately)
+        if self._file is not None:
+            return self
+        return self.acquire()
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+def normalize_ingredient_name(name):
+    """Key used for case-insensitive ingredient lookups."""
+    return name.lower()
+
+
+def _dumps(value):
+    return None if value is None else json.dumps(value)
+
+
+def _loads(text):
+    return None if text is None else json.loads(text)
+
+
+def _bool_or_none(value):
+    return None if value is None else bool(value)
+
+
+# Primary key columns of each table, parents first
+TABLE_KEYS = {
+    'menus': ('name',),
+    'ingredients': ('menu', 'name'),
+    'items': ('menu', 'position'),
+}
+
+
+def _table_rows(menus):
+    """Rows of each table for `menus`, keyed by primary key, in column order."""
+    rows = {table: {} for table in TABLE_KEYS}
+    for position, (menu_name, menu) in enumerate(menus.items()):
+        rows['menus'][(menu_name,)] = (menu_name, position, menu.cost_multiplier, _dumps(menu.categories),
+                                       _dumps(menu.extra or None))
+        for position, ing in enumerate(menu.ingredients.values()):
+            rows['ingredients'][(menu_name, ing.name)] = (
+                menu_name, ing.name, position, normalize_ingredient_name(ing.name), ing.cost, ing.unit,
+                ing.category, _dumps(ing.extra or None))
+        for position, item in enumerate(menu.items):
+            rows['items'][(menu_name, position)] = (
+                menu_name, position, item.id, item.name, item.category, item.selling_price,
+                None if item.has_recipe is None else int(item.has_recipe), item.buying_price,
+                _dumps(item.ingredients), item.description, _dumps(item.extra or None))
+    return rows
+
+
+def _same_row(stored, row):
+    """True if `row` matches the stored row, value types included (1 == 1.0 == True in Python, not on disk)."""
+    return stored == row and all(type(a) is type(b) for a, b in zip(stored, row))
+
+
+class JsonMenuStore:
+    """
+    Menu store backed by a single JSON document (the menus.json format).
+    Saves are atomic; compact stores skip pretty-printing.
+    """
+
+    def __init__(self, file_path, compact=False):
+        self.file_path = file_path
+        self.compact = compact
+
+    def locked(self, timeout=None):
+        return MenuFileLock(self.file_path, timeout)
+
+    def load(self):
+        return load_menus(self.file_path)
+
+    def save(self, menus):
+        save_menus(self.file_path, menus, indent=None if self.compact else 2)
+
+
+class SqliteMenuStore:
+    """
+    Menu store backed by a local SQLite database with the same schema as menus.json.
+
+    Ingredients are indexed by normalized name, items by category and hasRecipe, so single
+    lookups and price updates are index probes and only touch the affected rows. Saving after a
+    load writes only the rows that changed in between. Column types are left open for numeric
+    fields so ints and floats round-trip unchanged.
+    """
+
+    def __init__(self, file_path, create=False):
+        if not create and not os.path.exists(file_path):
+            raise FileNotFoundError(f"Menu database not found at {file_path}")
+        self.file_path = file_path
+        self.connection = sqlite3.connect(file_path)
+        self.connection.executescript(SCHEMA)
+        # Rows as of the last load or save, per table and primary key; save() only writes the difference
+        self._rows = None
+
+    def close(self):
+        self.connection.close()
+
+    def locked(self, timeout=None):
+        return MenuFileLock(self.file_path, timeout)
+
+    def load(self):
+        cursor = self.connection.cursor()
+        menus = {}
+        for name, cost_multiplier, categories, extra in cursor.execute(
+                "SELECT name, cost_multiplier, categories, extra FROM menus ORDER BY position"):
+            menus[name] = Menu(name, cost_multiplier=cost_multiplier, categories=_loads(categories),
+                               extra=_loads(extra))
+        for menu, name, cost, unit, category, extra in cursor.execute(
+                "SELECT menu, name, cost, unit, category, extra FROM ingredients ORDER BY menu, position"):
+            menus[menu].ingredients[name] = Ingredient(name, cost, unit, category, _loads(extra))
+        for row in cursor.execute(
+                "SELECT menu, name, category, selling_price, ingredients, has_recipe, id, buying_price, "
+                "description, extra FROM items ORDER BY menu, position"):
+            menu, name, category, selling_price, ingredients, has_recipe, item_id, buying_price, description, extra = row
+            menus[menu].items.append(MenuItem(name, category, selling_price, _loads(ingredients),
+                                              _bool_or_none(has_recipe), item_id, buying_price, description,
+                                              _loads(extra)))
+        self._rows = _table_rows(menus)
+        return menus
+
+    def save(self, menus):
+        """
+        Replace the stored menus with `menus` in one transaction. After a load only the rows
+        that differ from what was loaded are written or deleted; otherwise every row is rewritten.
+        """
+        rows = _table_rows(menus)
+        with self.connection:
+            if self._rows is None:
+                for table in reversed(TABLE_KEYS):
+                    self.connection.execute(f"DELETE FROM {table}")
+            for table, key_columns in TABLE_KEYS.items():
+                stored = self._rows[table] if self._rows is not None else {}
+                removed = [key for key in stored if key not in rows[table]]
+                if removed:
+                    self.connection.executemany(
+                        f"DELETE FROM {table} WHERE " + ' AND '.join(f"{column} = ?" for column in key_columns),
+                        removed)
+                changed = [row for key, row in rows[table].items() if not _same_row(stored.get(key), row)]
+                if changed:
+                    self.connection.executemany(
+                        f"INSERT OR REPLACE INTO {table} VALUES ({', '.join('?' * len(changed[0]))})", changed)
+        self._rows = rows
+
+    def find_ingredient(self, menu_name, name):
+        """Case-insensitive ingredient lookup. Returns an Ingredient or None."""
+        row = self.connection.execute(
+            "SELECT name, cost, unit, category, extra FROM ingredients "
+            "WHERE menu = ? AND normalized_name = ? ORDER BY position LIMIT 1",
+            (menu_name, normalize_ingredient_name(name))).fetchone()
+        if row is None:
+            return None
+        ing_name, cost, unit, category, extra = row
+        return Ingredient(ing_name, cost, unit, category, _loads(extra))
+
+    def update_ingredient(self, menu_name, ingredient):
+        """Write the cost, unit and category of one ingredient. Returns True if it exists."""
+        self._rows = None
+        with self.connection:
+            cursor = self.connection.execute(
+                "UPDATE ingredients SET cost = ?, unit = ?, category = ? WHERE menu = ? AND name = ?",
+                (ingredient.cost, ingredient.unit, ingredient.category, menu_name, ingredient.name))
+        return cursor.rowcount > 0
+
+    def items_by_category(self, menu_name, category):
+        """Names of the items of a menu in `category`."""
+        return [name for name, in self.connection.execute(
+            "SELECT name FROM items WHERE menu = ? AND category = ? ORDER BY position", (menu_name, category))]
+
+    def resale_item_names(self, menu_name):
+        """Names of the resale (hasRecipe: false) items of a menu."""
+        return [name for name, in self.connection.execute(
+            "SELECT name FROM items WHERE menu = ? AND has_recipe = 0 ORDER BY position", (menu_name,))]
+
+    def update_buying_price(self, menu_name, item_name, buying_price):
+        """Set buyingPrice of the resale items named `item_name`. Returns the number of rows updated."""
+        self._rows = None
+        with self.connection:
+            cursor = self.connection.execute(
+                "UPDATE items SET buying_price = ? WHERE menu = ? AND name = ? AND has_recipe = 0",
+                (buying_price, menu_name, item_name))
+        return cursor.rowcount
+
+
+def open_store(file_path, compact=False, create=False):
+    """
+    Open the menu store at `file_path`: SQLite for .db/.sqlite/.sqlite3, JSON otherwise.
+    `compact` writes JSON documents without indentation. A missing database raises
+    FileNotFoundError unless `create` is set, for stores that are about to be written.
+    """
+    if os.path.splitext(file_path)[1].lower() in SQLITE_EXTENSIONS:
+        return SqliteMenuStore(file_path, create)
+    return JsonMenuStore(file_path, compact)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Copy menus between JSON and SQLite stores.")
+    parser.add_argument('source', help="menus.json or SQLite database to read")
+    parser.add_argument('destination', help="menus.json or SQLite database to write")
+    args = parser.parse_args(argv)
+
+    menus = open_store(args.source).load()
+    destination = open_store(args.destination, create=True)
+    with destination.locked():
+        destination.save(menus)
+    print(f"Copied {len(menus)} menu(s) from {args.source} to {args.destination}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,444 @@
+import argparse
+import json
+import re
+from functools import partial
+
+from config import setting
+from instrumentation import Metrics
+from match_cache import load_match_cache, match_cache_path_for, save_match_cache
+from menu_model import MENU_FILE_PATH, Ingredient, Menu, MenuItem, atomic_writer
+from menu_store import open_store
+from fix_costings import fix_ingredient_costing
+from update_ingredients import apply_price, build_price_index
+from correct_resale_prices import correct_ingredients, new_error_report, reprice_resale_item
+from resale_matcher import ResaleMatcher
+from fix_menus import normalize_item
+
+REPORT_FILE_PATH = 'server/stream_report.json'
+
+# Characters read from the source document at a time
+CHUNK_SIZE = 1 << 16
+# Ingredients validated together by batched stages (see batched)
+VALIDATION_BATCH_SIZE = 1024
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+_decoder = json.JSONDecoder()
+
+
+class _Scanner:
+    """Incremental reader over a JSON text file that decodes one value at a time."""
+
+    def __init__(self, f, chunk_size=CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        data = self.f.read(self.chunk_size)
+        if not data:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Return the next non-whitespace character without consuming it."""
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of menu document")
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected '{char}' at offset {self.pos} of the buffer, found '{found}'")
+        self.pos += 1
+
+    def value(self):
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # The value may continue in the next chunk
+                if self._fill():
+                    continue
+                raise
+            # A number ending the buffer may have more digits in the next chunk
+            if end == len(self.buffer) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def members(self):
+        """Yield the keys of an object; the caller consumes each member's value before the next key."""
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            yield key
+            separator = self.peek()
+            self.pos += 1
+            if separator == '}':
+                return
+            if separator != ',':
+                raise ValueError(f"Expected ',' or '}}' in object, found '{separator}'")
+
+    def elements(self):
+        """Yield once per array element; the caller consumes each element before the next."""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield
+            separator = self.peek()
+            self.pos += 1
+            if separator == ']':
+                return
+            if separator != ',':
+                raise ValueError(f"Expected ',' or ']' in array, found '{separator}'")
+
+
+def _iter_ingredients(scanner):
+    for name in scanner.members():
+        yield Ingredient.from_dict(name, scanner.value())
+
+
+def _iter_items(scanner):
+    for _ in scanner.elements():
+        yield MenuItem.from_dict(scanner.value())
+
+
+def _iter_fields(scanner):
+    for key in scanner.members():
+        if key == 'initialIngredients':
+            values = _iter_ingredients(scanner)
+        elif key == 'items':
+            values = _iter_items(scanner)
+        else:
+            yield key, scanner.value()
+            continue
+        yield key, values
+        # Skip whatever the consumer left unread so the scanner stays in step
+        for _ in values:
+            pass
+
+
+def read_menu_stream(f, chunk_size=CHUNK_SIZE):
+    """
+    Read a menu document incrementally from an open text file. Yields (menu name, fields) per
+    menu, where fields yields (key, value) in document order: initialIngredients is a generator
+    of Ingredient, items a generator of MenuItem, and any other value is decoded as it is.
+    Each generator must be consumed (or abandoned) before advancing the one it came from.
+    """
+    scanner = _Scanner(f, chunk_size)
+    for name in scanner.members():
+        fields = _iter_fields(scanner)
+        yield name, fields
+        for _ in fields:
+            pass
+
+
+def iter_menus(file_path=MENU_FILE_PATH):
+    """Load a menu document one Menu at a time, holding only the current menu in memory."""
+    with open(file_path, 'r') as f:
+        for name, fields in read_menu_stream(f):
+            data = {}
+            for key, value in fields:
+                if key == 'initialIngredients':
+                    value = {ingredient.name: ingredient for ingredient in value}
+                elif key == 'items':
+                    value = list(value)
+                data[key] = value
+            yield Menu(name, data.pop('initialIngredients', None), data.pop('items', None),
+                       data.pop('costMultiplier', None), data.pop('categories', None), data or None)
+
+
+class MenuStreamWriter:
+    """
+    Write a menu document one menu, ingredient and item at a time. The text matches what
+    menu_model.save_menus writes for the same menus, indented or (indent=None) compact.
+    """
+
+    def __init__(self, f, indent=2):
+        self.f = f
+        self.indent = indent
+        self.key_separator = ':' if indent is None else ': '
+        self.menus = 0
+
+    def _newline(self, level):
+        return '' if self.indent is None else '\n' + ' ' * (self.indent * level)
+
+    def _dumps(self, value, level):
+        if self.indent is None:
+            return json.dumps(value, separators=(',', ':'))
+        # json.dumps escapes newlines inside strings, so every newline here is indentation
+        return json.dumps(value, indent=self.indent).replace('\n', self._newline(level))
+
+    def _container(self, opening, closing, entries, level):
+        """Write entries (text chunks or callables writing them) as the members of a container."""
+        self.f.write(opening)
+        count = 0
+        for entry in entries:
+            self.f.write((',' if count else '') + self._newline(level + 1))
+            if callable(entry):
+                entry()
+            else:
+                self.f.write(entry)
+            count += 1
+        self.f.write((self._newline(level) if count else '') + closing)
+
+    def _member(self, key):
+        return json.dumps(key) + self.key_separator
+
+    def _field(self, key, value):
+        self.f.write(self._member(key))
+        if key == 'initialIngredients' and not isinstance(value, dict):
+            self._container('{', '}', (self._member(ingredient.name) + self._dumps(ingredient.to_dict(), 3)
+                                       for ingredient in value), 2)
+        elif key == 'items' and not isinstance(value, list):
+            self._container('[', ']', (self._dumps(item.to_dict(), 3) for item in value), 2)
+        else:
+            self.f.write(self._dumps(value, 2))
+
+    def write_menu(self, name, fields):
+        """
+        Write one menu from (key, value) fields in output order. initialIngredients and items
+        may be iterables of Ingredient and MenuItem, consumed while writing.
+        """
+        self.f.write((',' if self.menus else '{') + self._newline(1) + self._member(name))
+        self._container('{', '}', (partial(self._field, key, value) for key, value in fields), 1)
+        self.menus += 1
+
+    def close(self):
+        self.f.write((self._newline(0) + '}') if self.menus else '{}')
+
+
+class StreamContext:
+    """
+    State of the menu being streamed, handed to stream stages: its name, the ingredients kept
+    so far, the item categories (collected by stages that rebuild them, else None), a per-menu
+    scratch dict, and the run-wide report and metrics.
+    """
+    __slots__ = ('menu', 'ingredients', 'categories', 'state', 'report', 'metrics')
+
+    def __init__(self, menu, report, metrics):
+        self.menu = menu
+        self.ingredients = {}
+        self.categories = None
+        self.state = {}
+        self.report = report
+        self.metrics = metrics
+
+
+def fix_costings_ingredient(context, ingredient):
+    reason = fix_ingredient_costing(ingredient)
+    if reason is None:
+        return ingredient
+    context.report.setdefault('fix_costings', []).append({
+        'ingredient': ingredient.name,
+        'menu': context.menu,
+        'reason': reason
+    })
+    return None
+
+
+def update_ingredients_ingredient(context, ingredient, price_index=None):
+    apply_price(ingredient.name, ingredient, price_index)
+    return ingredient
+
+
+def batched(function):
+    """Mark a stream stage as taking (context, iterable of entities) and yielding the kept ones."""
+    function.batched = True
+    return function
+
+
+@batched
+def correct_resale_prices_ingredients(context, ingredients):
+    # Validated VALIDATION_BATCH_SIZE at a time with the rules of the in-memory stage
+    error_report = context.report.setdefault('correct_resale_prices', new_error_report())
+    batch = Menu(context.menu)
+    for ingredient in ingredients:
+        batch.ingredients[ingredient.name] = ingredient
+        if len(batch.ingredients) == VALIDATION_BATCH_SIZE:
+            correct_ingredients({context.menu: batch}, error_report, context.metrics)
+            yield from batch.ingredients.values()
+            batch.ingredients = {}
+    if batch.ingredients:
+        correct_ingredients({context.menu: batch}, error_report, context.metrics)
+        yield from batch.ingredients.values()
+
+
+def correct_resale_prices_item(context, item, match_cache=None):
+    if item.has_recipe:
+        return item
+    # Every ingredient precedes the items, so the matcher is built once per menu
+    matcher = context.state.get('matcher')
+    if matcher is None:
+        matcher = context.state['matcher'] = ResaleMatcher(context.ingredients)
+    error_report = context.report.setdefault('correct_resale_prices', new_error_report())
+    reprice_resale_item(context.menu, item, matcher, context.ingredients, error_report, context.metrics,
+                        match_cache)
+    return item
+
+
+def fix_menus_item(context, item):
+    normalize_item(item)
+    if context.categories is None:
+        context.categories = {}
+    if item.category:
+        context.categories[item.category] = None
+    return item
+
+
+# Streamable maintenance stages in pipeline order, as (name, ingredient stage, item stage).
+# A stage is called with the StreamContext and one Ingredient or MenuItem, and returns it
+# (changed in place or replaced) or None to drop it; a @batched stage is called with the
+# StreamContext and an iterable of them and yields those it keeps. update_resale_prices is
+# not streamable yet and runs only in the in-memory pipeline.
+STREAM_STAGES = [
+    ('fix_costings', fix_costings_ingredient, None),
+    ('update_ingredients', update_ingredients_ingredient, None),
+    ('correct_resale_prices', correct_resale_prices_ingredients, correct_resale_prices_item),
+    ('fix_menus', None, fix_menus_item),
+]
+STREAM_STAGE_NAMES = [name for name, _, _ in STREAM_STAGES]
+
+
+def _each(function, context, entities):
+    for entity in entities:
+        entity = function(context, entity)
+        if entity is not None:
+            yield entity
+
+
+def _apply(functions, context, entities):
+    for function in functions:
+        if getattr(function, 'batched', False):
+            entities = function(context, entities)
+        else:
+            entities = _each(function, context, entities)
+    return entities
+
+
+def transform_menu(context, fields, ingredient_stages=(), item_stages=()):
+    """
+    Generator pipeline over one streamed menu: yields its (key, value) fields with the stages
+    applied lazily to each ingredient and item. Items that precede initialIngredients are held
+    back until the ingredients have been read, so item stages always see every ingredient.
+    """
+    def kept_ingredients(ingredients):
+        for ingredient in _apply(ingredient_stages, context, ingredients):
+            context.ingredients[ingredient.name] = ingredient
+            yield ingredient
+
+    seen_ingredients = False
+    held_items = None
+    seen_categories = False
+    for key, value in fields:
+        if key == 'initialIngredients':
+            seen_ingredients = True
+            yield key, kept_ingredients(value)
+            if held_items is not None:
+                yield 'items', _apply(item_stages, context, held_items)
+                held_items = None
+        elif key == 'items':
+            if seen_ingredients or not item_stages:
+                yield key, _apply(item_stages, context, value)
+            else:
+                held_items = list(value)
+        elif key == 'categories' and context.categories is not None:
+            seen_categories = True
+            yield key, list(context.categories)
+        else:
+            yield key, value
+    if held_items is not None:
+        yield 'items', _apply(item_stages, context, held_items)
+    if context.categories and not seen_categories:
+        yield 'categories', list(context.categories)
+
+
+def stream_menus(source_path, destination_path, stages=None, indent=2, metrics=None):
+    """
+    Stream the menu document at source_path through the (name, ingredient stage, item stage)
+    stages into destination_path (which may be the same file; it is replaced atomically).
+    Only one menu's ingredients and one item are held at a time. Returns the report keyed by stage.
+    """
+    stages = STREAM_STAGES if stages is None else stages
+    ingredient_stages = [ingredient for _, ingredient, _ in stages if ingredient is not None]
+    item_stages = [item for _, _, item in stages if item is not None]
+    if metrics is None:
+        metrics = Metrics('menu_stream')
+    report = {}
+    with open(source_path, 'r') as source, atomic_writer(destination_path) as destination:
+        writer = MenuStreamWriter(destination, indent)
+        for name, fields in read_menu_stream(source):
+            with metrics.stage('menus'):
+                context = StreamContext(name, report, metrics)
+                writer.write_menu(name, transform_menu(context, fields, ingredient_stages, item_stages))
+        writer.close()
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the menu maintenance stages over a menu document one menu at a time.")
+    parser.add_argument('--menu-file', default=setting('menu_file', MENU_FILE_PATH), help="menu document (.json) to read")
+    parser.add_argument('--output', help="where to write the updated document (default: replace --menu-file)")
+    parser.add_argument('--report-file', default=REPORT_FILE_PATH, help="where to write the merged report")
+    parser.add_argument('--only', action='append', choices=STREAM_STAGE_NAMES, metavar='STAGE',
+                        help="run only this stage (repeatable)")
+    parser.add_argument('--skip', action='append', choices=STREAM_STAGE_NAMES, metavar='STAGE',
+                        help="skip this stage (repeatable)")
+    parser.add_argument('--price-file', help="CSV price list for update_ingredients (default: its embedded list)")
+    parser.add_argument('--prefer', action='append', metavar='SUPPLIER',
+                        help="preferred supplier for update_ingredients, in order of preference (repeatable)")
+    parser.add_argument('--match-cache', help="fuzzy match decision cache for correct_resale_prices "
+                        "(default: <output>.matches.json)")
+    parser.add_argument('--no-match-cache', action='store_true',
+                        help="rematch every resale item from scratch instead of reusing cached decisions")
+    parser.add_argument('--compact', action='store_true', help="write the document without indentation")
+    parser.add_argument('--metrics-file', help="append this run's JSON metrics record to this file")
+    args = parser.parse_args(argv)
+
+    stages = [(name, ingredient, item) for name, ingredient, item in STREAM_STAGES
+              if (not args.only or name in args.only) and (not args.skip or name not in args.skip)]
+    if any(name == 'update_ingredients' for name, _, _ in stages):
+        price_index = build_price_index(args.price_file, args.prefer)
+        stages = [(name, partial(ingredient, price_index=price_index) if name == 'update_ingredients' else ingredient, item)
+                  for name, ingredient, item in stages]
+
+    output = args.output or args.menu_file
+    match_cache = None
+    if not args.no_match_cache and any(name == 'correct_resale_prices' for name, _, _ in stages):
+        match_cache_file = args.match_cache or match_cache_path_for(output)
+        match_cache = load_match_cache(match_cache_file)
+        stages = [(name, ingredient, partial(item, match_cache=match_cache) if name == 'correct_resale_prices' else item)
+                  for name, ingredient, item in stages]
+    metrics = Metrics('menu_stream')
+    with open_store(output, create=True).locked():
+        report = stream_menus(args.menu_file, output, stages, None if args.compact else 2, metrics)
+        if match_cache is not None:
+            # Decisions for ingredient sets no longer streamed are left to LRU eviction
+            save_match_cache(match_cache_file, match_cache)
+
+    with atomic_writer(args.report_file) as f:
+        json.dump(report, f, indent=2)
+    print(f"Streamed {args.menu_file} through {', '.join(name for name, _, _ in stages) or 'no stages'} "
+          f"into {output}. Report written to {args.report_file}")
+    if args.metrics_file:
+        metrics.write(args.metrics_file)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import argparse
+import importlib
+import os
+import sys
+
+from config import CONFIG_ENV
+
+# Command -> (module whose main(argv) runs it, summary). A command's module is imported only
+# when that command runs, so --help and dispatch load neither NumPy nor fuzzywuzzy
+COMMANDS = {
+    'costings': ('fix_costings', "convert kg/L ingredient costs to g/ml and drop out-of-range costs"),
+    'menus': ('fix_menus', "normalize recipe/resale fields and categories"),
+    'ingredients': ('update_ingredients', "update ingredient costs from a supplier price list"),
+    'resale-prices': ('correct_resale_prices', "correct costs and fuzzy match resale item buying prices"),
+    'exact-resale-prices': ('update_resale_prices', "set resale buying prices from exactly matching ingredients"),
+    'descriptions': ('update_dish_descriptions', "copy dish descriptions from DishDescriptions.ts"),
+    'analysis': ('costing', "summarize item costs and profit margin bands"),
+    'analytics': ('analytics', "export precomputed costs, margins and rollups for the Analysis page"),
+    'pipeline': ('pipeline', "run the maintenance scripts as one in-memory pipeline"),
+    'stream': ('menu_stream', "run the maintenance stages one menu at a time"),
+    'sites': ('multisite', "run the pipeline over many sites in parallel"),
+    'catalog': ('catalog', "share one canonical ingredient catalog between sites"),
+    'validate': ('validation', "validate ingredients against the declared rules"),
+    'matches': ('match_cache', "inspect the resale match cache and record overrides"),
+    'patch': ('menu_patch', "diff menu documents into patches and apply them"),
+    'deps': ('dependency_index', "build the ingredient dependency index or apply a cost update"),
+    'optimize-prices': ('price_optimizer', "compute selling prices that reach a margin band"),
+    'scenarios': ('scenarios', "evaluate what-if ingredient price scenarios"),
+    'store': ('menu_store', "copy menus between JSON and SQLite stores"),
+}
+
+
+def command_list():
+    width = max(len(name) for name in COMMANDS)
+    return 'commands:\n' + '\n'.join(f"  {name:{width}}  {summary}" for name, (_, summary) in COMMANDS.items())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog=os.path.basename(sys.argv[0]) or 'menu_tools.py',
+        description="Menu maintenance and analysis commands.",
+        epilog=command_list() + "\n\nRun COMMAND --help for the options of a command.",
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--config', help="JSON file of settings such as menu_file and descriptions_file "
+                        f"(default: ${CONFIG_ENV}, else ./menu_tools.json if present)")
+    parser.add_argument('command', choices=COMMANDS, metavar='COMMAND', help="command to run")
+    parser.add_argument('args', nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.config:
+        # Through the environment, so worker processes of parallel commands see it too
+        os.environ[CONFIG_ENV] = args.config
+    module_name, _ = COMMANDS[args.command]
+    module = importlib.import_module(module_name)
+    # Commands parse their own options; name the command in their usage and error messages
+    sys.argv[0] = f"{parser.prog} {args.command}"
+    module.main(args.args)
+
+if __name__ == "__main__":
+    main()
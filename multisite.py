@@ -0,0 +1,166 @@
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from fnmatch import fnmatch
+from functools import partial
+
+from manifest import ChangeSet, build_manifest, load_manifest, manifest_path_for, save_manifest
+from menu_model import atomic_writer
+from menu_store import open_store
+from pipeline import STAGE_NAMES, run_pipeline, select_stages
+from update_ingredients import build_price_index
+
+REPORT_FILE_PATH = 'server/multisite_report.json'
+
+# File names picked up when a directory is given
+MENU_FILE_PATTERNS = ['menus.json', 'menus.db']
+
+# Per-process cache so each worker builds the price index once, not once per site
+_price_indexes = {}
+
+
+def discover_menu_files(root, patterns=MENU_FILE_PATTERNS):
+    """Every menu file under root (or root itself if it is a file), in sorted order."""
+    if os.path.isfile(root):
+        return [root]
+    found = []
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories[:] = sorted(d for d in subdirectories if d != 'node_modules' and not d.startswith('.'))
+        found.extend(os.path.join(directory, name) for name in sorted(files)
+                     if any(fnmatch(name, pattern) for pattern in patterns))
+    return found
+
+
+def _price_index(price_file, preferred_suppliers):
+    key = (price_file, tuple(preferred_suppliers or ()))
+    if key not in _price_indexes:
+        _price_indexes[key] = build_price_index(price_file, preferred_suppliers)
+    return _price_indexes[key]
+
+
+def _stages(only, skip, price_file, preferred_suppliers):
+    """The selected stages and the price index their update_ingredients stage uses (None without one)."""
+    stages = select_stages(only, skip)
+    if 'update_ingredients' not in [name for name, _ in stages]:
+        return stages, None
+    price_index = _price_index(price_file, preferred_suppliers)
+    return [(name, partial(stage, price_index=price_index) if name == 'update_ingredients' else stage)
+            for name, stage in stages], price_index
+
+
+def process_site(file_path, only=None, skip=None, incremental=False, price_file=None, preferred_suppliers=None,
+                 compact=False, lock_timeout=None):
+    """
+    Run the pipeline over one menu file and save it, holding the file's lock throughout.
+    Returns (file_path, report). A site that fails (lock timeout, unreadable file, a stage
+    raising) gets the report {'error': ...} instead, so the other sites still complete.
+    """
+    try:
+        stages, price_index = _stages(only, skip, price_file, preferred_suppliers)
+        store = open_store(file_path, compact)
+        try:
+            lock = store.locked(lock_timeout).acquire()
+        except TimeoutError as e:
+            return file_path, {'error': str(e)}
+        with lock:
+            menus = store.load()
+            changes = None
+            if incremental:
+                changes = ChangeSet(menus, load_manifest(manifest_path_for(file_path)), price_index)
+            report = run_pipeline(menus, stages, changes)
+            store.save(menus)
+            if changes is not None:
+                save_manifest(manifest_path_for(file_path), build_manifest(menus, changes))
+    except Exception as e:
+        return file_path, {'error': f"{type(e).__name__}: {e}"}
+    return file_path, report
+
+
+def process_menu(menu_name, menu, only=None, skip=None, price_file=None, preferred_suppliers=None):
+    """Run the pipeline over one menu of a document. Returns (menu_name, menu, report)."""
+    menus = {menu_name: menu}
+    stages, _ = _stages(only, skip, price_file, preferred_suppliers)
+    report = run_pipeline(menus, stages)
+    return menu_name, menus.get(menu_name), report
+
+
+def _map(function, jobs, workers):
+    """Apply function to each argument tuple in jobs, in a process pool when workers > 1, keeping job order."""
+    if workers <= 1 or len(jobs) <= 1:
+        return [function(*job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+        return list(executor.map(function, *zip(*jobs)))
+
+
+def run_sites(file_paths, workers=None, **options):
+    """Process every menu file independently in parallel. Returns the report keyed by file path."""
+    workers = workers or os.cpu_count() or 1
+    jobs = [(path, options.get('only'), options.get('skip'), options.get('incremental', False),
+             options.get('price_file'), options.get('preferred_suppliers'), options.get('compact', False),
+             options.get('lock_timeout')) for path in file_paths]
+    return dict(_map(process_site, jobs, workers))
+
+
+def run_menus(file_path, workers=None, **options):
+    """
+    Process every menu key of one document in parallel, then save the document once.
+    The document stays locked from load to save. Returns the report keyed by menu name.
+    """
+    workers = workers or os.cpu_count() or 1
+    store = open_store(file_path, options.get('compact', False))
+    with store.locked(options.get('lock_timeout')):
+        menus = store.load()
+        jobs = [(name, menu, options.get('only'), options.get('skip'), options.get('price_file'),
+                 options.get('preferred_suppliers')) for name, menu in menus.items()]
+        report = {}
+        for name, menu, menu_report in _map(process_menu, jobs, workers):
+            menus[name] = menu
+            report[name] = menu_report
+        store.save(menus)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the maintenance pipeline over many sites in parallel.")
+    parser.add_argument('paths', nargs='+', help="menu files or directories to search for menu files")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--per-menu', action='store_true',
+                        help="split a single document by menu key instead of processing whole files")
+    parser.add_argument('--report-file', default=REPORT_FILE_PATH, help="where to write the merged report")
+    parser.add_argument('--only', action='append', choices=STAGE_NAMES, metavar='STAGE',
+                        help="run only this stage (repeatable)")
+    parser.add_argument('--skip', action='append', choices=STAGE_NAMES, metavar='STAGE',
+                        help="skip this stage (repeatable)")
+    parser.add_argument('--price-file', help="CSV price list for update_ingredients")
+    parser.add_argument('--prefer', action='append', metavar='SUPPLIER',
+                        help="preferred supplier for update_ingredients (repeatable)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only reprocess entries changed since the last incremental run of each file")
+    parser.add_argument('--compact', action='store_true', help="save JSON documents without indentation")
+    parser.add_argument('--lock-timeout', type=float, default=None,
+                        help="seconds to wait for another run on the same menu file (default: wait; 0 fails fast)")
+    args = parser.parse_args(argv)
+
+    options = dict(only=args.only, skip=args.skip, price_file=args.price_file, preferred_suppliers=args.prefer,
+                   compact=args.compact, lock_timeout=args.lock_timeout)
+    if args.per_menu:
+        if len(args.paths) != 1 or not os.path.isfile(args.paths[0]):
+            parser.error("--per-menu takes exactly one menu file")
+        if args.incremental:
+            parser.error("--incremental works per file and cannot be combined with --per-menu")
+        report = run_menus(args.paths[0], args.workers, **options)
+    else:
+        file_paths = [path for root in args.paths for path in discover_menu_files(root)]
+        report = run_sites(file_paths, args.workers, incremental=args.incremental, **options)
+
+    with atomic_writer(args.report_file) as f:
+        json.dump(report, f, indent=2)
+
+    print(f"Processed {len(report)} site(s)/menu(s). Report written to {args.report_file}")
+    for path, site_report in report.items():
+        if 'error' in site_report:
+            print(f"- {path} failed: {site_report['error']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+import re
+from functools import lru_cache
+
+# Dietary codes a menu marks dishes with
+DIETARY_CODES = ('V', 'VE', 'VG', 'VEG', 'VEGAN', 'GF', 'DF', 'N', 'NF')
+
+# Trailing dietary markers such as "(V)", "(GF) (N)", "[VG]" or "(V, GF)". Other parentheticals,
+# such as the sizes in "Efes (Pint)" or "Coke (330ml)", stay part of the name
+_CODE = '(?:' + '|'.join(DIETARY_CODES) + ')'
+DIETARY_SUFFIX = re.compile(rf'(?:\s*[(\[]\s*{_CODE}(?:\s*[,/]\s*{_CODE})*\s*[)\]])+\s*$', re.IGNORECASE)
+
+# Word boundaries inside camelCase keys: kingPrawns, cocaCola, BBQSauce
+CAMEL_BOUNDARY = re.compile(r'(?<=[a-z0-9])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])')
+
+APOSTROPHES = re.compile(r"['’`]")
+WORDS = re.compile(r'[^\W_]+')
+
+# Stems of the words seen so far; menus reuse a small vocabulary
+_stems = {}
+MAX_STEMS = 65536
+
+# Trie key marking the end of a name; words are never empty
+_END = ''
+
+
+def exact_key(name):
+    """Case-insensitive key of a name, as used by the exact matches of the price list and resale items."""
+    return name.strip().lower()
+
+
+def _singular(word):
+    """
+    Crude singular stem of a word, applied alike to names and queries so the two meet:
+    berry/berries and chilli/chillies stem to "berri" and "chilli", tomatoes to "tomato".
+    """
+    if len(word) <= 2 or not word.isalpha():
+        return word
+    if word.endswith('ies'):
+        return word[:-3] + 'i'
+    if word.endswith('ie'):
+        return word[:-1]
+    if word.endswith('y'):
+        return word[:-1] + 'i'
+    if len(word) <= 3:
+        return word
+    if word.endswith(('sses', 'ches', 'shes', 'xes', 'oes')):
+        return word[:-2]
+    if word.endswith(('ss', 'us', 'is')) or not word.endswith('s'):
+        return word
+    return word[:-1]
+
+
+@lru_cache(maxsize=65536)
+def name_key(name):
+    """
+    Normalized key of a name: dietary suffixes dropped, camelCase split into words, case,
+    punctuation and plurals ignored. "King Prawns (GF)", "kingPrawns" and "king-prawn" all
+    have the key "king prawn". Keys are for comparison, not display.
+    """
+    name = name or ''
+    if name.endswith((')', ']')):
+        name = DIETARY_SUFFIX.sub('', name)
+    text = CAMEL_BOUNDARY.sub(' ', name).lower()
+    if '&' in text:
+        text = text.replace('&', ' and ')
+    if "'" in text or '’' in text or '`' in text:
+        text = APOSTROPHES.sub('', text)
+    stems = []
+    for word in WORDS.findall(text):
+        stem = _stems.get(word)
+        if stem is None:
+            stem = _singular(word)
+            if len(_stems) < MAX_STEMS:
+                _stems[word] = stem
+        stems.append(stem)
+    return ' '.join(stems)
+
+
+class NameResolver:
+    """
+    Compiled index resolving free-form names to canonical names in O(1).
+
+    Built once from the canonical names (ingredient keys, price list rows, dish names) and
+    optional aliases (alias -> canonical name). A query resolves through the first tier that
+    knows it: alias by exact key, exact key, alias by name_key, name_key. Within a tier the
+    name listed first wins, as in a linear scan. The name_key index is only computed once a
+    query misses the exact tiers, and the prefix trie once with_prefix is called. Queries
+    that resolve to nothing are left to the caller's fuzzy matching.
+    """
+    __slots__ = ('names', 'values', 'by_exact', '_by_key', 'aliases_by_exact', 'aliases_by_key', '_trie')
+
+    def __init__(self, names=(), aliases=None, values=None):
+        """`values` runs parallel to `names` and is what get() returns (default: the names)."""
+        self.names = []
+        self.values = []
+        self.by_exact = {}
+        self._by_key = None
+        self._trie = None
+        self.aliases_by_exact = {}
+        self.aliases_by_key = {}
+        for alias, target in (aliases or {}).items():
+            self.aliases_by_exact.setdefault(exact_key(alias), target)
+            self.aliases_by_key.setdefault(name_key(alias), target)
+        for name, value in zip(names, values if values is not None else names):
+            self.add(name, value)
+
+    def add(self, name, value=None):
+        """Index another canonical name. Returns its position."""
+        position = len(self.names)
+        self.names.append(name)
+        self.values.append(name if value is None else value)
+        self.by_exact.setdefault(exact_key(name), position)
+        if self._by_key is not None:
+            self._by_key.setdefault(name_key(name), position)
+        if self._trie is not None:
+            self._insert(position)
+        return position
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, query):
+        return self.position(query) is not None
+
+    @property
+    def by_key(self):
+        """name_key -> position of the first name with that key, computed on first use."""
+        if self._by_key is None:
+            self._by_key = {}
+            for position, name in enumerate(self.names):
+                self._by_key.setdefault(name_key(name), position)
+        return self._by_key
+
+    def _target(self, target):
+        position = self.by_exact.get(exact_key(target))
+        return position if position is not None else self.by_key.get(name_key(target))
+
+    def position(self, query):
+        """Position of the name `query` resolves to, or None. An alias whose target is not indexed is ignored."""
+        exact = exact_key(query)
+        target = self.aliases_by_exact.get(exact)
+        if target is not None:
+            position = self._target(target)
+            if position is not None:
+                return position
+        position = self.by_exact.get(exact)
+        if position is not None:
+            return position
+        key = name_key(query)
+        target = self.aliases_by_key.get(key)
+        if target is not None:
+            position = self._target(target)
+            if position is not None:
+                return position
+        return self.by_key.get(key)
+
+    def resolve(self, query):
+        """The canonical name `query` resolves to, or None."""
+        position = self.position(query)
+        return self.names[position] if position is not None else None
+
+    def resolve_exact(self, query):
+        """The canonical name equal to `query` up to case and surrounding whitespace, or None."""
+        position = self.by_exact.get(exact_key(query))
+        return self.names[position] if position is not None else None
+
+    def get(self, query, default=None):
+        """The value of the name `query` resolves to, or `default`."""
+        position = self.position(query)
+        return self.values[position] if position is not None else default
+
+    def distinct(self):
+        """Number of distinct name_keys among the names."""
+        return len(self.by_key)
+
+    def _insert(self, position):
+        node = self._trie
+        for word in name_key(self.names[position]).split():
+            node = node.setdefault(word, {})
+        node.setdefault(_END, []).append(position)
+
+    def with_prefix(self, prefix):
+        """
+        Names whose name_key starts with the words of `prefix`, the last of which may be
+        partial ("king pra" finds "King Prawns"), in the order they were listed.
+        """
+        if self._trie is None:
+            self._trie = {}
+            for position in range(len(self.names)):
+                self._insert(position)
+        words = name_key(prefix).split()
+        nodes = [self._trie]
+        for word in words[:-1]:
+            nodes = [node[word] for node in nodes if word in node]
+        if words:
+            last = words[-1]
+            nodes = [child for node in nodes for word, child in node.items() if word and word.startswith(last)]
+        positions = []
+        while nodes:
+            node = nodes.pop()
+            for word, child in node.items():
+                if word:
+                    nodes.append(child)
+                else:
+                    positions.extend(child)
+        return [self.names[position] for position in sorted(positions)]
@@ -0,0 +1,66 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from resale_matcher import ResaleMatcher
+
+# Chunks per worker; more than one so a worker that drew slow queries does not hold up the rest
+CHUNKS_PER_WORKER = 4
+
+# Below this many queries a pool costs more than it saves
+MIN_PARALLEL_QUERIES = 64
+
+# Per-process matchers, built once by each worker from the names it was started with
+_matchers = {}
+
+
+def _start_worker(names_by_menu):
+    """
+    Pool initializer: index each menu's ingredient names once per worker. The names arrive with
+    the worker process (inherited on fork, pickled once per worker on spawn), never with a task.
+    """
+    _matchers.clear()
+    for menu_name, names in names_by_menu.items():
+        _matchers[menu_name] = ResaleMatcher(names)
+
+
+def _match_chunk(menu_name, queries):
+    matcher = _matchers[menu_name]
+    return [matcher.best_match(query, threshold, partial, exclude) for query, threshold, partial, exclude in queries]
+
+
+def _chunks(queries_by_menu, chunk_count):
+    """Split every menu's queries into contiguous (menu_name, start, queries) chunks."""
+    total = sum(len(queries) for queries in queries_by_menu.values())
+    size = max(1, -(-total // chunk_count))
+    for menu_name, queries in queries_by_menu.items():
+        for start in range(0, len(queries), size):
+            yield menu_name, start, queries[start:start + size]
+
+
+def best_matches(matchers, queries_by_menu, workers=None):
+    """
+    Run ResaleMatcher.best_match for every query across a process pool.
+
+    `matchers` maps a menu name to its ResaleMatcher; `queries_by_menu` maps it to a list of
+    (query, threshold, partial, exclude) best_match arguments. Queries are sharded into
+    contiguous chunks and the results put back in query order, so they are exactly what a
+    serial loop would return. Small batches run in this process on `matchers`.
+    Returns menu name -> list of (name, score).
+    """
+    workers = workers or os.cpu_count() or 1
+    total = sum(len(queries) for queries in queries_by_menu.values())
+    if workers <= 1 or total < MIN_PARALLEL_QUERIES:
+        return {menu_name: [matchers[menu_name].best_match(*query) for query in queries]
+                for menu_name, queries in queries_by_menu.items()}
+
+    # Workers only need the names of menus that have queries
+    names = {menu_name: matchers[menu_name].names for menu_name, queries in queries_by_menu.items() if queries}
+    chunks = list(_chunks(queries_by_menu, workers * CHUNKS_PER_WORKER))
+    results = {menu_name: [None] * len(queries) for menu_name, queries in queries_by_menu.items()}
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), initializer=_start_worker,
+                             initargs=(names,)) as executor:
+        chunk_results = executor.map(_match_chunk, [menu_name for menu_name, _, _ in chunks],
+                                     [queries for _, _, queries in chunks])
+        for (menu_name, start, queries), matches in zip(chunks, chunk_results):
+            results[menu_name][start:start + len(queries)] = matches
+    return results
@@ -0,0 +1,174 @@
+import argparse
+import json
+import os
+from contextlib import nullcontext
+from functools import partial
+
+from config import setting
+from instrumentation import Metrics
+from menu_model import MENU_FILE_PATH, atomic_writer, menus_to_dict
+from menu_store import open_store
+from match_cache import load_match_cache, match_cache_path_for, prune_for_menus, save_match_cache
+from manifest import ChangeSet, build_manifest, load_manifest, manifest_path_for, save_manifest
+from menu_patch import diff_documents, snapshot, write_patch
+from analytics import FORMATS, export_analytics
+from fix_costings import fix_costings
+from update_ingredients import build_price_index, update_ingredient_costs
+from correct_resale_prices import update_resale_item_prices
+from update_resale_prices import update_resale_prices
+from fix_menus import fix_menus
+
+REPORT_FILE_PATH = 'server/pipeline_report.json'
+
+def correct_resale_prices_stage(menus, changes=None, metrics=None, match_cache=None, match_workers=1):
+    _, error_report = update_resale_item_prices(menus, changes, metrics, match_cache, match_workers)
+    return error_report
+
+def update_ingredients_stage(menus, changes=None, price_index=None):
+    update_ingredient_costs(menus, changes, price_index)
+
+def fix_menus_stage(menus, changes=None):
+    fix_menus(menus, changes)
+
+# Maintenance stages in the order they run. Each takes the loaded menus and an optional
+# manifest.ChangeSet (incremental runs), mutates the menus in place and returns its report
+# (or None if it has nothing to report).
+STAGES = [
+    ('fix_costings', fix_costings),
+    ('update_ingredients', update_ingredients_stage),
+    ('correct_resale_prices', correct_resale_prices_stage),
+    ('update_resale_prices', update_resale_prices),
+    ('fix_menus', fix_menus_stage),
+]
+STAGE_NAMES = [name for name, _ in STAGES]
+
+def select_stages(only=None, skip=None):
+    """Return the (name, function) stages to run, keeping pipeline order."""
+    for name in list(only or []) + list(skip or []):
+        if name not in STAGE_NAMES:
+            raise ValueError(f"Unknown stage '{name}'. Available stages: {', '.join(STAGE_NAMES)}")
+    return [(name, stage) for name, stage in STAGES
+            if (not only or name in only) and (not skip or name not in skip)]
+
+def run_pipeline(menus, stages=None, changes=None, metrics=None):
+    """
+    Run the stages over the in-memory menus. With a ChangeSet only dirty entries and their
+    dependents are reprocessed. With an instrumentation.Metrics each stage is timed on it.
+    Returns the merged report keyed by stage name.
+    """
+    report = {}
+    for name, stage in (STAGES if stages is None else stages):
+        if metrics is not None:
+            with metrics.stage(name):
+                stage_report = stage(menus, changes)
+        else:
+            stage_report = stage(menus, changes)
+        if stage_report is not None:
+            report[name] = stage_report
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the menu maintenance scripts as one in-memory pipeline.")
+    parser.add_argument('--menu-file', default=setting('menu_file', MENU_FILE_PATH), help="menu document (.json) or SQLite store (.db) to update")
+    parser.add_argument('--report-file', default=REPORT_FILE_PATH, help="where to write the merged report")
+    parser.add_argument('--only', action='append', choices=STAGE_NAMES, metavar='STAGE',
+                        help="run only this stage (repeatable)")
+    parser.add_argument('--skip', action='append', choices=STAGE_NAMES, metavar='STAGE',
+                        help="skip this stage (repeatable)")
+    parser.add_argument('--price-file', help="CSV price list for update_ingredients (default: its embedded list)")
+    parser.add_argument('--prefer', action='append', metavar='SUPPLIER',
+                        help="preferred supplier for update_ingredients, in order of preference (repeatable)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only reprocess entries changed since the last incremental run")
+    parser.add_argument('--manifest-file', help="content-hash manifest for --incremental "
+                        "(default: <menu-file>.manifest.json)")
+    parser.add_argument('--match-cache', help="fuzzy match decision cache for correct_resale_prices "
+                        "(default: <menu-file>.matches.json)")
+    parser.add_argument('--no-match-cache', action='store_true',
+                        help="rematch every resale item from scratch instead of reusing cached decisions")
+    parser.add_argument('--match-workers', type=int, default=1,
+                        help="processes to spread correct_resale_prices fuzzy matching over "
+                        "(default: 1, match serially; 0: one per CPU)")
+    parser.add_argument('--patch-file', help="also write the changes as a JSON Lines RFC 6902 patch")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="write the patch (--patch-file) and report but leave the menu file, its match "
+                        "cache and its lock file untouched")
+    parser.add_argument('--analytics-file', help="after saving, export the Analysis page artifact to this file")
+    parser.add_argument('--analytics-format', choices=FORMATS, default='json',
+                        help="format of --analytics-file: one JSON document or NDJSON per menu (default: json)")
+    parser.add_argument('--compact', action='store_true', help="save JSON documents without indentation")
+    parser.add_argument('--lock-timeout', type=float, default=None,
+                        help="seconds to wait for another run on the same menu file (default: wait; 0 fails fast)")
+    parser.add_argument('--metrics-file', help="append a JSON metrics record of stage timings and counters "
+                        "to this file")
+    parser.add_argument('--trace-rate', type=float, default=0.0,
+                        help="fraction of resale items whose details are kept in the metrics record")
+    args = parser.parse_args(argv)
+    if args.dry_run and not args.patch_file:
+        parser.error("--dry-run needs --patch-file")
+
+    metrics = Metrics('pipeline', trace_rate=args.trace_rate)
+    stages = select_stages(args.only, args.skip)
+    price_index = None
+    if 'update_ingredients' in [name for name, _ in stages]:
+        # Built here rather than by the stage, so incremental runs can tell which offers changed
+        price_index = build_price_index(args.price_file, args.prefer)
+        stages = [(name, partial(stage, price_index=price_index) if name == 'update_ingredients' else stage)
+                  for name, stage in stages]
+    match_cache = None
+    if not args.no_match_cache and 'correct_resale_prices' in [name for name, _ in stages]:
+        match_cache_file = args.match_cache or match_cache_path_for(args.menu_file)
+        match_cache = load_match_cache(match_cache_file)
+    match_workers = args.match_workers or os.cpu_count() or 1
+    stages = [(name, partial(stage, metrics=metrics, match_cache=match_cache, match_workers=match_workers)
+               if name == 'correct_resale_prices' else stage)
+              for name, stage in stages]
+    store = open_store(args.menu_file, compact=args.compact)
+    # A dry run writes nothing next to the menu file, not even the lock file; saves are atomic
+    # renames, so it reads a whole document even while another run updates it
+    lock = nullcontext()
+    if not args.dry_run:
+        try:
+            lock = store.locked(args.lock_timeout).acquire()
+        except TimeoutError as e:
+            parser.exit(1, f"Another run is updating {args.menu_file}: {e}\n")
+    with lock:
+        with metrics.stage('load'):
+            menus = store.load()
+        changes = None
+        if args.incremental:
+            manifest_file = args.manifest_file or manifest_path_for(args.menu_file)
+            changes = ChangeSet(menus, load_manifest(manifest_file), price_index)
+            print(f"Incremental run: {changes.count()} changed ingredient(s)/item(s) since the last run")
+        before = snapshot(menus) if args.patch_file else None
+        report = run_pipeline(menus, stages, changes, metrics)
+        if args.patch_file:
+            with metrics.stage('diff'):
+                ops = diff_documents(before, menus_to_dict(menus))
+            write_patch(args.patch_file, ops)
+            print(f"Wrote {len(ops)} patch operation(s) to {args.patch_file}")
+        if not args.dry_run:
+            with metrics.stage('save'):
+                store.save(menus)
+            if changes is not None:
+                save_manifest(manifest_file, build_manifest(menus, changes))
+            if args.analytics_file:
+                with metrics.stage('analytics'):
+                    digest, written = export_analytics(menus, args.analytics_file, args.analytics_format)
+                print(f"{'Wrote' if written else 'Unchanged'} analytics {args.analytics_file} (sha256 {digest})")
+        if match_cache is not None:
+            metrics.count('match_cache_hits', match_cache.hits)
+            metrics.count('match_cache_misses', match_cache.misses)
+            if not args.dry_run:
+                prune_for_menus(match_cache, menus)
+                save_match_cache(match_cache_file, match_cache)
+
+    with atomic_writer(args.report_file) as f:
+        json.dump(report, f, indent=2)
+    if args.metrics_file:
+        metrics.write(args.metrics_file)
+
+    print(f"Ran {len(stages)} stage(s): {', '.join(name for name, _ in stages)}. Report written to {args.report_file}")
+
+if __name__ == "__main__":
+    main()
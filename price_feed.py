@@ -0,0 +1,137 @@
+import csv
+
+from name_resolver import NameResolver, exact_key
+
+# Column names of a supplier price list (the format of update_ingredients.csv_data)
+INGREDIENT_COLUMN = 'Ingredient'
+CATEGORY_COLUMN = 'Category'
+UNIT_COLUMN = 'Unit'
+PRICE_COLUMN = 'Final Price (incl. VAT)'
+SOURCE_COLUMN = 'Source'
+
+
+def normalize_price_key(name):
+    """Key under which price list rows for the same ingredient are folded together."""
+    return exact_key(name)
+
+
+class PriceOffer:
+    """One supplier's price for an ingredient."""
+    __slots__ = ('ingredient', 'category', 'unit', 'price', 'source')
+
+    def __init__(self, ingredient, category, unit, price, source):
+        self.ingredient = ingredient
+        self.category = category
+        self.unit = unit
+        self.price = price
+        self.source = source
+
+    def suppliers(self):
+        """Supplier names listed in the source column."""
+        return [supplier.strip() for supplier in (self.source or '').split(',') if supplier.strip()]
+
+    def to_dict(self):
+        return {'ingredient': self.ingredient, 'category': self.category, 'unit': self.unit,
+                'price': self.price, 'source': self.source}
+
+    def __repr__(self):
+        return f"PriceOffer({self.ingredient!r}, {self.price!r} per {self.unit!r}, source={self.source!r})"
+
+
+def iter_price_offers(lines):
+    """
+    Stream PriceOffers from CSV lines (an open file or any iterable of lines), one row at a
+    time. Rows without an ingredient or with an unparseable price are skipped.
+    """
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return
+    columns = {name.strip(): position for position, name in enumerate(header)}
+    if INGREDIENT_COLUMN not in columns or PRICE_COLUMN not in columns:
+        raise ValueError(f"Price list needs '{INGREDIENT_COLUMN}' and '{PRICE_COLUMN}' columns, got {header}")
+    ingredient_at = columns[INGREDIENT_COLUMN]
+    price_at = columns[PRICE_COLUMN]
+    category_at = columns.get(CATEGORY_COLUMN)
+    unit_at = columns.get(UNIT_COLUMN)
+    source_at = columns.get(SOURCE_COLUMN)
+    for row in reader:
+        try:
+            ingredient = row[ingredient_at].strip()
+            price = float(row[price_at])
+        except (IndexError, ValueError):
+            continue
+        if not ingredient:
+            continue
+        yield PriceOffer(ingredient,
+                         row[category_at] if category_at is not None and category_at < len(row) else None,
+                         row[unit_at] if unit_at is not None and unit_at < len(row) else None,
+                         price,
+                         row[source_at] if source_at is not None and source_at < len(row) else None)
+
+
+class PriceIndex:
+    """
+    The chosen offer per ingredient, keyed by normalize_price_key.
+
+    Offers are folded in as they stream past, so memory is bounded by the number of distinct
+    ingredients rather than the number of rows. Without preferred suppliers the cheapest offer
+    wins; otherwise an offer from the earliest listed preferred supplier wins, cheapest first,
+    and ingredients no preferred supplier sells fall back to their cheapest offer.
+    Ingredient names are looked up through a name_resolver.NameResolver over the offered
+    names, so aliases, camelCase, punctuation and plural differences resolve in O(1).
+    """
+
+    def __init__(self, aliases=None, preferred_suppliers=None):
+        self.offers = {}
+        self.ranks = {}
+        self.aliases = dict(aliases or {})
+        self._resolver = None
+        self.preference = {normalize_price_key(supplier): rank
+                           for rank, supplier in enumerate(preferred_suppliers or [])}
+        self.rows = 0
+
+    def _rank(self, offer):
+        if not self.preference:
+            return (0, offer.price)
+        ranks = [self.preference[key] for key in map(normalize_price_key, offer.suppliers()) if key in self.preference]
+        return (min(ranks) if ranks else len(self.preference), offer.price)
+
+    def add(self, offer):
+        self.rows += 1
+        key = normalize_price_key(offer.ingredient)
+        rank = self._rank(offer)
+        if key not in self.ranks:
+            if self._resolver is not None:
+                self._resolver.add(offer.ingredient, key)
+        elif rank >= self.ranks[key]:
+            return
+        self.offers[key] = offer
+        self.ranks[key] = rank
+
+    def add_all(self, offers):
+        for offer in offers:
+            self.add(offer)
+        return self
+
+    @property
+    def resolver(self):
+        """NameResolver from ingredient names to offer keys, compiled on first lookup."""
+        if self._resolver is None:
+            self._resolver = NameResolver([offer.ingredient for offer in self.offers.values()], self.aliases,
+                                          list(self.offers))
+        return self._resolver
+
+    def lookup(self, name):
+        """Chosen offer for an ingredient name, resolving aliases. Returns None if not priced."""
+        key = self.resolver.get(name)
+        return self.offers[key] if key is not None else None
+
+    def __len__(self):
+        return len(self.offers)
+
+
+def load_price_index(file_path, aliases=None, preferred_suppliers=None):
+    """Stream a CSV price list from disk into a PriceIndex."""
+    with open(file_path, 'r', newline='') as f:
+        return PriceIndex(aliases, preferred_suppliers).add_all(iter_price_offers(f))
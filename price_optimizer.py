@@ -0,0 +1,185 @@
+import argparse
+import json
+
+import numpy as np
+
+from costing import MARGIN_BANDS, MARGIN_THRESHOLDS, cost_menu
+from menu_model import atomic_writer
+from menu_store import open_store
+from multisite import discover_menu_files
+
+REPORT_FILE_PATH = 'server/price_changes.json'
+
+# Price endings prices are rounded up to, e.g. 12.45 or 12.95
+DEFAULT_PRICE_POINTS = (0.45, 0.95)
+
+
+def target_margin(band):
+    """
+    Return (margin, inclusive): the margin an item needs to land in `band` or better.
+    Mirrors getProfitMarginColor: orange from 60% inclusive, yellow and green above 70%/80%.
+    """
+    position = MARGIN_BANDS.index(band)
+    if position == 0:
+        return 0.0, True
+    return float(MARGIN_THRESHOLDS[position - 1]), position == 1
+
+
+def _meets(prices, costs, margin, inclusive):
+    margins = np.round(np.divide(prices - costs, prices, out=np.zeros_like(prices), where=prices > 0) * 100, 2)
+    return margins >= margin if inclusive else margins > margin
+
+
+def ceil_to_price_points(prices, price_points=DEFAULT_PRICE_POINTS):
+    """Smallest price at or above each price that ends in one of price_points (fractions of a unit)."""
+    points = np.sort(np.asarray(price_points, dtype=float))
+    offsets = np.concatenate([points, points + 1])
+    candidates = np.floor(prices)[:, None] + offsets[None, :]
+    candidates = np.where(candidates >= prices[:, None] - 1e-9, candidates, np.inf)
+    return np.round(candidates.min(axis=1), 2)
+
+
+def floor_to_price_points(prices, price_points=DEFAULT_PRICE_POINTS):
+    """Largest price at or below each price that ends in one of price_points."""
+    points = np.sort(np.asarray(price_points, dtype=float))
+    offsets = np.concatenate([points - 1, points])
+    candidates = np.floor(prices)[:, None] + offsets[None, :]
+    candidates = np.where(candidates <= prices[:, None] + 1e-9, candidates, -np.inf)
+    return np.round(candidates.max(axis=1), 2)
+
+
+def minimum_prices(costs, band, price_points=DEFAULT_PRICE_POINTS):
+    """Minimum price on a price point that puts each cost in `band` or better."""
+    margin, inclusive = target_margin(band)
+    prices = ceil_to_price_points(costs / (1 - margin / 100), price_points)
+    # Margins are compared rounded to 2 places, so the exact break-even point can fall short
+    short = ~_meets(prices, costs, margin, inclusive)
+    while short.any():
+        prices[short] = ceil_to_price_points(prices[short] + 0.01, price_points)
+        short = ~_meets(prices, costs, margin, inclusive)
+    return prices
+
+
+def optimize_prices(costs, selling_prices, band, price_points=DEFAULT_PRICE_POINTS,
+                    max_increase_pct=None, max_increase=None):
+    """
+    Vectorized over parallel cost and sellingPrice arrays. Returns (new_prices, reaches_target):
+    items below `band` are raised to the minimum qualifying price point, limited by the caps
+    (rounded down to a price point); all other prices are left as they are.
+    """
+    margin, inclusive = target_margin(band)
+    below = ~_meets(selling_prices, costs, margin, inclusive) & (costs > 0)
+    targets = minimum_prices(costs, band, price_points)
+    caps = np.full_like(selling_prices, np.inf)
+    if max_increase_pct is not None:
+        caps = np.minimum(caps, selling_prices * (1 + max_increase_pct / 100))
+    if max_increase is not None:
+        caps = np.minimum(caps, selling_prices + max_increase)
+    capped = targets > caps + 1e-9
+    limited = np.where(capped, floor_to_price_points(np.where(np.isfinite(caps), caps, 0), price_points), targets)
+    new_prices = np.where(below & (limited > selling_prices), limited, selling_prices)
+    reaches_target = ~below | ~capped
+    return new_prices, reaches_target
+
+
+def price_change_set(sites, band, price_points=DEFAULT_PRICE_POINTS, max_increase_pct=None, max_increase=None):
+    """
+    Optimize every item of every menu of every site in one vectorized pass.
+    `sites` maps a site name to its menus. Returns the change set: one entry per repriced or
+    unreachable item with (site, menu, item, id, field, old, new) and the margins before and after.
+    """
+    keys = []
+    costs = []
+    selling_prices = []
+    margins = []
+    for site, menus in sites.items():
+        for menu_name, menu in menus.items():
+            costing = cost_menu(menu)
+            # Resale items without a buyingPrice have no known cost to price against
+            known = costing.has_recipe | (costing.costs > 0)
+            for row in np.flatnonzero(known):
+                keys.append((site, menu_name, menu.items[row]))
+            costs.append(costing.costs[known])
+            selling_prices.append(costing.selling_prices[known])
+            margins.append(costing.margins[known])
+    if not keys:
+        return []
+    costs = np.concatenate(costs)
+    selling_prices = np.concatenate(selling_prices)
+    margins = np.concatenate(margins)
+
+    new_prices, reaches_target = optimize_prices(costs, selling_prices, band, price_points,
+                                                 max_increase_pct, max_increase)
+    new_margins = np.round(np.divide(new_prices - costs, new_prices, out=np.zeros_like(costs),
+                                     where=new_prices > 0) * 100, 2)
+    changes = []
+    for row in np.flatnonzero((new_prices != selling_prices) | ~reaches_target):
+        site, menu_name, item = keys[row]
+        changes.append({
+            'site': site,
+            'menu': menu_name,
+            'item': item.name,
+            'id': item.id,
+            'field': 'sellingPrice',
+            'old': float(selling_prices[row]),
+            'new': float(new_prices[row]),
+            'cost': round(float(costs[row]), 4),
+            'margin_before': float(margins[row]),
+            'margin_after': float(new_margins[row]),
+            'reaches_target': bool(reaches_target[row]),
+        })
+    return changes
+
+
+def apply_change_set(sites, changes):
+    """Write the new sellingPrices of a change set onto the loaded menus. Returns the number applied."""
+    by_id = {}
+    for change in changes:
+        if change['new'] != change['old']:
+            by_id[(change['site'], change['menu'], change['id'], change['item'])] = change['new']
+    applied = 0
+    for site, menus in sites.items():
+        for menu_name, menu in menus.items():
+            for item in menu.items:
+                price = by_id.get((site, menu_name, item.id, item.name))
+                if price is not None:
+                    item.selling_price = price
+                    applied += 1
+    return applied
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compute minimum selling prices that reach a target margin band.")
+    parser.add_argument('paths', nargs='+', help="menu files or directories to search for menu files")
+    parser.add_argument('--band', choices=MARGIN_BANDS[1:], default='yellow',
+                        help="lowest acceptable margin band (default: yellow, above 70%%)")
+    parser.add_argument('--price-points', type=float, nargs='+', default=list(DEFAULT_PRICE_POINTS),
+                        help="price endings to round up to (default: .45 .95)")
+    parser.add_argument('--max-increase-pct', type=float, help="cap each price rise at this percentage")
+    parser.add_argument('--max-increase', type=float, help="cap each price rise at this amount")
+    parser.add_argument('--report-file', default=REPORT_FILE_PATH, help="where to write the change set")
+    parser.add_argument('--apply', action='store_true', help="also save the new prices to the menu files")
+    args = parser.parse_args(argv)
+
+    stores = {path: open_store(path) for root in args.paths for path in discover_menu_files(root)}
+    sites = {path: store.load() for path, store in stores.items()}
+    changes = price_change_set(sites, args.band, args.price_points, args.max_increase_pct, args.max_increase)
+
+    with atomic_writer(args.report_file) as f:
+        json.dump(changes, f, indent=2)
+
+    repriced = sum(1 for change in changes if change['new'] != change['old'])
+    short = sum(1 for change in changes if not change['reaches_target'])
+    print(f"{repriced} price change(s), {short} item(s) capped below the {args.band} band. "
+          f"Change set written to {args.report_file}")
+    if args.apply:
+        # Reload under each file's lock so prices are applied to what is on disk now
+        for path, store in stores.items():
+            with store.locked():
+                menus = {path: store.load()}
+                apply_change_set(menus, changes)
+                store.save(menus[path])
+        print(f"Saved new prices to {len(stores)} menu file(s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import hashlib
+from bisect import bisect_left, bisect_right
+from collections import Counter
+
+from name_resolver import NameResolver
+from units import parse_pack_size
+
+
+def ingredient_fingerprint(ingredient_names):
+    """Hash of ingredient names in order; any rename, addition, removal or reordering changes it."""
+    digest = hashlib.blake2b(digest_size=8)
+    for name in ingredient_names:
+        digest.update(name.encode('utf-8') + b'\0')
+    return digest.hexdigest()
+
+
+def _common_chars(query_counts, candidate_counts):
+    """Size of the multiset intersection of two character counts."""
+    get = candidate_counts.get
+    common = 0
+    for char, count in query_counts:
+        other = get(char)
+        if other:
+            common += count if count < other else other
+    return common
+
+
+class ResaleMatcher:
+    """
+    Candidate index over ingredient names for fuzzy resale-item matching.
+
+    Built once per menu. Names are lowercased and their character counts computed up front,
+    so a lookup only runs fuzz.ratio/fuzz.partial_ratio on candidates whose length and
+    character overlap can still reach the threshold. Both scores are bounded by the number
+    of characters the two strings share, which makes the filter exact: best_match returns
+    the same name as scoring every ingredient in order.
+    """
+
+    def __init__(self, ingredient_names):
+        self.names = list(ingredient_names)
+        self.lowered = [name.lower() for name in self.names]
+        self.counts = [Counter(name) for name in self.lowered]
+        # Candidate positions sorted by name length, for the ratio length window
+        self.by_length = sorted(range(len(self.names)), key=lambda i: len(self.lowered[i]))
+        self.lengths = [len(self.lowered[i]) for i in self.by_length]
+        self._fingerprint = None
+        self._resolver = None
+        # best_match results computed elsewhere (see parallel_matching), by best_match arguments
+        self._primed = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def fingerprint(self):
+        """ingredient_fingerprint of the indexed names, computed on first use."""
+        if self._fingerprint is None:
+            self._fingerprint = ingredient_fingerprint(self.names)
+        return self._fingerprint
+
+    def resolve(self, query, exclude=()):
+        """
+        The ingredient `query` names up to case, camelCase, punctuation, plurals and dietary
+        suffixes (name_resolver), in O(1), or None if it needs fuzzy matching. Names with a pack
+        or serving size ("Efes (Pint)", "Coke 330ml") only resolve up to case: the ingredient
+        they would meet may be costed per that serving, which the price corrections do not
+        expect. The resolver is built on first use, so pool workers that only fuzzy match never
+        build one.
+        """
+        if self._resolver is None:
+            self._resolver = NameResolver(self.names)
+        if parse_pack_size(query) is not None:
+            name = self._resolver.resolve_exact(query)
+        else:
+            name = self._resolver.resolve(query)
+        return name if name is not None and name not in exclude else None
+
+    def prime(self, query, threshold, partial, exclude, result):
+        """Record the (name, score) best_match returns for these arguments, computed elsewhere."""
+        self._primed[(query, threshold, partial, tuple(exclude))] = result
+
+    def _ratio_candidates(self, query, threshold):
+        """Candidates whose length and character overlap allow fuzz.ratio >= threshold."""
+        size = len(query)
+        # ratio <= 2 * min(a, b) / (a + b), so lengths outside this window can never qualify
+        # (widened by half a point because fuzz rounds its scores)
+        low = size * (threshold - 0.5) / (200.5 - threshold)
+        high = size * (200.5 - threshold) / (threshold - 0.5)
+        start = bisect_left(self.lengths, low)
+        stop = bisect_right(self.lengths, high)
+        query_counts = list(Counter(query).items())
+        for i in self.by_length[start:stop]:
+            total = size + len(self.lowered[i])
+            bound = round(200 * _common_chars(query_counts, self.counts[i]) / total) if total else 0
+            if bound >= threshold:
+                yield bound, i
+
+    def _partial_candidates(self, query, threshold):
+        """Candidates whose character overlap allows fuzz.partial_ratio >= threshold."""
+        size = len(query)
+        query_counts = list(Counter(query).items())
+        for i, candidate in enumerate(self.lowered):
+            shorter = min(size, len(candidate))
+            common = _common_chars(query_counts, self.counts[i])
+            # Each window of the longer string scores at most 2c / (shorter + c)
+            bound = round(200 * common / (shorter + common)) if common else 0
+            if bound >= threshold:
+                yield bound, i
+
+    def best_match(self, query, threshold, partial=False, exclude=()):
+        """
+        Return (name, score) of the best scoring ingredient at or above threshold,
+        or (None, 0). Ties go to the ingredient listed first, as in a linear scan.
+        Ingredient names in `exclude` are never returned.
+        """
+        if self._primed:
+            primed = self._primed.get((query, threshold, partial, tuple(exclude)))
+            if primed is not None:
+                return primed
+        # Imported here so loading a menu or the match cache does not pay for fuzzywuzzy
+        from fuzzywuzzy import fuzz
+
+        query = query.lower()
+        scorer = fuzz.partial_ratio if partial else fuzz.ratio
+        candidates = self._partial_candidates(query, threshold) if partial else self._ratio_candidates(query, threshold)
+        best_index = None
+        best_score = 0
+        # Score the most promising candidates first and stop once no bound can beat the best
+        for bound, i in sorted(candidates, key=lambda candidate: (-candidate[0], candidate[1])):
+            if bound < best_score or (bound == best_score and i > best_index):
+                break
+            if exclude and self.names[i] in exclude:
+                continue
+            score = scorer(query, self.lowered[i])
+            if score >= threshold and (score > best_score or (score == best_score and i < best_index)):
+                best_score = score
+                best_index = i
+        if best_index is None:
+            return None, 0
+        return self.names[best_index], best_score
@@ -0,0 +1,187 @@
+import argparse
+import json
+
+import numpy as np
+
+from config import setting
+from costing import ingredient_cost_vector, recipe_matrix
+from menu_model import MENU_FILE_PATH, atomic_writer
+from menu_store import open_store
+
+# Scenarios evaluated per matrix product; bounds the scenario x recipe-line working set
+CHUNK_SIZE = 1024
+
+
+def _margins(selling_prices, costs, priced):
+    """Profit margins in percent (rounded to 2 places) of a scenario x item cost matrix; 0 where not priced."""
+    margins = np.divide(selling_prices - costs, selling_prices, out=np.zeros_like(costs), where=priced) * 100
+    return np.round(margins, 2)
+
+
+class ScenarioResult:
+    """Per-item and per-category margins of a batch of scenarios for one menu, with deltas from the baseline."""
+    __slots__ = ('scenario_names', 'item_names', 'category_names', 'baseline_margins', 'margins',
+                 'baseline_category_margins', 'category_margins')
+
+    def __init__(self, scenario_names, item_names, category_names, baseline_margins, margins,
+                 baseline_category_margins, category_margins):
+        self.scenario_names = scenario_names
+        self.item_names = item_names
+        self.category_names = category_names
+        self.baseline_margins = baseline_margins
+        self.margins = margins
+        self.baseline_category_margins = baseline_category_margins
+        self.category_margins = category_margins
+
+    @property
+    def margin_deltas(self):
+        """Scenario x item margin change in percentage points."""
+        return self.margins - self.baseline_margins
+
+    @property
+    def category_deltas(self):
+        """Scenario x item category margin change in percentage points."""
+        return self.category_margins - self.baseline_category_margins
+
+    def to_dict(self):
+        item_deltas = np.round(self.margin_deltas, 2)
+        category_deltas = np.round(self.category_deltas, 2)
+        return {
+            name: {
+                'categories': dict(zip(self.category_names, category_deltas[row].tolist())),
+                'items': dict(zip(self.item_names, item_deltas[row].tolist())),
+            }
+            for row, name in enumerate(self.scenario_names)
+        }
+
+
+class MenuScenarios:
+    """
+    A menu's costing laid out for evaluating many price scenarios at once.
+
+    A scenario maps ingredient categories (as written by update_ingredients), ingredient names
+    or resale item categories to cost multipliers; ingredient names override their category.
+    Recipe costs are the per-line costs of the recipe matrix scaled by the scenario's
+    ingredient multipliers and summed per item, so a batch of scenarios is a handful of
+    array operations rather than one costing pass per scenario.
+    """
+
+    def __init__(self, menu):
+        items = menu.items
+        index, base_costs = ingredient_cost_vector(menu.ingredients)
+        rows, columns, quantities = recipe_matrix(items, index)
+        multiplier = menu.cost_multiplier if menu.cost_multiplier is not None else 1
+
+        self.item_names = [item.name for item in items]
+        self.ingredient_columns = index
+        self.ingredient_categories = {}
+        for name, ingredient in menu.ingredients.items():
+            self.ingredient_categories.setdefault(ingredient.category, []).append(index[name])
+
+        self.line_columns = columns
+        self.line_costs = quantities * base_costs[columns] * multiplier
+        # Recipe lines are grouped by item, so each item's cost is one reduceat segment
+        self.recipe_rows, self.line_starts = np.unique(rows, return_index=True)
+
+        has_recipe = np.array([bool(item.has_recipe) for item in items], dtype=bool)
+        self.selling_prices = np.array([item.selling_price or 0 for item in items], dtype=float)
+        self.resale_costs = np.where(has_recipe, 0.0,
+                                     np.array([item.buying_price or 0 for item in items], dtype=float))
+        # Resale items without a buyingPrice score a 0% margin, as in costing.cost_menu
+        self.priced = (self.selling_prices > 0) & (has_recipe | (self.resale_costs > 0))
+        self.resale_categories = {}
+        for row, item in enumerate(items):
+            if not item.has_recipe:
+                self.resale_categories.setdefault(item.category, []).append(row)
+
+        self.category_names, category_index = np.unique(
+            np.array([item.category or '' for item in items], dtype=object), return_inverse=True)
+        self.category_names = self.category_names.tolist()
+        self.category_matrix = np.zeros((len(items), len(self.category_names)))
+        self.category_matrix[np.arange(len(items)), category_index] = self.priced
+
+    def multipliers(self, scenarios):
+        """Return (scenario x ingredient, scenario x item) multiplier matrices for a list of scenario dicts."""
+        ingredient_multipliers = np.ones((len(scenarios), len(self.ingredient_columns)))
+        resale_multipliers = np.ones((len(scenarios), len(self.item_names)))
+        for row, scenario in enumerate(scenarios):
+            for key, factor in scenario.items():
+                if key in self.ingredient_categories:
+                    ingredient_multipliers[row, self.ingredient_categories[key]] = factor
+                if key in self.resale_categories:
+                    resale_multipliers[row, self.resale_categories[key]] = factor
+            for key, factor in scenario.items():
+                column = self.ingredient_columns.get(key)
+                if column is not None:
+                    ingredient_multipliers[row, column] = factor
+        return ingredient_multipliers, resale_multipliers
+
+    def costs(self, ingredient_multipliers, resale_multipliers):
+        """Scenario x item cost matrix."""
+        costs = self.resale_costs * resale_multipliers
+        if len(self.line_costs):
+            line_costs = ingredient_multipliers[:, self.line_columns] * self.line_costs
+            costs[:, self.recipe_rows] = np.add.reduceat(line_costs, self.line_starts, axis=1)
+        return costs
+
+    def category_margins(self, costs):
+        """Scenario x category margin of the priced items of each category, in percent."""
+        sales = self.selling_prices @ self.category_matrix
+        profits = (self.selling_prices - costs) @ self.category_matrix
+        return np.divide(profits, sales, out=np.zeros_like(profits), where=sales > 0) * 100
+
+    def evaluate(self, scenarios, scenario_names=None, chunk_size=CHUNK_SIZE):
+        """Evaluate a list of scenario dicts. Returns a ScenarioResult."""
+        baseline_costs = self.costs(*self.multipliers([{}]))
+        margins = np.empty((len(scenarios), len(self.item_names)))
+        category_margins = np.empty((len(scenarios), len(self.category_names)))
+        for start in range(0, len(scenarios), chunk_size):
+            stop = start + chunk_size
+            costs = self.costs(*self.multipliers(scenarios[start:stop]))
+            margins[start:stop] = _margins(self.selling_prices, costs, self.priced)
+            category_margins[start:stop] = self.category_margins(costs)
+        return ScenarioResult(
+            scenario_names if scenario_names is not None else [str(i) for i in range(len(scenarios))],
+            self.item_names, self.category_names,
+            _margins(self.selling_prices, baseline_costs, self.priced)[0], margins,
+            self.category_margins(baseline_costs)[0], category_margins)
+
+
+def evaluate_scenarios(menus, scenarios, scenario_names=None):
+    """Evaluate a batch of scenarios over every menu. Returns menu name -> ScenarioResult."""
+    return {name: MenuScenarios(menu).evaluate(scenarios, scenario_names) for name, menu in menus.items()}
+
+
+def load_scenarios(file_path):
+    """
+    Read scenarios from JSON: either {name: {key: multiplier}} or a list of
+    {"name": ..., "multipliers": {key: multiplier}}. Returns (names, scenarios).
+    """
+    with open(file_path, 'r') as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        return list(data), list(data.values())
+    names = [entry.get('name', str(i)) for i, entry in enumerate(data)]
+    return names, [entry['multipliers'] for entry in data]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate what-if ingredient price scenarios over every menu.")
+    parser.add_argument('scenarios', help="JSON file of scenarios, e.g. {\"proteins+12%%\": {\"Proteins\": 1.12}}")
+    parser.add_argument('--menu-file', default=setting('menu_file', MENU_FILE_PATH), help="menu document (.json) or SQLite store (.db)")
+    parser.add_argument('--output', help="write per-item and per-category margin deltas as JSON (default: stdout)")
+    args = parser.parse_args(argv)
+
+    names, scenarios = load_scenarios(args.scenarios)
+    menus = open_store(args.menu_file).load()
+    results = evaluate_scenarios(menus, scenarios, names)
+    text = json.dumps({menu: result.to_dict() for menu, result in results.items()}, indent=2)
+    if args.output:
+        with atomic_writer(args.output) as f:
+            f.write(text)
+        print(f"Evaluated {len(scenarios)} scenario(s) over {len(menus)} menu(s). Deltas written to {args.output}")
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
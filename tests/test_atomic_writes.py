@@ -0,0 +1,34 @@
+import pytest
+
+from dependency_index import DependencyIndex, load_dependency_index, save_dependency_index
+from manifest import build_manifest, load_manifest, save_manifest
+from menu_model import Ingredient, Menu, MenuItem
+
+
+def menus():
+    return {'izMenu': Menu('izMenu', {'rice': Ingredient('rice', 0.002, 'g', 'Grains')},
+                           [MenuItem('Rice', 'Sides', 3, {'rice': 200}, True, 'r1')])}
+
+
+def test_failed_manifest_save_keeps_the_previous_manifest(tmp_path):
+    manifest_file = str(tmp_path / 'menus.json.manifest.json')
+    manifest = build_manifest(menus())
+    save_manifest(manifest_file, manifest)
+
+    with pytest.raises(TypeError):
+        save_manifest(manifest_file, dict(manifest, menus={'izMenu': object()}))
+    assert load_manifest(manifest_file) == manifest
+    assert [path.name for path in tmp_path.iterdir()] == ['menus.json.manifest.json']
+
+
+def test_failed_index_save_keeps_the_previous_index(tmp_path):
+    index_file = str(tmp_path / 'menus.json.deps.json')
+    current = menus()
+    index = DependencyIndex.build(current)
+    save_dependency_index(index_file, index)
+
+    index.dependencies['izMenu'].costs['r1'] = object()
+    with pytest.raises(TypeError):
+        save_dependency_index(index_file, index)
+    assert load_dependency_index(index_file, current) is not None
+    assert [path.name for path in tmp_path.iterdir()] == ['menus.json.deps.json']
@@ -0,0 +1,37 @@
+from dependency_index import DependencyIndex, item_keys, load_dependency_index, save_dependency_index
+from menu_model import Ingredient, Menu, MenuItem
+
+
+def menus_with_duplicate_names():
+    ingredients = {'lamb': Ingredient('lamb', 0.02, 'g', 'Proteins'), 'rice': Ingredient('rice', 0.002, 'g', 'Grains')}
+    items = [
+        MenuItem('Lamb Special', 'Mains', 20, {'lamb': 300}, True),
+        MenuItem('Lamb Special', 'Mains', 12, {'lamb': 100, 'rice': 150}, True),
+        MenuItem('Rice', 'Sides', 3, {'rice': 200}, True, 'r1'),
+    ]
+    return {'izMenu': Menu('izMenu', ingredients, items, cost_multiplier=1)}
+
+
+def test_items_without_id_sharing_a_name_are_keyed_by_position():
+    menus = menus_with_duplicate_names()
+    assert item_keys(menus['izMenu'].items) == ['#0', '#1', 'r1']
+
+
+def test_update_recosts_every_duplicate():
+    menus = menus_with_duplicate_names()
+    index = DependencyIndex.build(menus)
+    changes = index.update_ingredient_cost('izMenu', 'lamb', 0.03)
+    assert {key: round(new_cost, 2) for key, _, new_cost, _, _ in changes} == {'#0': 9.0, '#1': 3.3}
+
+
+def test_index_is_reused_until_an_item_changes(tmp_path):
+    index_file = str(tmp_path / 'menus.json.deps.json')
+    menus = menus_with_duplicate_names()
+    index = DependencyIndex.build(menus)
+    index.update_ingredient_cost('izMenu', 'rice', 0.003)
+    save_dependency_index(index_file, index)
+
+    # Fingerprints patched by the update still describe the updated menus
+    assert load_dependency_index(index_file, menus) is not None
+    menus['izMenu'].items[1].ingredients['rice'] = 100
+    assert load_dependency_index(index_file, menus) is None
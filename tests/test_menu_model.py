@@ -0,0 +1,49 @@
+import json
+
+from fix_menus import fix_menus
+from menu_model import load_menus, menus_from_dict, menus_to_dict, save_menus
+
+DOCUMENT = {
+    'izMenu': {
+        'initialIngredients': {'rice': {'unit': 'g', 'cost': 0.002, 'category': 'Grains'}},
+        'items': [
+            {'id': 'r1', 'name': 'Rice', 'category': 'Sides', 'sellingPrice': 3, 'hasRecipe': True,
+             'ingredients': {'rice': 200}},
+            {'name': 'Coke', 'category': 'Soft Drinks', 'sellingPrice': 3, 'hasRecipe': False, 'id': 'c1',
+             'buyingPrice': 1.0, 'note': 'kept'},
+        ],
+        'costMultiplier': 1.1,
+    },
+}
+
+
+def test_round_trip_keeps_key_order_and_text(tmp_path):
+    menu_file = str(tmp_path / 'menus.json')
+    with open(menu_file, 'w') as f:
+        json.dump(DOCUMENT, f, indent=2)
+    with open(menu_file) as f:
+        before = f.read()
+
+    save_menus(menu_file, load_menus(menu_file))
+    with open(menu_file) as f:
+        assert f.read() == before
+
+
+def test_new_fields_follow_the_keys_that_were_read():
+    menus = menus_from_dict(json.loads(json.dumps(DOCUMENT)))
+    item = menus['izMenu'].items[0]
+    item.buying_price = 0.5
+    assert list(menus_to_dict(menus)['izMenu']['items'][0]) == [
+        'id', 'name', 'category', 'sellingPrice', 'hasRecipe', 'ingredients', 'buyingPrice']
+
+
+def test_categories_are_only_written_when_present_or_non_empty():
+    menus = menus_from_dict(json.loads(json.dumps(DOCUMENT)))
+    assert 'categories' not in menus_to_dict(menus)['izMenu']
+
+    fix_menus(menus)
+    assert menus_to_dict(menus)['izMenu']['categories'] == ['Sides', 'Soft Drinks']
+
+    menus['izMenu'].items = []
+    fix_menus(menus)
+    assert menus_to_dict(menus)['izMenu']['categories'] == []
@@ -0,0 +1,42 @@
+import copy
+
+import pytest
+
+from benchmarks.synthetic_menus import generate_menus
+from menu_model import Ingredient, MenuItem, menus_from_dict, menus_to_dict
+from menu_patch import apply_patch_file, diff_documents, snapshot, write_patch
+from menu_store import open_store
+
+
+def edited(menus):
+    """A copy of `menus` with field edits, an insertion, a removal and a new menu."""
+    menus = menus_from_dict(copy.deepcopy(menus_to_dict(menus)))
+    menu = menus['site0Menu']
+    next(iter(menu.ingredients.values())).cost = 42
+    menu.ingredients['saffron'] = Ingredient('saffron', 9.5, 'g', 'Herbs and Spices')
+    del menu.items[3]
+    menu.items.insert(1, MenuItem('Saffron Rice', 'Side Dishes', 4.5, {'saffron': 1}, True, 'new-item'))
+    menu.items[-1].selling_price = 99
+    menus['site1Menu'].categories = ['Mains']
+    menus['site2Menu'] = menus_from_dict({'site2Menu': {'ingredients': {}, 'items': []}})['site2Menu']
+    return menus
+
+
+@pytest.mark.parametrize('file_name', ['menus.json', 'menus.db'])
+def test_patch_round_trip(tmp_path, file_name):
+    before = generate_menus(items=80, ingredients=40)
+    after = edited(before)
+    patch_file = str(tmp_path / 'changes.jsonl')
+    write_patch(patch_file, diff_documents(snapshot(before), snapshot(after)))
+    store = open_store(str(tmp_path / file_name), create=True)
+    store.save(before)
+
+    applied = apply_patch_file(open_store(str(tmp_path / file_name)), patch_file)
+
+    assert applied > 0
+    assert menus_to_dict(open_store(str(tmp_path / file_name)).load()) == menus_to_dict(after)
+
+
+def test_no_changes_give_an_empty_patch():
+    menus = generate_menus(items=20, ingredients=10)
+    assert diff_documents(snapshot(menus), snapshot(menus)) == []
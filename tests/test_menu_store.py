@@ -0,0 +1,46 @@
+import pytest
+
+from benchmarks.synthetic_menus import generate_menus
+from menu_model import Ingredient, menus_to_dict
+from menu_store import SqliteMenuStore, open_store
+
+
+def test_sqlite_round_trip(tmp_path):
+    menus = generate_menus(items=200, ingredients=100)
+    menus['site0Menu'].categories = ['Mains', 'Soft Drinks']
+    menus['site1Menu'].extra = {'currency': 'GBP'}
+    store = open_store(str(tmp_path / 'menus.db'), create=True)
+    store.save(menus)
+
+    loaded = open_store(str(tmp_path / 'menus.db')).load()
+
+    assert menus_to_dict(loaded) == menus_to_dict(menus)
+    # ints and floats keep their type through the open numeric columns
+    for menu_name, menu in menus.items():
+        for name, ingredient in menu.ingredients.items():
+            assert type(loaded[menu_name].ingredients[name].cost) is type(ingredient.cost)
+
+
+def test_sqlite_save_after_load_writes_only_changed_rows(tmp_path):
+    file_path = str(tmp_path / 'menus.db')
+    open_store(file_path, create=True).save(generate_menus(items=100, ingredients=50))
+    store = open_store(file_path)
+    menus = store.load()
+    menu = menus['site0Menu']
+    first = next(iter(menu.ingredients.values()))
+    first.cost = 123.5
+    del menu.items[-1]
+    menu.ingredients['saffron'] = Ingredient('saffron', 9.0, 'g', 'Herbs and Spices')
+
+    writes_before = store.connection.total_changes
+    store.save(menus)
+
+    assert store.connection.total_changes - writes_before == 3
+    assert menus_to_dict(open_store(file_path).load()) == menus_to_dict(menus)
+
+
+def test_missing_database_is_not_created(tmp_path):
+    file_path = tmp_path / 'missing.db'
+    with pytest.raises(FileNotFoundError):
+        SqliteMenuStore(str(file_path))
+    assert not file_path.exists()
@@ -0,0 +1,49 @@
+from benchmarks.synthetic_menus import generate_menus
+from menu_model import load_menus, menus_to_dict, save_menus
+import menu_stream
+from menu_stream import STREAM_STAGES, stream_menus
+import pipeline
+
+# Stages both runners implement without an ingredient price list on disk
+STAGE_NAMES = ['fix_costings', 'correct_resale_prices', 'fix_menus']
+
+
+def test_stream_matches_batch_pipeline(tmp_path):
+    source = str(tmp_path / 'menus.json')
+    destination = str(tmp_path / 'streamed.json')
+    save_menus(source, generate_menus(items=300, ingredients=200))
+
+    stream_report = stream_menus(source, destination, [stage for stage in STREAM_STAGES if stage[0] in STAGE_NAMES])
+    menus = load_menus(source)
+    batch_report = pipeline.run_pipeline(menus, pipeline.select_stages(only=STAGE_NAMES))
+
+    assert menus_to_dict(load_menus(destination)) == menus_to_dict(menus)
+    assert stream_report == batch_report
+
+
+def test_batched_ingredient_corrections_match_batch_pipeline(tmp_path, monkeypatch):
+    # Batches smaller than a menu, so corrections and drops span several validation passes
+    monkeypatch.setattr(menu_stream, 'VALIDATION_BATCH_SIZE', 7)
+    source = str(tmp_path / 'menus.json')
+    destination = str(tmp_path / 'streamed.json')
+    save_menus(source, generate_menus(items=100, ingredients=100))
+
+    stream_report = stream_menus(source, destination,
+                                 [stage for stage in STREAM_STAGES if stage[0] == 'correct_resale_prices'])
+    menus = load_menus(source)
+    batch_report = pipeline.run_pipeline(menus, pipeline.select_stages(only=['correct_resale_prices']))
+
+    assert stream_report['correct_resale_prices']['skipped_ingredients']
+    assert stream_report['correct_resale_prices']['corrected_costs']
+    assert menus_to_dict(load_menus(destination)) == menus_to_dict(menus)
+    assert stream_report == batch_report
+
+
+def test_stream_in_place_preserves_untouched_document(tmp_path):
+    source = str(tmp_path / 'menus.json')
+    save_menus(source, generate_menus(items=50, ingredients=40))
+    expected = menus_to_dict(load_menus(source))
+
+    stream_menus(source, source, [])
+
+    assert menus_to_dict(load_menus(source)) == expected
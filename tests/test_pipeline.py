@@ -0,0 +1,31 @@
+import os
+
+from menu_model import Ingredient, Menu, MenuItem, load_menus, menus_to_dict, save_menus
+import pipeline
+
+
+def small_menus():
+    ingredients = {
+        'lamb': Ingredient('lamb', 0.02, 'g', 'Proteins'),
+        'cocaCola': Ingredient('cocaCola', 0.004, 'ml', 'Soft Drinks'),
+    }
+    items = [
+        MenuItem('Lamb Shank', 'Mains', 18, {'lamb': 300}, True, 'm1'),
+        MenuItem('Coca-Cola (330ml)', 'Soft Drinks', 3, has_recipe=False, buying_price=1.0),
+    ]
+    return {'izMenu': Menu('izMenu', ingredients, items, categories=['Mains', 'Soft Drinks'])}
+
+
+def test_dry_run_writes_only_the_patch_and_report(tmp_path):
+    menu_file = str(tmp_path / 'menus.json')
+    save_menus(menu_file, small_menus())
+    with open(menu_file) as f:
+        before = f.read()
+
+    pipeline.main(['--menu-file', menu_file, '--skip', 'update_ingredients', '--dry-run',
+                   '--patch-file', str(tmp_path / 'changes.jsonl'), '--report-file', str(tmp_path / 'report.json')])
+
+    assert sorted(os.listdir(tmp_path)) == ['changes.jsonl', 'menus.json', 'report.json']
+    with open(menu_file) as f:
+        assert f.read() == before
+    assert menus_to_dict(load_menus(menu_file)) == menus_to_dict(small_menus())
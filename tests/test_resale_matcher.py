@@ -0,0 +1,38 @@
+import pytest
+from fuzzywuzzy import fuzz
+
+from benchmarks.synthetic_menus import generate_menus
+from resale_matcher import ResaleMatcher
+
+
+def linear_best_match(names, query, threshold, partial=False, exclude=()):
+    """Score every name in order, keeping the first of equal scores."""
+    scorer = fuzz.partial_ratio if partial else fuzz.ratio
+    best_name, best_score = None, 0
+    for name in names:
+        if name in exclude:
+            continue
+        score = scorer(query.lower(), name.lower())
+        if score >= threshold and score > best_score:
+            best_name, best_score = name, score
+    return best_name, best_score
+
+
+@pytest.mark.parametrize('partial', [False, True])
+@pytest.mark.parametrize('threshold', [60, 80, 90])
+def test_best_match_equals_linear_scan(threshold, partial):
+    menu = generate_menus(items=150, ingredients=120, menus=1, name_noise=0.1)['site0Menu']
+    names = list(menu.ingredients)
+    matcher = ResaleMatcher(names)
+    for item in menu.items:
+        expected = linear_best_match(names, item.name, threshold, partial)
+        assert matcher.best_match(item.name, threshold, partial) == expected, item.name
+
+
+def test_best_match_skips_excluded_names_and_breaks_ties_by_position():
+    names = ['limeJuice', 'lemonJuice', 'LimeJuice']
+    matcher = ResaleMatcher(names)
+    assert matcher.best_match('limejuice', 80) == ('limeJuice', 100)
+    assert matcher.best_match('limejuice', 80, exclude={'limeJuice'}) == linear_best_match(
+        names, 'limejuice', 80, exclude={'limeJuice'})
+    assert matcher.best_match('xyz', 80) == (None, 0)
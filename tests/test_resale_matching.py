@@ -0,0 +1,41 @@
+import pytest
+
+from menu_model import Ingredient, Menu, MenuItem
+from pipeline import run_pipeline, select_stages
+from resale_matcher import ResaleMatcher
+
+# Draught beers as in izMenu: the pint ingredients are costed per 'pint', which the price
+# corrections do not know, and the items keep the buying price they were entered with
+PINTS = {
+    'Efes (Pint)': ('efesPint', 7.2, 6, 4.2),
+    'Estrella Damm (Pint)': ('estrellaDammPint', 7.2, 6, 4.2),
+    'Poretti (Pint)': ('porettiPint', 7.8, 6.5, 4.55),
+    'Guinness (Pint)': ('guinnessPint', 7.8, 6.5, 4.55),
+}
+
+
+def pint_menus():
+    ingredients = {name: Ingredient(name, cost, 'pint', 'Miscellaneous')
+                   for name, cost, _, _ in PINTS.values()}
+    items = [MenuItem(item_name, 'Beers & Ciders', selling_price, has_recipe=False, buying_price=buying_price)
+             for item_name, (_, _, selling_price, buying_price) in PINTS.items()]
+    return {'izMenu': Menu('izMenu', ingredients, items)}
+
+
+@pytest.mark.parametrize('item_name', PINTS)
+def test_serving_sized_names_are_not_resolved_to_serving_ingredients(item_name):
+    matcher = ResaleMatcher(name for name, _, _, _ in PINTS.values())
+    assert matcher.resolve(item_name) is None
+
+
+def test_unsized_names_still_resolve():
+    matcher = ResaleMatcher(['kingPrawns', 'cocaCola'])
+    assert matcher.resolve('King Prawns (GF)') == 'kingPrawns'
+    assert matcher.resolve('Coca-Cola') == 'cocaCola'
+
+
+def test_pipeline_keeps_pint_buying_prices():
+    menus = pint_menus()
+    run_pipeline(menus, select_stages(skip=['update_ingredients']))
+    prices = {item.name: item.buying_price for item in menus['izMenu'].items}
+    assert prices == {item_name: buying_price for item_name, (_, _, _, buying_price) in PINTS.items()}
@@ -0,0 +1,25 @@
+from menu_model import Ingredient, Menu
+from update_ingredients import build_price_index, update_ingredient_costs
+
+
+def priced(ingredients):
+    menus = {'bellFood': Menu('bellFood', {ingredient.name: ingredient for ingredient in ingredients})}
+    update_ingredient_costs(menus, price_index=build_price_index())
+    return {name: (ingredient.cost, ingredient.unit, ingredient.category)
+            for name, ingredient in menus['bellFood'].ingredients.items()}
+
+
+def test_alias_priced_in_another_unit_is_not_applied():
+    # coffee -> coffeeBeans is priced per kg, but a Beverages ingredient in g stays in g
+    assert priced([Ingredient('coffee', 0.02, 'g', 'Beverages')]) == {'coffee': (0.02, 'g', 'Beverages')}
+
+
+def test_alias_priced_in_the_ingredient_unit_is_applied():
+    assert priced([Ingredient('beef', 0.006, 'g', 'Proteins'), Ingredient('Kalamari', 0.01, 'g', 'Proteins')]) == {
+        'beef': (12.0, 'kg', 'Proteins'),
+        'Kalamari': (8.4, 'kg', 'Proteins'),
+    }
+
+
+def test_own_price_row_is_applied_as_before():
+    assert priced([Ingredient('lamb', 0.01, 'g', 'Proteins')]) == {'lamb': (7.8, 'kg', 'Proteins')}
@@ -0,0 +1,103 @@
+import re
+from functools import lru_cache
+
+# Canonical base units: recipe quantities are in g, ml or unit and costs are stored per base unit
+BASE_UNITS = ('g', 'ml', 'unit')
+
+# Unit -> (base unit, base units per unit)
+UNIT_FACTORS = {
+    'g': ('g', 1),
+    'kg': ('g', 1000),
+    'ml': ('ml', 1),
+    'cl': ('ml', 10),
+    'L': ('ml', 1000),
+    'l': ('ml', 1000),
+    'unit': ('unit', 1),
+    'bottle': ('unit', 1),
+}
+
+# Bulk units supplier prices are quoted in, by base unit
+BULK_UNITS = {'g': 'kg', 'ml': 'L'}
+
+# Units priced per piece or serving; their cost is kept as quoted rather than converted
+PIECE_UNITS = ('unit', 'half', 'pint', 'bottle', 'cup', 'shot')
+
+# Volume of a serving named in an item name, in ml
+SERVING_VOLUMES_ML = {'pint': 568, 'half': 284, 'shot': 25, 'cup': 240}
+VOLUME_UNITS_ML = {'ml': 1, 'cl': 10, 'l': 1000, 'ltr': 1000, 'litre': 1000, 'liter': 1000}
+
+# Volume assumed for a drink whose name gives no pack size
+DEFAULT_DRINK_VOLUME_ML = 275
+
+PACK_SIZE = re.compile(r"""
+    (?:(?P<count>\d+)\s*[x×]\s*)?
+    (?P<volume>\d+(?:\.\d+)?)\s*(?P<unit>ml|cl|ltr|litre|liter|l)\b
+  | \b(?P<serving>pint|half|shot|cup)\b
+""", re.VERBOSE | re.IGNORECASE)
+
+
+class PackSize:
+    """Pack size parsed from an item name: `count` containers of `volume_ml` each."""
+    __slots__ = ('count', 'volume_ml')
+
+    def __init__(self, count, volume_ml):
+        self.count = count
+        self.volume_ml = volume_ml
+
+    @property
+    def total_ml(self):
+        return self.count * self.volume_ml
+
+    def __repr__(self):
+        return f"PackSize({self.count!r} x {self.volume_ml!r}ml)"
+
+
+def base_unit(unit):
+    """Base unit a unit converts to; unknown units are their own base."""
+    return UNIT_FACTORS.get(unit, (unit, 1))[0]
+
+
+def unit_factor(unit):
+    """Base units per unit (1000 for kg), 1 for unknown units."""
+    return UNIT_FACTORS.get(unit, (unit, 1))[1]
+
+
+def cost_to_base(cost, unit):
+    """Return (cost per base unit, base unit) for a cost quoted per `unit`."""
+    base, factor = UNIT_FACTORS.get(unit, (unit, 1))
+    return cost / factor, base
+
+
+def cost_per_bulk(cost, unit):
+    """Return (cost per kg/L, bulk unit) for a cost per g/ml/kg/L; other units are returned unchanged."""
+    base, factor = UNIT_FACTORS.get(unit, (unit, 1))
+    bulk = BULK_UNITS.get(base)
+    if bulk is None:
+        return cost, unit
+    return cost / factor * unit_factor(bulk), bulk
+
+
+def costs_to_base(costs, units):
+    """Batched cost_to_base: an array of costs per base unit for parallel sequences of costs and units."""
+    import numpy as np  # Only the batch path needs numpy
+    costs = np.asarray(costs, dtype=float)
+    factors = {unit: unit_factor(unit) for unit in set(units)}
+    return costs / np.fromiter((factors[unit] for unit in units), dtype=float, count=len(costs))
+
+
+@lru_cache(maxsize=65536)
+def parse_pack_size(name):
+    """The first pack size in an item name ("4x330ml", "33cl", "Pint"), or None if it names none."""
+    match = PACK_SIZE.search(name or '')
+    if match is None:
+        return None
+    if match.group('serving'):
+        return PackSize(1, SERVING_VOLUMES_ML[match.group('serving').lower()])
+    count = int(match.group('count')) if match.group('count') else 1
+    return PackSize(count, float(match.group('volume')) * VOLUME_UNITS_ML[match.group('unit').lower()])
+
+
+def pack_volume_ml(name, default=DEFAULT_DRINK_VOLUME_ML):
+    """Total volume in ml of the pack an item name describes, or `default` if it names none."""
+    pack = parse_pack_size(name)
+    return pack.total_ml if pack is not None else default
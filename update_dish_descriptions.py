@@ -1,144 +1,236 @@
 
+import argparse
+import difflib
 import json
 import os
 import re
 
-# Paths
-dish_descriptions_path = "/Users/m/Programming/LOCAL/RestaurantProfitPro/client/src/data/DishDescriptions.ts"
-menus_json_path = "/Users/m/Programming/LOCAL/RestaurantProfitPro/server/menus.json"
-output_menus_json_path = "/Users/m/Programming/LOCAL/RestaurantProfitPro/server/menus.json"
-
-# Normalize string for matching
-def normalize_name(name: str) -> str:
-    # Convert to lowercase, strip whitespace, remove parenthetical suffixes
-    original = name
-    name = name.lower().strip()
-    name = re.sub(r'\s*$$ [^)]* $$', '', name)  # Remove (V), (N), etc.
-    name = name.strip('"')  # Remove stray quotes
-    print(f"Normalized: '{original}' -> '{name}'")
-    return name
-
-# Check if DishDescriptions.ts exists
-if not os.path.exists(dish_descriptions_path):
-    raise FileNotFoundError(f"DishDescriptions.ts not found at {dish_descriptions_path}")
-
-# Read DishDescriptions.ts
-with open(dish_descriptions_path, 'r') as file:
-    content = file.read()
-
-# Log the first and last few lines for debugging
-print("First 200 characters of DishDescriptions.ts:")
-print(content[:200])
-print("\nLast 200 characters of DishDescriptions.ts:")
-print(content[-200:])
-
-# Parse dishDescriptions array
-dish_descriptions = []
-current_dish = {}
-parsing_array = False
-parsing_object = False
-current_key = None
-current_value = ""
-skip_lines = False
-
-lines = content.splitlines()
-for i, line in enumerate(lines):
-    line = line.strip()
-    if not line:
-        continue
-    if line.startswith('//'):
-        continue
-    if 'export interface DishDescription {' in line:
-        skip_lines = True
-        continue
-    if skip_lines and line == '}':
-        skip_lines = False
-        continue
-    if skip_lines:
-        print(f"Ignoring interface line {i+1}: {line}")
-        continue
-    if 'export const dishDescriptions: DishDescription[] = [' in line:
-        parsing_array = True
-        continue
-    if parsing_array and line.startswith(']'):
-        if current_dish.get('name') and current_dish.get('description'):
-            dish_descriptions.append(current_dish)
-        parsing_array = False
-        continue
-    if parsing_array and line.startswith('{'):
-        parsing_object = True
-        current_dish = {}
-        continue
-    if parsing_object and line.startswith('name:'):
-        current_key = 'name'
-        current_value = line.split(':', 1)[1].strip().strip('"').strip(',')
-        current_dish['name'] = current_value
-    elif parsing_object and line.startswith('description:'):
-        current_key = 'description'
-        current_value = line.split(':', 1)[1].strip().strip('"').strip(',')
-        current_dish['description'] = current_value
-    elif parsing_object and line.startswith('},'):
-        if current_dish.get('name') and current_dish.get('description'):
-            dish_descriptions.append(current_dish)
-        parsing_object = False
-        current_dish = {}
-    elif 'export function getDishDescription' in line:
-        break  # Stop parsing at function definition
+from config import setting
+from menu_model import write_atomic
+from menu_store import open_store
+from name_resolver import NameResolver, name_key
+
+# Default paths, relative to the repository root
+dish_descriptions_path = "client/src/data/DishDescriptions.ts"
+menus_json_path = "server/menus.json"
+
+# Name of the exported array in DishDescriptions.ts
+DESCRIPTIONS_ARRAY = 'dishDescriptions'
+
+# Unmatched items listed in the summary, with their closest dish names
+SUMMARY_LIMIT = 10
+
+# Serving qualifiers such as "(Glass)" or "(275ml)": a dish has one description whatever the serving
+SERVING_SUFFIX = re.compile(r'(?:\s*\([^)]*\))+\s*$')
+
+TOKEN = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<comment>//[^\n]*|/\*.*?\*/)
+  | (?P<string>"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*'|`(?:[^`\\]|\\.)*`)
+  | (?P<name>[A-Za-z_$][\w$]*)
+  | (?P<number>\d+(?:\.\d+)?)
+  | (?P<punct>.)
+""", re.VERBOSE | re.DOTALL)
+
+# In-process parse results: path -> (mtime_ns, size, dish descriptions)
+_parse_cache = {}
+
+
+def _string_value(token):
+    """Decode a TS string literal token."""
+    body = token[1:-1]
+    if '\\' not in body:
+        return body
+    if token[0] == '"':
+        return json.loads(token)
+    return json.loads('"' + body.replace('"', '\\"').replace("\\'", "'").replace('\\`', '`') + '"')
+
+def tokenize(content):
+    """Yield (kind, text) for the significant tokens of TS source, skipping whitespace and comments."""
+    for match in TOKEN.finditer(content):
+        kind = match.lastgroup
+        if kind not in ('space', 'comment'):
+            yield kind, match.group()
+
+def parse_dish_descriptions(content):
+    """
+    Parse the dishDescriptions array of DishDescriptions.ts into a list of {name, description} dicts.
+    Object literals are read token by token, so keys may come in any order and span lines;
+    entries without both a name and a description are skipped.
+    """
+    tokens = tokenize(content)
+    # Skip to the array literal assigned to dishDescriptions
+    for kind, text in tokens:
+        if kind == 'name' and text == DESCRIPTIONS_ARRAY:
+            break
     else:
-        print(f"Warning: Unhandled line {i+1}: {line}")
-
-# Ensure the last dish is added
-if current_dish.get('name') and current_dish.get('description'):
-    dish_descriptions.append(current_dish)
-
-print(f"Parsed {len(dish_descriptions)} dish descriptions")
-print("Parsed dish names:")
-for dish in dish_descriptions:
-    print(f"- {dish['name']}")
-
-# Check if menus.json exists
-if not os.path.exists(menus_json_path):
-    raise FileNotFoundError(f"menus.json not found at {menus_json_path}")
-
-# Read menus.json
-with open(menus_json_path, 'r') as file:
-    menus = json.load(file)
-
-# Update descriptions for items in izMenu and bellFood
-unmatched_items = []
-matched_items = []
-for menu_key in ['izMenu', 'bellFood']:
-    for item in menus[menu_key]['items']:
-        description = None
-        item_name_normalized = normalize_name(item['name'])
-        potential_matches = []
-        for dish in dish_descriptions:
-            dish_name_normalized = normalize_name(dish['name'])
-            potential_matches.append(dish['name'])
-            print(f"Comparing: '{item_name_normalized}' (from {item['name']}) with '{dish_name_normalized}' (from {dish['name']})")
-            if dish_name_normalized == item_name_normalized:
-                description = dish['description']
-                print(f"Match found: '{item['name']}' in {menu_key} -> '{dish['name']}'")
-                matched_items.append((item['name'], menu_key, dish['name']))
+        return []
+    for kind, text in tokens:
+        if text == '=':
+            break
+    for kind, text in tokens:
+        if text == '[':
+            break
+
+    dish_descriptions = []
+    current_dish = None
+    key = None
+    for kind, text in tokens:
+        if current_dish is None:
+            if text == '{':
+                current_dish = {}
+            elif text == ']':
                 break
-        if description:
-            item['description'] = description
-            print(f"Added description for {item['name']} in {menu_key}")
-        else:
-            unmatched_items.append((item['name'], menu_key, potential_matches))
-
-# Write updated menus.json
-with open(output_menus_json_path, 'w') as file:
-    json.dump(menus, file, indent=2)
-
-print("Updated menus.json with dish descriptions")
-print(f"\nMatched items ({len(matched_items)}):")
-for item_name, menu_key, dish_name in matched_items:
-    print(f"- {item_name} in {menu_key} matched with {dish_name}")
-if unmatched_items:
-    print(f"\nUnmatched items (no description found, showing up to 10 of {len(unmatched_items)}):")
-    for item_name, menu_key, matches in unmatched_items[:10]:
-        print(f"- {item_name} in {menu_key}")
-        print(f"  Potential matches (showing up to 5): {', '.join(matches[:5])}")
-    if len(unmatched_items) > 10:
-        print(f"... and {len(unmatched_items) - 10} more unmatched items")
\ No newline at end of file
+        elif text == '}':
+            if current_dish.get('name') and current_dish.get('description'):
+                dish_descriptions.append({'name': current_dish['name'], 'description': current_dish['description']})
+            current_dish = None
+            key = None
+        elif key is None and kind in ('name', 'string'):
+            key = _string_value(text) if kind == 'string' else text
+        elif text == ':':
+            continue
+        elif text == ',':
+            key = None
+        elif key is not None:
+            if kind == 'string':
+                current_dish[key] = _string_value(text)
+            key = None
+    return dish_descriptions
+
+def load_dish_descriptions(file_path, cache_path=None):
+    """
+    Parse the dish descriptions at file_path, reusing an earlier parse while the file's
+    mtime and size are unchanged. With cache_path the parse is also kept on disk across runs.
+    """
+    stat = os.stat(file_path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _parse_cache.get(file_path)
+    if cached is not None and cached[:2] == key:
+        return cached[2]
+
+    dish_descriptions = None
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'r') as f:
+                stored = json.load(f)
+            if (stored.get('path'), stored.get('mtime_ns'), stored.get('size')) == (file_path,) + key:
+                dish_descriptions = stored['dishes']
+        except (ValueError, KeyError):
+            dish_descriptions = None
+
+    if dish_descriptions is None:
+        with open(file_path, 'r') as file:
+            dish_descriptions = parse_dish_descriptions(file.read())
+        if cache_path:
+            write_atomic(cache_path, json.dumps({'path': file_path, 'mtime_ns': key[0], 'size': key[1],
+                                                 'dishes': dish_descriptions}))
+
+    _parse_cache[file_path] = key + (dish_descriptions,)
+    return dish_descriptions
+
+def build_description_index(dish_descriptions):
+    """NameResolver from dish name to dish. The first dish listed wins, as in a linear scan."""
+    return NameResolver([dish['name'] for dish in dish_descriptions], values=dish_descriptions)
+
+def apply_dish_descriptions(menus, dish_descriptions):
+    """
+    Set the description of every menu item with a matching dish, by name ignoring case,
+    camelCase, punctuation, plurals and dietary suffixes such as "(V)". Items no dish names
+    are retried without serving qualifiers such as "(Glass)".
+    `dish_descriptions` is a list of dishes or an index from build_description_index.
+    Returns (matched_items, unmatched_items): (item name, menu key, dish name) and (item name, menu key).
+    """
+    index = dish_descriptions if isinstance(dish_descriptions, NameResolver) else build_description_index(dish_descriptions)
+    unmatched_items = []
+    matched_items = []
+    for menu_key, menu in menus.items():
+        for item in menu.items:
+            name = item.name or ''
+            dish = index.get(name)
+            if dish is None and name.endswith(')'):
+                dish = index.get(SERVING_SUFFIX.sub('', name))
+            if dish is not None:
+                item.description = dish['description']
+                matched_items.append((item.name, menu_key, dish['name']))
+            else:
+                unmatched_items.append((item.name, menu_key))
+    return matched_items, unmatched_items
+
+def closest_dish_names(index, item_name, n=3):
+    """
+    Up to n dish names close to an item name. Dishes sharing the item's first word come from
+    the index's prefix trie; all dishes are compared only when none of those is close.
+    """
+    key = name_key(item_name)
+    sharing = index.with_prefix(key.split()[0]) if key else []
+    for candidates in ([sharing, index.names] if sharing else [index.names]):
+        names = {}
+        for name in candidates:
+            names.setdefault(name_key(name), name)
+        closest = difflib.get_close_matches(key, list(names), n=n)
+        if closest:
+            return [names[close] for close in closest]
+    return []
+
+def summarize(matched_items, unmatched_items, index, limit=SUMMARY_LIMIT):
+    """Bounded diagnostics: match counts plus up to `limit` unmatched items with their closest dish names."""
+    summary = {
+        'matched': len(matched_items),
+        'unmatched': len(unmatched_items),
+        'unmatched_sample': [],
+    }
+    for item_name, menu_key in unmatched_items[:limit]:
+        summary['unmatched_sample'].append({
+            'item': item_name,
+            'menu': menu_key,
+            'closest': closest_dish_names(index, item_name or ''),
+        })
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Copy dish descriptions from DishDescriptions.ts onto menu items.")
+    parser.add_argument('--descriptions-file', default=setting('descriptions_file', dish_descriptions_path),
+                        help="DishDescriptions.ts to read")
+    parser.add_argument('--menu-file', default=setting('menu_file', menus_json_path),
+                        help="menu document (.json) or SQLite store (.db) to read")
+    parser.add_argument('--output', help="where to save the updated menus (default: replace --menu-file)")
+    parser.add_argument('--parse-cache',
+                        help="file caching the parsed descriptions across runs while DishDescriptions.ts is "
+                             "unchanged (default: no cache file)")
+    args = parser.parse_args(argv)
+    output_path = args.output or args.menu_file
+
+    # Check if DishDescriptions.ts exists
+    if not os.path.exists(args.descriptions_file):
+        raise FileNotFoundError(f"DishDescriptions.ts not found at {args.descriptions_file}")
+
+    dish_descriptions = load_dish_descriptions(args.descriptions_file, args.parse_cache)
+    index = build_description_index(dish_descriptions)
+    print(f"Parsed {len(dish_descriptions)} dish descriptions ({index.distinct()} distinct names)")
+
+    # Check if menus.json exists
+    if not os.path.exists(args.menu_file):
+        raise FileNotFoundError(f"menus.json not found at {args.menu_file}")
+
+    # Read menus.json
+    output_store = open_store(output_path, create=True)
+    with output_store.locked():
+        menus = open_store(args.menu_file).load()
+
+        matched_items, unmatched_items = apply_dish_descriptions(menus, index)
+
+        # Write updated menus.json
+        output_store.save(menus)
+
+    summary = summarize(matched_items, unmatched_items, index)
+    print("Updated menus.json with dish descriptions")
+    print(f"Matched {summary['matched']} item(s), {summary['unmatched']} without a description")
+    for entry in summary['unmatched_sample']:
+        closest = f" (closest: {', '.join(entry['closest'])})" if entry['closest'] else ''
+        print(f"- {entry['item']} in {entry['menu']}{closest}")
+    if summary['unmatched'] > len(summary['unmatched_sample']):
+        print(f"... and {summary['unmatched'] - len(summary['unmatched_sample'])} more unmatched items")
+
+if __name__ == "__main__":
+    main()
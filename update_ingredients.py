@@ -1,8 +1,15 @@
 
-import json
-import csv
+import argparse
 from io import StringIO
 
+from catalog import update_distinct
+from config import setting
+from menu_store import open_store
+from price_feed import PriceIndex, iter_price_offers, load_price_index, normalize_price_key
+from units import BULK_UNITS, PIECE_UNITS, base_unit
+
+MENU_FILE_PATH = 'server/menus.json'
+
 # CSV data containing wholesale prices for all ingredients
 csv_data = """Ingredient,Category,Unit,Wholesale Price (excl. VAT),VAT (20%),Final Price (incl. VAT),Source
 lamb,Proteins,kg,6.50,1.30,7.80,"Brakes Foodservice, Tridge"
@@ -301,94 +308,119 @@ cinnamon,Herbs and Spices,kg,5.00,1.00,6.00,"Brakes Foodservice"
 appleJuice,Fruits,L,1.50,0.30,1.80,"Brakes Foodservice"
 """
 
-# Parse CSV data
-price_data = []
-csv_file = StringIO(csv_data)
-reader = csv.DictReader(csv_file)
-for row in reader:
-    price_data.append({
-        'ingredient': row['Ingredient'],
-        'unit': row['Unit'],
-        'category': row['Category'],
-        'price_incl_vat': float(row['Final Price (incl. VAT)'])
-    })
-
 def determine_new_unit(old_unit, ingredient, category):
     """Determine the new unit for buying price based on ingredient type."""
     liquid_categories = ['Beverages', 'Oils and Vinegars', 'Condiments', 'Sweeteners']
     if old_unit in ['g', 'kg'] and category not in liquid_categories:
-        return 'kg'
+        return BULK_UNITS[base_unit(old_unit)]
     elif old_unit in ['ml', 'L'] and category in liquid_categories:
-        return 'L'
-    elif old_unit in ['unit', 'half', 'pint', 'bottle', 'cup', 'shot']:
+        return BULK_UNITS[base_unit(old_unit)]
+    elif old_unit in PIECE_UNITS:
         return old_unit
     else:
         print(f"Warning: Unhandled unit for {ingredient}: {old_unit}, category: {category}")
         return old_unit
 
-def update_menu_costs():
+# Normalize ingredient names (e.g., kalamari -> calamari). Case, camelCase, punctuation and plural
+# differences need no alias: the PriceIndex resolves them (name_resolver)
+ingredient_aliases = {
+    'kalamari': 'calamari',
+    'aubergine': 'aubergine',
+    'courgette': 'courgette',
+    'cocaCola': 'coke',
+    'espressoLungo': 'espressoCoffee',
+    'coffeeSweet': 'sugar',
+    'hotWater': 'hotWater',
+    'baileysCream': 'baileysCream',
+    'brandySpirit': 'brandySpirit',
+    'chilli': 'chilli',
+    'freshChilli': 'chilli',
+    'egg': 'eggs',
+    'lemon': 'lemons',
+    'coffee': 'coffeeBeans',
+    'peppercorn': 'peppercorns',
+    'bechamel': 'bechamelSauce',
+    'beef': 'beefSirloin'
+}
+
+def build_price_index(price_file=None, preferred_suppliers=None):
+    """Index the price list at price_file (default: the embedded csv_data) by ingredient name."""
+    if price_file is None:
+        return PriceIndex(ingredient_aliases, preferred_suppliers).add_all(iter_price_offers(StringIO(csv_data)))
+    return load_price_index(price_file, ingredient_aliases, preferred_suppliers)
+
+def apply_price(name, details, price_index):
+    """Set the cost, unit and category of one Ingredient from the price index, in place.
+    Returns whether a price was found."""
+    # Ensure category exists
+    if details.category is None:
+        details.category = 'Miscellaneous'
+        print(f"Warning: Added default category 'Miscellaneous' for {name}")
+
+    # Find matching price data (aliases are resolved by the index)
+    offer = price_index.lookup(name)
+    if offer is None:
+        print(f"Warning: No price found for {name}")
+        return False
+    # Determine new unit for buying price
+    new_unit = determine_new_unit(details.unit, name, offer.category)
+    # A row found through an alias or a looser spelling only applies if it is priced in that unit
+    if new_unit != offer.unit and normalize_price_key(offer.ingredient) != normalize_price_key(name):
+        print(f"Warning: Price of {offer.ingredient} is per {offer.unit}, not per {new_unit}; not used for {name}")
+        return False
+    # Set cost to match new unit
+    details.cost = round(offer.price, 2)
+    details.unit = new_unit
+    details.category = offer.category
+    return True
+
+def update_ingredient_costs(menus, changes=None, price_index=None):
+    """Apply the price list (default: csv_data) to the initialIngredients of every menu.
+    Ingredients several menus list with the same values are priced once (catalog.update_distinct).
+    With a manifest.ChangeSet, only dirty ingredients are updated."""
+    if price_index is None:
+        price_index = build_price_index()
+    if changes is None:
+        update_distinct(menus, lambda name, details: apply_price(name, details, price_index))
+        return menus
+    # Update costs and units for initialIngredients only
+    for menu_key, menu in menus.items():
+        ingredients = menu.ingredients
+        for name in list(ingredients.keys()):
+            if not changes.ingredient_dirty(menu_key, name):
+                continue
+            apply_price(name, ingredients[name], price_index)
+    return menus
+
+def update_menu_costs(price_file=None, preferred_suppliers=None, menu_file=MENU_FILE_PATH):
     try:
+        price_index = build_price_index(price_file, preferred_suppliers)
+
         # Load menu data
-        with open('server/menus.json', 'r') as f:
-            data = json.load(f)
-        
-        # Normalize ingredient names (e.g., kalamari -> calamari)
-        ingredient_aliases = {
-            'kalamari': 'calamari',
-            'aubergine': 'aubergine',
-            'courgette': 'courgette',
-            'cocaCola': 'coke',
-            'espressoLungo': 'espressoCoffee',
-            'coffeeSweet': 'sugar',
-            'hotWater': 'hotWater',
-            'baileysCream': 'baileysCream',
-            'brandySpirit': 'brandySpirit',
-            'chilli': 'chilli',
-            'freshChilli': 'chilli',
-            'egg': 'eggs',
-            'lemon': 'lemons',
-            'coffee': 'coffeeBeans',
-            'peppercorn': 'peppercorns',
-            'bechamel': 'bechamelSauce',
-            'beef': 'beefSirloin'
-        }
-        
-        # Update costs and units for initialIngredients only
-        for menu_key in ['izMenu', 'bellFood']:
-            ingredients = data[menu_key]['initialIngredients']
-            for name in list(ingredients.keys()):
-                details = ingredients[name]
-                # Ensure category exists
-                if 'category' not in details:
-                    details['category'] = 'Miscellaneous'
-                    print(f"Warning: Added default category 'Miscellaneous' for {name}")
-                
-                # Handle aliases
-                normalized_name = ingredient_aliases.get(name.lower(), name.lower())
-                
-                # Find matching price data
-                for price_entry in price_data:
-                    if price_entry['ingredient'].lower() == normalized_name:
-                        # Determine new unit for buying price
-                        new_unit = determine_new_unit(details['unit'], name, price_entry['category'])
-                        # Set cost to match new unit
-                        price = price_entry['price_incl_vat']
-                        details['cost'] = round(price, 2)
-                        details['unit'] = new_unit
-                        details['category'] = price_entry['category']
-                        break
-                else:
-                    print(f"Warning: No price found for {name}")
-        
-        # Save updated menu data
-        with open('server/menus.json', 'w') as f:
-            json.dump(data, f, indent=2)
-        
-        print("Successfully updated server/menus.json with new wholesale prices (kg for solids, L for liquids). Recipe quantities remain in g/ml.")
+        store = open_store(menu_file)
+        with store.locked():
+            menus = store.load()
+
+            update_ingredient_costs(menus, price_index=price_index)
+
+            # Save updated menu data
+            store.save(menus)
+
+        print(f"Successfully updated {menu_file} with new wholesale prices (kg for solids, L for liquids). Recipe quantities remain in g/ml.")
     except FileNotFoundError:
-        print("Error: server/menus.json not found. Please ensure the file exists in the correct directory.")
+        print(f"Error: {menu_file} not found. Please ensure the file exists in the correct directory.")
     except Exception as e:
         print(f"Error updating menu costs: {e}")
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Update ingredient costs from a supplier price list.")
+    parser.add_argument('--menu-file', default=setting('menu_file', MENU_FILE_PATH),
+                        help="menu document (.json) or SQLite store (.db) to update")
+    parser.add_argument('--price-file', help="CSV price list to import (default: the embedded csv_data)")
+    parser.add_argument('--prefer', action='append', metavar='SUPPLIER',
+                        help="preferred supplier, in order of preference (repeatable); default is cheapest")
+    args = parser.parse_args(argv)
+    update_menu_costs(args.price_file, args.prefer, args.menu_file)
+
 if __name__ == "__main__":
-    update_menu_costs()
+    main()
@@ -1,112 +1,130 @@
+import argparse
 import json
-import re
+
+from config import setting
+from menu_model import atomic_writer
+from menu_store import open_store
+from name_resolver import NameResolver
+from units import cost_per_bulk, pack_volume_ml, parse_pack_size
+from validation import MAX_RESALE_PRICES, PER_UNIT_CATEGORIES
 
 # Define file paths
-MENU_FILE_PATH = '/Users/m/Programming/LOCAL/RestaurantProfitPro/server/menus.json'
-REPORT_FILE_PATH = '/Users/m/Programming/LOCAL/RestaurantProfitPro/server/resale_price_updates.json'
-
-# Define categories for beverages (priced per bottle)
-BEVERAGE_CATEGORIES = ['Beverages', 'Soft Drinks', 'Beers & Ciders', 'White Wines', 'Red Wines', 'Rose Wines', 'Sparkling Wines', 'Cocktails', 'Hot Drinks', 'Liqueur Coffees']
-
-# Maximum reasonable prices for resale items
-MAX_PRICE_PER_ITEM = 5.00  # For beverages (per bottle)
-MAX_PRICE_PER_KG_L = 50.00  # For bulk items (per kg/L)
-
-# Load the menu data
-with open(MENU_FILE_PATH, 'r') as f:
-    menus = json.load(f)
-
-# Log updates and issues
-update_report = {
-    "updated_items": [],
-    "unmatched_items": [],
-    "anomalous_prices": []
-}
-
-for menu_name, menu_data in menus.items():
-    ingredients = menu_data.get('initialIngredients', {})
-    items = menu_data.get('items', [])
-
-    for item in items:
-        if item.get('hasRecipe', False):
-            # Skip recipe items
-            continue
-
-        # This is a resale item (hasRecipe: false)
-        resale_item_name = item.get('name', '')
-        category = item.get('category', '')
-
-        # Find matching ingredient using exact match (case-insensitive)
-        matched_ingredient = None
-        normalized_item_name = resale_item_name.lower()
-        for ing_name in ingredients:
-            if normalized_item_name == ing_name.lower():
-                matched_ingredient = ing_name
-                break
-
-        if matched_ingredient:
-            ingredient_data = ingredients[matched_ingredient]
-            cost = ingredient_data['cost']
-            unit = ingredient_data['unit']
-
-            # Adjust price based on unit and category
-            adjusted_price = cost
-            if category in BEVERAGE_CATEGORIES:
-                # For beverages, assume cost is per bottle or per ml
-                if unit == 'unit':
-                    adjusted_price = cost  # Cost is per bottle
-                elif unit == 'ml':
-                    # Parse bottle size from name (e.g., "275ml")
-                    volume_ml = 275  # Default volume
-                    if 'ml' in resale_item_name.lower():
-                        try:
-                            volume_ml = float(''.join(filter(str.isdigit, resale_item_name.split('ml')[0].split()[-1])))
-                        except (IndexError, ValueError):
-                            pass  # Use default if parsing fails
-                    adjusted_price = cost * volume_ml
-                else:
-                    # Unexpected unit for beverage, skip
+MENU_FILE_PATH = 'server/menus.json'
+REPORT_FILE_PATH = 'server/resale_price_updates.json'
+
+# Categories for beverages (priced per bottle)
+BEVERAGE_CATEGORIES = PER_UNIT_CATEGORIES
+
+# Maximum reasonable prices for resale items, per bottle and per kg/L
+MAX_PRICE_PER_ITEM, MAX_PRICE_PER_KG_L = MAX_RESALE_PRICES['exact']
+
+def update_resale_prices(menus, changes=None):
+    """Set buyingPrice of resale items from exactly matching ingredients (name_resolver). Returns the update report.
+    With a manifest.ChangeSet, only items that are dirty or match a dirty ingredient are updated."""
+    # Log updates and issues
+    update_report = {
+        "updated_items": [],
+        "unmatched_items": [],
+        "anomalous_prices": []
+    }
+
+    for menu_name, menu in menus.items():
+        ingredients = menu.ingredients
+        resolver = NameResolver(ingredients)
+
+        for item in menu.items:
+            if item.has_recipe:
+                # Skip recipe items
+                continue
+
+            # This is a resale item (hasRecipe: false)
+            resale_item_name = item.name or ''
+            category = item.category or ''
+
+            # Find matching ingredient by name, ignoring case, camelCase, punctuation, plurals and dietary
+            # suffixes; names with a pack or serving size must match up to case (see ResaleMatcher.resolve)
+            if parse_pack_size(resale_item_name) is not None:
+                matched_ingredient = resolver.resolve_exact(resale_item_name)
+            else:
+                matched_ingredient = resolver.resolve(resale_item_name)
+
+            if changes is not None and not changes.item_dirty(menu_name, item) and not (
+                    matched_ingredient and changes.ingredient_dirty(menu_name, matched_ingredient)):
+                continue
+
+            if matched_ingredient:
+                ingredient = ingredients[matched_ingredient]
+                cost = ingredient.cost
+                unit = ingredient.unit
+
+                # Adjust price based on unit and category
+                adjusted_price = cost
+                if category in BEVERAGE_CATEGORIES:
+                    # For beverages, assume cost is per bottle or per ml
+                    if unit == 'unit':
+                        adjusted_price = cost  # Cost is per bottle
+                    elif unit == 'ml':
+                        # Parse pack size from name (e.g., "275ml", "4x330ml"), default 275ml
+                        adjusted_price = cost * pack_volume_ml(resale_item_name)
+                    else:
+                        # Unexpected unit for beverage, skip
+                        update_report['anomalous_prices'].append({
+                            'item': resale_item_name,
+                            'ingredient': matched_ingredient,
+                            'reason': f'Unexpected unit {unit} for beverage item'
+                        })
+                        continue
+                elif unit in ['g', 'ml', 'kg', 'L']:
+                    adjusted_price, _ = cost_per_bulk(cost, unit)  # Convert to per kg/L
+
+                # Validate the adjusted price
+                max_price = MAX_PRICE_PER_ITEM if category in BEVERAGE_CATEGORIES else MAX_PRICE_PER_KG_L
+                if adjusted_price > max_price:
                     update_report['anomalous_prices'].append({
                         'item': resale_item_name,
                         'ingredient': matched_ingredient,
-                        'reason': f'Unexpected unit {unit} for beverage item'
+                        'adjusted_price': adjusted_price,
+                        'max_allowed': max_price,
+                        'reason': 'Price exceeds maximum allowed'
                     })
                     continue
-            elif unit in ['g', 'ml']:
-                adjusted_price = cost * 1000  # Convert to per kg/L
-            elif unit in ['kg', 'L']:
-                adjusted_price = cost  # Already per kg/L
-
-            # Validate the adjusted price
-            max_price = MAX_PRICE_PER_ITEM if category in BEVERAGE_CATEGORIES else MAX_PRICE_PER_KG_L
-            if adjusted_price > max_price:
-                update_report['anomalous_prices'].append({
+
+                # Update buyingPrice
+                old_price = item.buying_price
+                item.buying_price = adjusted_price
+                update_report['updated_items'].append({
                     'item': resale_item_name,
                     'ingredient': matched_ingredient,
-                    'adjusted_price': adjusted_price,
-                    'max_allowed': max_price,
-                    'reason': 'Price exceeds maximum allowed'
+                    'old_price': old_price,
+                    'new_price': adjusted_price
                 })
-                continue
+            else:
+                update_report['unmatched_items'].append(resale_item_name)
+
+    return update_report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Set resale item buying prices from exactly matching ingredients.")
+    parser.add_argument('--menu-file', default=setting('menu_file', MENU_FILE_PATH),
+                        help="menu document (.json) or SQLite store (.db) to update")
+    parser.add_argument('--report-file', default=REPORT_FILE_PATH, help="where to write the update report")
+    args = parser.parse_args(argv)
+
+    # Load the menu data
+    store = open_store(args.menu_file)
+    with store.locked():
+        menus = store.load()
+
+        update_report = update_resale_prices(menus)
+
+        # Save updated menus
+        store.save(menus)
+
+    # Save update report
+    with atomic_writer(args.report_file) as f:
+        json.dump(update_report, f, indent=2)
+
+    print(f"Resale item prices updated. Check {args.report_file} for details.")
 
-            # Update buyingPrice
-            old_price = item['buyingPrice']
-            item['buyingPrice'] = adjusted_price
-            update_report['updated_items'].append({
-                'item': resale_item_name,
-                'ingredient': matched_ingredient,
-                'old_price': old_price,
-                'new_price': adjusted_price
-            })
-        else:
-            update_report['unmatched_items'].append(resale_item_name)
-
-# Save updated menus
-with open(MENU_FILE_PATH, 'w') as f:
-    json.dump(menus, f, indent=2)
-
-# Save update report
-with open(REPORT_FILE_PATH, 'w') as f:
-    json.dump(update_report, f, indent=2)
-
-print("Resale item prices updated. Check 'resale_price_updates.json' in the server directory for details.")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
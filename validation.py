@@ -0,0 +1,437 @@
+import argparse
+import json
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from config import setting
+from menu_model import MENU_FILE_PATH, atomic_writer
+from menu_store import open_store
+from units import BASE_UNITS, UNIT_FACTORS
+
+REPORT_FILE_PATH = 'server/validation_report.json'
+
+# Categories for unit and cost handling
+SOLID_CATEGORIES = ['Proteins', 'Vegetables', 'Fruits', 'Grains', 'Nuts and Seeds', 'Baking Supplies', 'Sweeteners']
+LIQUID_CATEGORIES = ['Beverages', 'Soft Drinks', 'Beers & Ciders', 'White Wines', 'Red Wines', 'Rose Wines', 'Sparkling Wines', 'Cocktails', 'Hot Drinks', 'Liqueur Coffees', 'Oils and Vinegars']
+PER_UNIT_CATEGORIES = ['Beverages', 'Soft Drinks', 'Beers & Ciders', 'White Wines', 'Red Wines', 'Rose Wines', 'Sparkling Wines', 'Cocktails', 'Hot Drinks', 'Liqueur Coffees']
+
+# Cost per base unit an ingredient may have at all; fix_costings drops anything outside
+COST_LIMITS = {
+    'g': (0.001, 0.05),   # Up to £50/kg for proteins like lamb
+    'ml': (0.001, 0.01),  # Up to £10/L for liquids
+    'unit': (0.50, 10.00) # Up to £10 per item
+}
+
+# Typical cost per base unit, by the unit expected for the category; correct_resale_prices
+# rescales costs outside it by CORRECTION_DIVISORS (decimal-place errors) or drops them
+EXPECTED_COST_RANGES = {
+    'g': (0.001, 0.01),    # e.g., £1–£10 per kg for solids
+    'ml': (0.001, 0.005),   # e.g., £1–£5 per L for liquids
+    'unit': (0.50, 5.00)    # e.g., £0.50–£5 per item (e.g., bottle, egg)
+}
+CORRECTION_DIVISORS = (1000, 100, 10)
+
+# Largest reasonable resale buying price: (per bottle for PER_UNIT_CATEGORIES, per kg/L otherwise),
+# for prices from fuzzy matched ingredients (correct_resale_prices) and exact ones (update_resale_prices)
+MAX_RESALE_PRICES = {
+    'fuzzy': (10, 50),
+    'exact': (5.00, 50.00),
+}
+
+
+def expected_unit(category):
+    """Base unit costs of an ingredient category are expected in."""
+    if category in SOLID_CATEGORIES:
+        return 'g'
+    elif category in LIQUID_CATEGORIES:
+        return 'ml'
+    return 'unit'
+
+
+def _codes(values):
+    """Encode values as integer codes. Returns (codes, distinct values in code order)."""
+    lookup = defaultdict()
+    lookup.default_factory = lookup.__len__
+    codes = np.fromiter(map(lookup.__getitem__, values), dtype=np.int64, count=len(values))
+    return codes, list(lookup)
+
+
+def _expected_units(categories):
+    """expected_unit of each category, computed once per distinct category."""
+    codes, distinct = _codes(categories)
+    return np.array([expected_unit(category) for category in distinct], dtype=object)[codes]
+
+
+def _python(values):
+    """Array values as plain Python values for a JSON report, NaN as None."""
+    return [None if value != value else value for value in values.tolist()]
+
+
+class IngredientTable:
+    """
+    Columnar view of the ingredients of many menus: parallel rows of menu name, ingredient,
+    cost (NaN when missing), unit and category, plus the Ingredient objects they came from.
+    """
+
+    def __init__(self, menus, names, ingredients):
+        self.menus = menus
+        self.names = names
+        self.ingredients = ingredients
+        self.costs = np.array([np.nan if ingredient.cost is None else ingredient.cost for ingredient in ingredients],
+                              dtype=float)
+        self.units = np.array([ingredient.unit for ingredient in ingredients], dtype=object)
+        self.categories = np.array([ingredient.category for ingredient in ingredients], dtype=object)
+
+    @classmethod
+    def from_menus(cls, menus, include=None):
+        """Table of every ingredient of every menu, or of those for which include(menu, name) is true."""
+        menu_names = []
+        names = []
+        ingredients = []
+        for menu_name, menu in menus.items():
+            for name, ingredient in menu.ingredients.items():
+                if include is None or include(menu_name, name):
+                    menu_names.append(menu_name)
+                    names.append(name)
+                    ingredients.append(ingredient)
+        return cls(menu_names, names, ingredients)
+
+    def __len__(self):
+        return len(self.names)
+
+
+class Rule:
+    """A check over an IngredientTable. Subclasses declare what is checked and how it is fixed."""
+    action = None
+    # Column reported as the old/new value of a violation
+    field = None
+
+    def __init__(self, name):
+        self.name = name
+
+    def evaluate(self, columns, rows):
+        """
+        Check the live `rows` (indices) of the working columns, correcting them in place.
+        Returns (violating rows, actions): actions is an array of per-row actions, or None
+        when every violation gets the rule's own action.
+        """
+        raise NotImplementedError
+
+    def reason(self, columns, ingredient, row):
+        """Explanation of a violation for the report, from the columns as validation left them."""
+        return None
+
+
+class RequiredRule(Rule):
+    """Rows missing any of `fields` ('cost', 'unit', 'category') are dropped."""
+    action = 'drop'
+
+    def __init__(self, name, fields):
+        super().__init__(name)
+        self.fields = fields
+
+    def evaluate(self, columns, rows):
+        missing = np.zeros(len(rows), dtype=bool)
+        for field in self.fields:
+            values = columns[field][rows]
+            missing |= np.isnan(values) if field == 'cost' else np.equal(values, None)
+        return rows[missing], None
+
+    def reason(self, columns, ingredient, row):
+        return f"Missing {' or '.join(self.fields)}"
+
+
+class DefaultRule(Rule):
+    """Missing values of `field` are set to `value`."""
+    action = 'default'
+
+    def __init__(self, name, field, value):
+        super().__init__(name)
+        self.field = field
+        self.value = value
+
+    def evaluate(self, columns, rows):
+        column = columns[self.field]
+        missing = rows[np.equal(column[rows], None)]
+        column[missing] = self.value
+        return missing, None
+
+
+class BulkUnitRule(Rule):
+    """Costs quoted per kg or L are converted to per g or ml."""
+    action = 'convert'
+    field = 'cost'
+
+    def __init__(self, name, units=('kg', 'L')):
+        super().__init__(name)
+        self.units = units
+
+    def evaluate(self, columns, rows):
+        converted = rows[np.isin(columns['unit'][rows].astype(str), self.units)]
+        for unit in self.units:
+            matches = converted[columns['unit'][converted] == unit]
+            base, factor = UNIT_FACTORS[unit]
+            columns['cost'][matches] = columns['cost'][matches] / factor
+            columns['unit'][matches] = base
+        return converted, None
+
+
+class UnitRule(Rule):
+    """Units other than `units` are replaced by the unit expected for the row's category."""
+    action = 'correct'
+    field = 'unit'
+
+    def __init__(self, name, units=BASE_UNITS):
+        super().__init__(name)
+        self.units = units
+
+    def evaluate(self, columns, rows):
+        unexpected = rows[~np.isin(columns['unit'][rows].astype(str), self.units)]
+        columns['unit'][unexpected] = _expected_units(columns['category'][unexpected])
+        return unexpected, None
+
+
+class RangeRule(Rule):
+    """
+    Costs must fall within ranges[unit], by the row's unit or (by_category) the unit expected for
+    its category; units without a range pass. Out-of-range costs are divided by each of `divisors`
+    in turn and corrected by the first that lands in range; the rest are dropped. Missing costs
+    and units are read as default_cost and default_unit.
+    """
+    action = 'drop'
+    field = 'cost'
+
+    def __init__(self, name, ranges, by_category=False, divisors=(), default_cost=None, default_unit=None):
+        super().__init__(name)
+        self.ranges = ranges
+        self.by_category = by_category
+        self.divisors = divisors
+        self.default_cost = default_cost
+        self.default_unit = default_unit
+
+    def _range_units(self, columns, rows):
+        if self.by_category:
+            return _expected_units(columns['category'][rows])
+        units = columns['unit'][rows]
+        if self.default_unit is not None:
+            units = np.where(np.equal(units, None), self.default_unit, units)
+        return units
+
+    def evaluate(self, columns, rows):
+        units = self._range_units(columns, rows)
+        # Compile the ranges to per-row bounds through unit codes
+        codes, distinct = _codes(units)
+        bounds = np.array([self.ranges.get(unit, (0, float('inf'))) for unit in distinct], dtype=float).reshape(-1, 2)
+        low = bounds[codes, 0]
+        high = bounds[codes, 1]
+        costs = columns['cost'][rows]
+        if self.default_cost is not None:
+            costs = np.where(np.isnan(costs), self.default_cost, costs)
+        outside = ~((low <= costs) & (costs <= high))
+
+        corrected = np.zeros(len(rows), dtype=bool)
+        for divisor in self.divisors:
+            candidates = costs / divisor
+            fixed = outside & ~corrected & (low <= candidates) & (candidates <= high)
+            columns['cost'][rows[fixed]] = candidates[fixed]
+            corrected |= fixed
+
+        violating = np.flatnonzero(outside)
+        return rows[violating], np.where(corrected[violating], 'correct', self.action)
+
+    def reason(self, columns, ingredient, row):
+        # Dropped rows are not touched by later rules, so the columns still hold what was checked
+        unit = self._range_units(columns, np.array([row]))[0]
+        cost = columns['cost'][row]
+        minimum, maximum = self.ranges.get(unit, (0, float('inf')))
+        # Report the cost as it was written unless an earlier rule converted it to another unit
+        # (a missing cost reads as default_cost)
+        converted = not self.by_category and ingredient.unit not in (None, unit)
+        if ingredient.cost is None:
+            cost = float(self.default_cost) if converted else self.default_cost
+        elif not converted and cost == ingredient.cost:
+            cost = ingredient.cost
+        else:
+            cost = float(cost)
+        return f'Cost {cost} out of range ({minimum}, {maximum}) for unit {unit}'
+
+
+# Rules fix_costings applies: convert bulk costs, drop costs outside COST_LIMITS, default the category
+FIX_COSTINGS_RULES = (
+    BulkUnitRule('bulk_unit'),
+    RangeRule('cost_limits', COST_LIMITS, default_cost=0, default_unit='unit'),
+    DefaultRule('missing_category', 'category', 'Uncategorized'),
+)
+
+# Rules correct_resale_prices applies before matching resale items
+CORRECT_RESALE_PRICES_RULES = (
+    RequiredRule('missing_cost_or_unit', ('cost', 'unit')),
+    DefaultRule('missing_category', 'category', 'Uncategorized'),
+    UnitRule('unexpected_unit'),
+    RangeRule('expected_cost', EXPECTED_COST_RANGES, by_category=True, divisors=CORRECTION_DIVISORS),
+)
+
+RULE_SETS = {
+    'fix_costings': FIX_COSTINGS_RULES,
+    'correct_resale_prices': CORRECT_RESALE_PRICES_RULES,
+}
+
+
+class Findings:
+    """The violations of one rule, as parallel arrays of rows, actions and old/new values."""
+    __slots__ = ('rule', 'position', 'rows', 'actions', 'old', 'new')
+
+    def __init__(self, rule, position, rows, actions, old, new):
+        self.rule = rule
+        self.position = position
+        self.rows = rows
+        self.actions = actions
+        self.old = old
+        self.new = new
+
+
+class ValidationResult:
+    """
+    Outcome of validating an IngredientTable: which rows are kept, their corrected columns and
+    the findings of each rule. Findings stay columnar; entries() builds report dicts on demand.
+    """
+
+    def __init__(self, table, keep, columns, findings):
+        self.table = table
+        self.keep = keep
+        self.columns = columns
+        self.findings = findings
+
+    def rows(self, rule=None, action=None):
+        """Table rows with a violation (of a rule name and/or action), in table order."""
+        selected = [findings.rows if action is None else findings.rows[findings.actions == action]
+                    for findings in self.findings if rule is None or findings.rule.name == rule]
+        return np.unique(np.concatenate(selected)) if selected else np.zeros(0, dtype=np.int64)
+
+    def dropped(self):
+        """(menu, ingredient) of every dropped row, in table order."""
+        return [(self.table.menus[row], self.table.names[row]) for row in np.flatnonzero(~self.keep)]
+
+    def counts(self):
+        return Counter({findings.rule.name: len(findings.rows) for findings in self.findings})
+
+    def entries(self, rule=None, action=None):
+        """
+        Report entries (menu, ingredient, rule, action, field, old, new, reason) of the violations,
+        optionally of one rule name and/or action, in table order and then rule order.
+        """
+        selected = []
+        for findings in self.findings:
+            if rule is not None and findings.rule.name != rule:
+                continue
+            mask = np.ones(len(findings.rows), dtype=bool) if action is None else findings.actions == action
+            selected.append((findings, np.flatnonzero(mask)))
+        if not selected:
+            return []
+        rows = np.concatenate([findings.rows[indices] for findings, indices in selected])
+        positions = np.concatenate([np.full(len(indices), findings.position) for findings, indices in selected])
+        order = np.lexsort((positions, rows))
+        entries = []
+        for findings, indices in selected:
+            rule_rows = findings.rows[indices].tolist()
+            actions = findings.actions[indices].tolist()
+            field = findings.rule.field
+            old = _python(findings.old[indices]) if field else [None] * len(indices)
+            new = _python(findings.new[indices]) if field else [None] * len(indices)
+            for row, row_action, old_value, new_value in zip(rule_rows, actions, old, new):
+                entries.append({
+                    'menu': self.table.menus[row],
+                    'ingredient': self.table.names[row],
+                    'rule': findings.rule.name,
+                    'action': row_action,
+                    'field': field,
+                    'old': old_value,
+                    'new': None if row_action == 'drop' else new_value,
+                    'reason': findings.rule.reason(self.columns, self.table.ingredients[row], row),
+                })
+        return [entries[position] for position in order]
+
+    def apply(self, menus):
+        """Write corrections to the Ingredient objects and delete dropped ingredients. Returns the menus touched."""
+        table = self.table
+        costs = self.columns['cost']
+        cost_changed = ~np.isnan(costs) & (costs != table.costs)
+        changed = cost_changed | (self.columns['unit'] != table.units) | (self.columns['category'] != table.categories)
+        for row in np.flatnonzero(changed & self.keep).tolist():
+            ingredient = table.ingredients[row]
+            if cost_changed[row]:
+                ingredient.cost = float(costs[row])
+            ingredient.unit = self.columns['unit'][row]
+            ingredient.category = self.columns['category'][row]
+        touched = set()
+        for menu_name, name in self.dropped():
+            del menus[menu_name].ingredients[name]
+            touched.add(menu_name)
+        return touched
+
+
+def validate(table, rules):
+    """
+    Run the rules in order over the table, each over the rows still kept. Corrections are made
+    to copies of the columns, so the table and its Ingredient objects are left untouched until
+    ValidationResult.apply.
+    """
+    columns = {
+        'cost': table.costs.copy(),
+        'unit': table.units.copy(),
+        'category': table.categories.copy(),
+    }
+    keep = np.ones(len(table), dtype=bool)
+    findings = []
+    for position, rule in enumerate(rules):
+        rows = np.flatnonzero(keep)
+        before = columns[rule.field][rows] if rule.field else None
+        violating, actions = rule.evaluate(columns, rows)
+        if not len(violating):
+            continue
+        if actions is None:
+            actions = np.full(len(violating), rule.action)
+        keep[violating[actions == 'drop']] = False
+        old = new = None
+        if rule.field:
+            old = before[np.searchsorted(rows, violating)]
+            new = columns[rule.field][violating].copy()
+        findings.append(Findings(rule, position, violating, actions, old, new))
+    return ValidationResult(table, keep, columns, findings)
+
+
+def validate_menus(menus, rules, include=None):
+    """Validate every ingredient of every menu (or those include(menu, name) accepts) in one pass."""
+    return validate(IngredientTable.from_menus(menus, include), rules)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate the ingredients of every menu against declared rules.")
+    parser.add_argument('--menu-file', default=setting('menu_file', MENU_FILE_PATH), help="menu document (.json) or SQLite store (.db)")
+    parser.add_argument('--rules', choices=sorted(RULE_SETS), default='correct_resale_prices',
+                        help="rule set to apply (default: correct_resale_prices)")
+    parser.add_argument('--report-file', default=REPORT_FILE_PATH, help="where to write the violation report")
+    parser.add_argument('--apply', action='store_true', help="save the corrections and drops to the menu file")
+    args = parser.parse_args(argv)
+
+    store = open_store(args.menu_file)
+    with store.locked():
+        menus = store.load()
+        result = validate_menus(menus, RULE_SETS[args.rules])
+        entries = result.entries()
+        if args.apply:
+            result.apply(menus)
+            store.save(menus)
+
+    with atomic_writer(args.report_file) as f:
+        json.dump(entries, f, indent=2)
+    counts = result.counts()
+    print(f"Validated {len(result.table)} ingredient(s): {len(entries)} violation(s), "
+          f"{int((~result.keep).sum())} dropped. Report written to {args.report_file}")
+    for rule in RULE_SETS[args.rules]:
+        if counts[rule.name]:
+            print(f"- {rule.name}: {counts[rule.name]}")
+
+if __name__ == "__main__":
+    main()